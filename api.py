@@ -0,0 +1,322 @@
+"""
+api module for TaskFlow application.
+JSON endpoints: health check, calendar events, incremental sync, batch
+operations, statistics, search and bulk export.
+"""
+from flask import Blueprint, current_app, request, jsonify, abort, make_response, stream_with_context
+from flask_login import login_required, current_user
+from datetime import datetime
+from itertools import chain
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Task
+from serializers import task_events, stream_json_array
+from dbpool import pool_stats
+from transfer import EXPORT_COLUMNS, EXPORT_FORMATS, export_rows
+from extensions import response_cache
+from auth import user_changed
+from tasks import (conditional_on_user_tasks, task_filter_args, filtered_tasks, parse_date_param, tasks_in_window,
+                   occurrence_events, task_search_page, delete_exception_rows, check_series_dates)
+import stats
+import changes
+
+bp = Blueprint('api', __name__)
+
+@bp.route('/health')
+def health():
+    """Health check: database connectivity plus connection pool statistics."""
+    try:
+        db.session.execute(db.text('SELECT 1'))
+    except SQLAlchemyError:
+        return jsonify({'database': 'unavailable', 'pool': pool_stats(db.engine)}), 503
+    return jsonify({'database': 'ok', 'pool': pool_stats(db.engine)})
+
+EVENT_COLUMNS = (Task.id, Task.title, Task.description, Task.start_date, Task.due_date, Task.status)
+API_BATCH_SIZE = 1000
+
+@bp.route('/api/tasks')
+@login_required
+@conditional_on_user_tasks
+def api_tasks():
+    filters = task_filter_args(request.args)
+    params = dict(filters, start=request.args.get('start'), end=request.args.get('end'),
+                  today=datetime.utcnow().date().isoformat())
+    body = response_cache.get(current_user, 'api_tasks', params)
+    if body is not None:
+        return current_app.response_class(body, mimetype='application/json')
+
+    try:
+        window_start = parse_date_param(request.args.get('start'))
+        window_end = parse_date_param(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Invalid start or end date.'}), 400
+    # Recurring series are expanded separately, for this window only; without a bounded
+    # window they would have no end, so their series rows are listed instead
+    expand = window_start is not None and window_end is not None
+    query = Task.query.filter_by(user_id=current_user.id)
+    if expand:
+        query = query.filter(Task.recurrence.is_(None))
+    query = tasks_in_window(query, window_start, window_end)
+    try:
+        query = filtered_tasks(query, filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Only the event columns, streamed from a server-side cursor
+    rows = query.with_entities(*EVENT_COLUMNS).order_by(Task.id).yield_per(API_BATCH_SIZE)
+    events = task_events(rows)
+    if expand:
+        events = chain(events, occurrence_events(window_start, window_end, filters))
+    chunks = stream_json_array(events, API_BATCH_SIZE)
+    if response_cache.enabled:
+        chunks = response_cache.tee(current_user, 'api_tasks', params, chunks)
+    return current_app.response_class(stream_with_context(chunks), mimetype='application/json')
+
+# --- Incremental sync ---
+@bp.route('/api/tasks/changes')
+@login_required
+def api_task_changes():
+    """
+    The tasks inserted, updated or deleted since ``since``, a cursor from an earlier
+    response (omit it to get every task). Clients apply ``deleted`` then ``changed``
+    and repeat with the returned cursor while ``has_more`` is true.
+    """
+    try:
+        limit = min(max(int(request.args.get('limit', changes.PAGE_SIZE)), 1), changes.MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit.'}), 400
+    try:
+        changed, deleted, cursor, has_more = changes.changes_since(
+            current_user.id, request.args.get('since'), limit,
+            retention_days=current_app.config['SYNC_TOMBSTONE_RETENTION_DAYS'],
+        )
+    except changes.CursorExpired:
+        return jsonify({'error': 'Cursor expired; sync again without "since".'}), 410
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor.'}), 400
+    return jsonify({'changed': [task_json(task) for task in changed], 'deleted': deleted, 'cursor': cursor,
+                    'has_more': has_more})
+
+# --- Batch task API ---
+MAX_BATCH_SIZE = 1000
+
+def json_error(message, status=400):
+    """Aborts the request with a JSON error body."""
+    abort(make_response(jsonify({'error': message}), status))
+
+def batch_items(key):
+    """Returns the list under ``key`` in the JSON request body."""
+    payload = request.get_json(silent=True)
+    items = payload.get(key) if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        json_error(f'Expected a JSON object with a "{key}" list.')
+    if len(items) > MAX_BATCH_SIZE:
+        json_error(f'At most {MAX_BATCH_SIZE} items can be processed per request.')
+    return items
+
+def batch_ids():
+    """Returns the de-duplicated task ids from the JSON request body."""
+    ids = batch_items('ids')
+    if not all(isinstance(task_id, int) for task_id in ids):
+        json_error('Task ids must be integers.')
+    return list(dict.fromkeys(ids))
+
+def owned_task_statuses(ids):
+    """Returns {task_id: status} for the given ids that belong to the current user, in one query."""
+    if not ids:
+        return {}
+    rows = db.session.execute(
+        db.select(Task.id, Task.status).where(Task.id.in_(ids), Task.user_id == current_user.id)
+    )
+    return dict(rows.all())
+
+def parse_payload_date(item, field, label):
+    """Parses an optional 'YYYY-MM-DD' date from a JSON task payload."""
+    value = item.get(field)
+    if value is None or value == '':
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {label} date format.')
+
+def parse_task_payload(item, user_id):
+    """Validates a JSON task payload into Task column values. Raises ValueError on bad input."""
+    if not isinstance(item, dict):
+        raise ValueError('Task must be a JSON object.')
+    title = item.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError('Title is required.')
+    description = item.get('description')
+    if description is not None and not isinstance(description, str):
+        raise ValueError('Description must be a string.')
+    start_date = parse_payload_date(item, 'start_date', 'start')
+    due_date = parse_payload_date(item, 'due_date', 'due')
+    return {
+        'title': title,
+        'description': description,
+        'start_date': start_date,
+        'due_date': due_date,
+        'status': Task.status_from_start_date(start_date),
+        'user_id': user_id,
+    }
+
+def task_json(task):
+    """A task as a JSON-serializable dict, with ISO 8601 dates."""
+    values = {name: getattr(task, name) for name in EXPORT_COLUMNS}
+    return {name: value.isoformat() if isinstance(value, datetime) else value for name, value in values.items()}
+
+def batch_report(results):
+    """Builds the per-item JSON report of a batch operation."""
+    succeeded = sum(1 for result in results if result['ok'])
+    return jsonify({'results': results, 'succeeded': succeeded, 'failed': len(results) - succeeded})
+
+def id_results(ids, owned):
+    """Per-item results for operations that only need the task to exist and be owned."""
+    return [{'id': task_id, 'ok': True} if task_id in owned
+            else {'id': task_id, 'ok': False, 'error': 'Task not found.'}
+            for task_id in ids]
+
+@bp.route('/api/tasks/batch/create', methods=['POST'])
+@login_required
+def batch_create_tasks():
+    """Creates several tasks in one transaction."""
+    results, rows = [], []
+    for index, item in enumerate(batch_items('tasks')):
+        try:
+            rows.append(parse_task_payload(item, current_user.id))
+            results.append({'index': index, 'ok': True})
+        except ValueError as e:
+            results.append({'index': index, 'ok': False, 'error': str(e)})
+
+    if rows:
+        seq = changes.next_seq(current_user.id)
+        for row in rows:
+            row['change_seq'] = seq
+        task_ids = db.session.scalars(
+            db.insert(Task).returning(Task.id, sort_by_parameter_order=True), rows
+        ).all()
+        stats.add_tasks(current_user.id, rows)
+        for result, task_id in zip((result for result in results if result['ok']), task_ids):
+            result['id'] = task_id
+        user_changed()
+        db.session.commit()
+    return batch_report(results)
+
+@bp.route('/api/tasks/batch/complete', methods=['POST'])
+@login_required
+def batch_complete_tasks():
+    """Marks several tasks as completed in one transaction."""
+    ids = batch_ids()
+    owned = owned_task_statuses(ids)
+    if owned:
+        with stats.tracking(current_user.id, list(owned)):
+            db.session.execute(
+                db.update(Task).where(Task.id.in_(list(owned)))
+                .values(status='Completed', change_seq=changes.next_seq(current_user.id))
+            )
+        user_changed()
+        db.session.commit()
+    return batch_report(id_results(ids, owned))
+
+@bp.route('/api/tasks/batch/delete', methods=['POST'])
+@login_required
+def batch_delete_tasks():
+    """Deletes several tasks in one transaction."""
+    ids = batch_ids()
+    owned = owned_task_statuses(ids)
+    if owned:
+        # Series go together with their materialized occurrences, which reference them
+        removed = set(delete_exception_rows(list(owned)))
+        task_ids = [task_id for task_id in owned if task_id not in removed]
+        changes.record_deletes(current_user.id, task_ids)
+        with stats.tracking(current_user.id, task_ids):
+            db.session.execute(db.delete(Task).where(Task.id.in_(task_ids)))
+        user_changed()
+        db.session.commit()
+    return batch_report(id_results(ids, owned))
+
+@bp.route('/api/tasks/batch/reschedule', methods=['POST'])
+@login_required
+def batch_reschedule_tasks():
+    """Sets new start/due dates on several tasks in one transaction."""
+    items = batch_items('tasks')
+    parsed = []
+    for item in items:
+        task_id = item.get('id') if isinstance(item, dict) else None
+        if not isinstance(task_id, int):
+            parsed.append((task_id, 'Task id must be an integer.'))
+            continue
+        try:
+            parsed.append((task_id, (parse_payload_date(item, 'start_date', 'start'),
+                                     parse_payload_date(item, 'due_date', 'due'))))
+        except ValueError as e:
+            parsed.append((task_id, str(e)))
+
+    owned = owned_task_statuses([task_id for task_id, dates in parsed if isinstance(dates, tuple)])
+    # Recurring series must keep a valid rule with their new start date
+    series = {row.id: row for row in db.session.execute(
+        db.select(Task.id, Task.recurrence, Task.recurrence_interval, Task.recurrence_until, Task.recurrence_count)
+        .where(Task.id.in_(list(owned)), Task.recurrence.isnot(None))
+    )} if owned else {}
+    results, rows = [], []
+    for task_id, dates in parsed:
+        if isinstance(dates, str):
+            results.append({'id': task_id, 'ok': False, 'error': dates})
+        elif task_id not in owned:
+            results.append({'id': task_id, 'ok': False, 'error': 'Task not found.'})
+        else:
+            start_date, due_date = dates
+            if task_id in series:
+                try:
+                    check_series_dates(series[task_id], start_date)
+                except ValueError as e:
+                    results.append({'id': task_id, 'ok': False, 'error': str(e)})
+                    continue
+            # Same rule as edit_task: open tasks get their status from the new start date
+            status = owned[task_id]
+            if status != 'Completed':
+                status = Task.status_from_start_date(start_date)
+            rows.append({'id': task_id, 'start_date': start_date, 'due_date': due_date, 'status': status})
+            results.append({'id': task_id, 'ok': True})
+
+    if rows:
+        seq = changes.next_seq(current_user.id)
+        for row in rows:
+            row['change_seq'] = seq
+        # Bulk UPDATE by primary key, executed as a single executemany
+        with stats.tracking(current_user.id, [row['id'] for row in rows]):
+            db.session.execute(db.update(Task), rows)
+        user_changed()
+        db.session.commit()
+    return batch_report(results)
+
+@bp.route('/api/stats')
+@login_required
+@conditional_on_user_tasks
+def api_stats():
+    """The current user's task counters, read from the precomputed statistics row."""
+    return jsonify(stats.user_stats(current_user.id))
+
+@bp.route('/api/tasks/search')
+@login_required
+@conditional_on_user_tasks
+def api_search_tasks():
+    """Ranked search results as JSON."""
+    text_query, page, per_page, tasks, has_more = task_search_page()
+    if not text_query:
+        return jsonify({'error': 'Missing search query "q".'}), 400
+    return jsonify({'results': [task_json(task) for task in tasks], 'page': page, 'per_page': per_page,
+                    'has_more': has_more})
+
+# --- Bulk export ---
+@bp.route('/api/tasks/export')
+@login_required
+def export_tasks():
+    """Streams all of the user's tasks as a CSV or NDJSON download."""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported export format: {fmt}'}), 400
+    writer, mimetype = EXPORT_FORMATS[fmt]
+    response = current_app.response_class(stream_with_context(writer(export_rows(current_user.id))), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=tasks.{fmt}'
+    return response
@@ -0,0 +1,361 @@
+"""
+asgi module for TaskFlow application.
+Async JSON task API on SQLAlchemy's asyncio engine, sharing the models and the login
+session of the Flask app. Other paths are passed to the Flask app when asgiref is installed:
+
+    uvicorn --factory asgi:create_application --workers 4
+"""
+import json
+import re
+import time
+from datetime import datetime
+from functools import partial
+from urllib.parse import parse_qs
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.http import parse_etags
+from api import parse_payload_date, parse_task_payload, task_json, EVENT_COLUMNS, API_BATCH_SIZE
+from app import create_app
+from changes import allocate
+from dbpool import configure_engine
+from tasks import (task_filter_args, filtered_tasks, parse_date_param, tasks_in_window, recurring_series,
+                   series_occurrences, materialized_occurrences, series_events, check_series_dates)
+from models import db, User, Task, TASK_STATUSES
+from routing import replica_keys
+from serializers import dumps, task_events
+
+try:
+    from asgiref.wsgi import WsgiToAsgi  # Optional, serves the rest of the app from the same process
+except ImportError:
+    WsgiToAsgi = None
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_database_url(app):
+    """ASYNC_DATABASE_URL, or the Flask app's database URL with its async driver."""
+    if app.config.get('ASYNC_DATABASE_URL'):
+        return make_url(app.config['ASYNC_DATABASE_URL'])
+    with app.app_context():
+        # Resolved by Flask-SQLAlchemy, e.g. relative SQLite paths
+        url = db.engine.url
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f'No async driver known for {url.get_backend_name()}; set ASYNC_DATABASE_URL.')
+    return url.set(drivername=driver)
+
+
+class Request:
+    """The parts of an ASGI HTTP request the API handlers need."""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        self.args = {name: values[0] for name, values in query.items()}
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.body = body
+        self.user_version = None  # Set when the request changed the user's tasks
+
+    def json(self):
+        """The decoded JSON body. Raises ValueError if it is not valid JSON."""
+        return json.loads(self.body or b'null')
+
+
+class AsyncTaskAPI:
+    """
+    ASGI application for the JSON task API (list, get, create, update, complete,
+    delete). Requests are authenticated with the Flask login session cookie, and
+    writes update that session the way the Flask app does, so ETags, caches and
+    replica routing stay consistent between the two.
+    """
+
+    def __init__(self, app, fallback=None):
+        self.app = app
+        self.fallback = fallback
+        self._engine = None
+        self._sessionmaker = None
+        self.routes = [
+            (re.compile(r'/api/tasks'), {'GET': self.list_tasks, 'POST': self.create_task}),
+            (re.compile(r'/api/tasks/(\d+)'), {'GET': self.get_task, 'PATCH': self.update_task,
+                                               'DELETE': self.delete_task}),
+            (re.compile(r'/api/tasks/(\d+)/complete'), {'POST': self.complete_task}),
+        ]
+
+    @property
+    def engine(self):
+        """The async engine, created on first use so a missing driver only fails async requests."""
+        if self._engine is None:
+            url = async_database_url(self.app)
+            options = {}
+            config = self.app.config
+            if url.get_backend_name() == 'postgresql':
+                options = {
+                    'pool_size': config.get('DB_POOL_SIZE', 5),
+                    'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+                    'pool_timeout': config.get('DB_POOL_TIMEOUT', 10),
+                    'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+                    'pool_pre_ping': config.get('DB_POOL_PRE_PING', False),
+                }
+                if config.get('DB_STATEMENT_TIMEOUT'):
+                    options['connect_args'] = {
+                        'server_settings': {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT'])}}
+            self._engine = create_async_engine(url, **options)
+            configure_engine(self._engine.sync_engine, config)
+        return self._engine
+
+    @property
+    def sessionmaker(self):
+        if self._sessionmaker is None:
+            # Objects are still read after commit, which must not trigger lazy loads
+            self._sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        return self._sessionmaker
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        route = self.match(scope['path']) if scope['type'] == 'http' else None
+        if route is None:
+            if self.fallback is not None:
+                return await self.fallback(scope, receive, send)
+            return await self.respond(send, 404, {'error': 'Not found.'})
+
+        methods, args = route
+        handler = methods.get(scope['method'])
+        if handler is None:
+            return await self.respond(send, 405, {'error': 'Method not allowed.'})
+        request = Request(scope, await self.read_body(receive))
+
+        flask_session = self.open_session(request)
+        try:
+            user_id = int(flask_session.get('_user_id'))
+        except (TypeError, ValueError):
+            return await self.respond(send, 401, {'error': 'Authentication required.'})
+
+        async with self.sessionmaker() as session:
+            user = await session.get(User, user_id)
+            if user is None:
+                return await self.respond(send, 401, {'error': 'Authentication required.'})
+            status, body, headers = await handler(request, session, user, *args)
+            if request.user_version is not None:
+                headers = headers + self.remember_write(flask_session, request.user_version)
+            await self.respond(send, status, body, headers)
+
+    def match(self, path):
+        """Returns ({method: handler}, path arguments) for a path, or None."""
+        for pattern, handlers in self.routes:
+            match = pattern.fullmatch(path)
+            if match:
+                return handlers, [int(arg) for arg in match.groups()]
+        return None
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._engine is not None:
+                    await self._engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def respond(self, send, status, body, headers=()):
+        """Sends a JSON response; ``body`` is encoded unless it is bytes or an async iterator of bytes."""
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        if body is not None:
+            headers.append((b'content-type', b'application/json'))
+        if body is not None and not isinstance(body, bytes) and not hasattr(body, '__aiter__'):
+            body = dumps(body)
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        if hasattr(body, '__aiter__'):
+            async for chunk in body:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            body = b''
+        await send({'type': 'http.response.body', 'body': body or b''})
+
+    # --- Flask session ---
+    def open_session(self, request):
+        """Loads the Flask session from the request's cookie."""
+        environ = {'HTTP_COOKIE': request.headers.get('cookie', '')}
+        return self.app.session_interface.open_session(self.app, self.app.request_class(environ))
+
+    def remember_write(self, flask_session, user_version):
+        """
+        Records a write in the Flask session, as the Flask app's after_request hooks do,
+        and returns the Set-Cookie headers for it.
+        """
+        flask_session['user_version'] = user_version
+        if replica_keys(self.app):
+            flask_session['primary_until'] = time.time() + self.app.config.get('REPLICA_STICKY_SECONDS', 5)
+        response = self.app.response_class()
+        self.app.session_interface.save_session(self.app, flask_session, response)
+        return [('Set-Cookie', value) for value in response.headers.getlist('Set-Cookie')]
+
+    async def user_changed(self, session, user, request):
+        """Async counterpart of auth.user_changed(): bumps the user's version and drops cached views."""
+        request.user_version = await session.run_sync(
+            lambda sync_session: allocate(sync_session, sync_session, user.id)
+        )
+        # Outside a Flask app context, so the Flask app's caches are named explicitly
+        self.app.extensions['response_cache'].invalidate_user(user.id)
+        self.app.extensions['identity_cache'].invalidate(user.id)
+
+    def validators(self, request, user):
+        """The Flask app's conditional GET validators; returns (headers, not_modified)."""
+        etag = f'{user.id}-{user.version}-{datetime.utcnow().date().isoformat()}'
+        headers = [('ETag', f'W/"{etag}"'), ('Cache-Control', 'private, no-cache'), ('Vary', 'Cookie')]
+        return headers, parse_etags(request.headers.get('if-none-match')).contains_weak(etag)
+
+    async def owned_task(self, session, user, task_id):
+        task = await session.get(Task, task_id)
+        return task if task is not None and task.user_id == user.id else None
+
+    # --- Handlers: each returns (status, body, headers) ---
+    async def list_tasks(self, request, session, user):
+        """Calendar events in the same format as the Flask /api/tasks, streamed in batches."""
+        headers, not_modified = self.validators(request, user)
+        if not_modified:
+            return 304, None, headers
+        try:
+            window_start = parse_date_param(request.args.get('start'))
+            window_end = parse_date_param(request.args.get('end'))
+        except ValueError:
+            return 400, {'error': 'Invalid start or end date.'}, []
+        # Recurring series are expanded separately, for a bounded window only, as in the Flask route
+        expand = window_start is not None and window_end is not None
+        statement = select(*EVENT_COLUMNS).where(Task.user_id == user.id)
+        if expand:
+            statement = statement.where(Task.recurrence.is_(None))
+        statement = tasks_in_window(statement, window_start, window_end)
+        filters = task_filter_args(request.args)
+        try:
+            statement = filtered_tasks(statement, filters)
+        except ValueError as e:
+            return 400, {'error': str(e)}, []
+        result = await session.stream(statement.order_by(Task.id).execution_options(yield_per=API_BATCH_SIZE))
+        occurrences = None
+        if expand:
+            occurrences = partial(self.occurrence_events, session, user, window_start, window_end, filters)
+        return 200, self.event_chunks(result, occurrences), headers
+
+    async def occurrence_events(self, session, user, window_start, window_end, filters):
+        """Async counterpart of tasks.occurrence_events(), returning the list of events."""
+        series = await session.scalars(recurring_series(user.id, window_end))
+        occurrences = series_occurrences(series, window_start, window_end)
+        if not occurrences:
+            return []
+        materialized = set((await session.execute(materialized_occurrences(occurrences))).all())
+        return list(series_events(occurrences, materialized, filters))
+
+    async def event_chunks(self, result, occurrences):
+        yield b'['
+        first = True
+        async for rows in result.partitions():
+            yield (b'' if first else b',') + dumps(list(task_events(rows)))[1:-1]
+            first = False
+        # Read once the task rows are consumed, as the stream holds the session's connection
+        events = await occurrences() if occurrences is not None else []
+        if events:
+            yield (b'' if first else b',') + dumps(events)[1:-1]
+        yield b']'
+
+    async def get_task(self, request, session, user, task_id):
+        task = await self.owned_task(session, user, task_id)
+        if task is None:
+            return 404, {'error': 'Task not found.'}, []
+        headers, not_modified = self.validators(request, user)
+        if not_modified:
+            return 304, None, headers
+        return 200, task_json(task), headers
+
+    async def create_task(self, request, session, user):
+        try:
+            payload = request.json()
+        except ValueError:
+            return 400, {'error': 'Invalid JSON.'}, []
+        try:
+            task = Task(**parse_task_payload(payload, user.id))
+        except ValueError as e:
+            return 400, {'error': str(e)}, []
+        session.add(task)
+        await self.user_changed(session, user, request)
+        await session.commit()
+        return 201, task_json(task), []
+
+    async def update_task(self, request, session, user, task_id):
+        task = await self.owned_task(session, user, task_id)
+        if task is None:
+            return 404, {'error': 'Task not found.'}, []
+        try:
+            payload = request.json()
+        except ValueError:
+            return 400, {'error': 'Invalid JSON.'}, []
+        try:
+            if not isinstance(payload, dict):
+                raise ValueError('Task must be a JSON object.')
+            if 'title' in payload:
+                if not isinstance(payload['title'], str) or not payload['title'].strip():
+                    raise ValueError('Title is required.')
+                task.title = payload['title']
+            if 'description' in payload:
+                if payload['description'] is not None and not isinstance(payload['description'], str):
+                    raise ValueError('Description must be a string.')
+                task.description = payload['description']
+            if 'start_date' in payload:
+                task.start_date = parse_payload_date(payload, 'start_date', 'start')
+            if 'due_date' in payload:
+                task.due_date = parse_payload_date(payload, 'due_date', 'due')
+            if 'status' in payload:
+                if payload['status'] not in TASK_STATUSES:
+                    raise ValueError('Invalid status.')
+                task.status = payload['status']
+            check_series_dates(task, task.start_date)
+        except ValueError as e:
+            return 400, {'error': str(e)}, []
+        # Same rule as edit_task: open tasks get their status from the start date
+        if task.status != 'Completed':
+            task.status = Task.status_from_start_date(task.start_date)
+        await self.user_changed(session, user, request)
+        await session.commit()
+        return 200, task_json(task), []
+
+    async def complete_task(self, request, session, user, task_id):
+        task = await self.owned_task(session, user, task_id)
+        if task is None:
+            return 404, {'error': 'Task not found.'}, []
+        task.status = 'Completed'
+        await self.user_changed(session, user, request)
+        await session.commit()
+        return 200, task_json(task), []
+
+    async def delete_task(self, request, session, user, task_id):
+        task = await self.owned_task(session, user, task_id)
+        if task is None:
+            return 404, {'error': 'Task not found.'}, []
+        # A series goes together with its materialized occurrences, deleted first as they reference it
+        for exception in await session.scalars(select(Task).where(Task.recurrence_parent_id == task.id)):
+            await session.delete(exception)
+        await session.flush()
+        await session.delete(task)
+        await self.user_changed(session, user, request)
+        await session.commit()
+        return 204, None, []
+
+
+def create_application(config=None):
+    """ASGI application factory: the async API over a new Flask app, which serves the other paths."""
+    flask_app = create_app(config)
+    return AsyncTaskAPI(flask_app, fallback=WsgiToAsgi(flask_app) if WsgiToAsgi is not None else None)
@@ -0,0 +1,151 @@
+"""
+auth module for TaskFlow application.
+Registration, sign in and account routes, the Flask-Login user loader and the
+user version bookkeeping that invalidates cached views after a write.
+"""
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, g
+from flask_login import login_user, logout_user, login_required, current_user
+from models import db, User
+from passwords import PasswordHashingBusy
+from changes import next_seq
+from extensions import login_manager, response_cache, identity_cache
+
+bp = Blueprint('auth', __name__)
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    snapshot = identity_cache.get(user_id)
+    # A browser that has seen a newer version (e.g. its own write, served by another
+    # worker) must not be handed an older snapshot
+    if snapshot is not None and snapshot['version'] >= session.get('user_version', 0):
+        return db.session.merge(User.from_snapshot(snapshot), load=False)
+    user = db.session.get(User, user_id)
+    if user is not None:
+        identity_cache.set(user_id, user.snapshot())
+    return user
+
+def user_changed():
+    """Records that the current user's tasks or profile changed, invalidating cached views."""
+    # Bumps the version once per transaction, shared with the sequence numbers of task changes
+    next_seq(current_user.id)
+    response_cache.invalidate_user(current_user.id)
+    identity_cache.invalidate(current_user.id)
+    g.user_changed = True
+
+@bp.after_app_request
+def remember_user_version(response):
+    """Lets later requests from this browser detect stale cached identities."""
+    if g.get('user_changed'):
+        session['user_version'] = current_user.version
+    return response
+
+@bp.app_errorhandler(PasswordHashingBusy)
+def password_hashing_busy(e):
+    """Fails fast when every password hashing slot is taken."""
+    flash('The server is busy, please try again in a moment.', 'error')
+    return redirect(request.path)
+
+# --- Authentication Routes ---
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    """User registration page."""
+    if request.method == 'POST':
+        username = request.form['username']
+        email = request.form['email']
+        password = request.form['password']
+        confirm_password = request.form['confirm_password']
+        if password != confirm_password:
+            flash('Passwords do not match.', 'error')
+            return redirect(url_for('auth.register'))
+        if User.query.filter((User.username == username) | (User.email == email)).first():
+            flash('Username or email already exists', 'error')
+            return redirect(url_for('auth.register'))
+        user = User(username=username, email=email, password=password)
+        db.session.add(user)
+        db.session.commit()
+        flash('Registration successful! Please log in.')
+        return redirect(url_for('auth.login'))
+    return render_template('register.html')
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    """Sign in page."""
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        try:
+            user = User.query.filter_by(username=username).first()
+        except Exception:
+            flash('Database error: Please initialize the database with "flask init-db".', 'error')
+            return render_template('login.html')
+        if user and user.check_password(password):
+            db.session.commit()  # Persists an upgraded password hash, if any
+            login_user(user)
+            flash('Logged in successfully!')
+            return redirect(url_for('tasks.index'))
+        else:
+            flash('Invalid username or password', 'error')
+    return render_template('login.html')
+
+@bp.route('/logout')
+@login_required
+def logout():
+    """Logout route."""
+    logout_user()
+    flash('You have been logged out.')
+    return redirect(url_for('auth.login'))
+
+@bp.route('/account', methods=['GET', 'POST'])
+@login_required
+def account():
+    """Account settings page."""
+    if request.method == 'POST':
+        # Validate against the stored row rather than a cached identity snapshot
+        db.session.refresh(current_user._get_current_object())
+        # Check if this is a profile update or password change
+        if 'current_password' in request.form:
+            # Password change
+            current_password = request.form['current_password']
+            new_password = request.form['new_password']
+            confirm_new_password = request.form['confirm_new_password']
+
+            if not current_user.check_password(current_password):
+                flash('Current password is incorrect.', 'error')
+                return redirect(url_for('auth.account'))
+
+            if new_password != confirm_new_password:
+                flash('New passwords do not match.', 'error')
+                return redirect(url_for('auth.account'))
+
+            if len(new_password) < 6:
+                flash('New password must be at least 6 characters long.', 'error')
+                return redirect(url_for('auth.account'))
+
+            current_user.set_password(new_password)
+            user_changed()
+            db.session.commit()
+            flash('Password updated successfully!')
+            return redirect(url_for('auth.account'))
+        else:
+            # Profile update
+            username = request.form['username']
+            email = request.form['email']
+
+            # Check if username or email already exists (excluding current user)
+            existing_user = User.query.filter(
+                (User.username == username) | (User.email == email)
+            ).filter(User.id != current_user.id).first()
+
+            if existing_user:
+                flash('Username or email already exists.', 'error')
+                return redirect(url_for('auth.account'))
+
+            current_user.username = username
+            current_user.email = email
+            user_changed()
+            db.session.commit()
+            flash('Profile updated successfully!')
+            return redirect(url_for('auth.account'))
+
+    return render_template('account.html')
@@ -0,0 +1,247 @@
+"""
+cache module for TaskFlow application.
+Server-side caching of rendered task lists and calendar JSON, with pluggable backends.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from werkzeug.utils import import_string
+
+
+class CacheBackend:
+    """
+    Interface for cache backends. Values may be tagged so a whole group of
+    entries (e.g. everything cached for one user) can be invalidated at once.
+    Shared backends (Redis, memcached, ...) subclass this and are selected with
+    the CACHE_BACKEND config value as an import string.
+    """
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds the backend from the application config."""
+        return cls()
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss."""
+        raise NotImplementedError
+
+    def set(self, key, value, tag=None):
+        """Stores a value, optionally under an invalidation tag."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Drops a single entry."""
+        raise NotImplementedError
+
+    def invalidate_tag(self, tag):
+        """Drops every entry stored under the given tag."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Drops every entry."""
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    """Backend that never stores anything; disables caching."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, tag=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def invalidate_tag(self, tag):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCache(CacheBackend):
+    """
+    In-process, thread-safe LRU cache with a maximum entry count and a TTL.
+    Each worker process has its own copy.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tag, value)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(max_entries=config.get('CACHE_MAX_ENTRIES', 1024), ttl=config.get('CACHE_TTL', 300))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tag=None):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, tag, value)
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in self._tags.pop(tag, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        _, tag, _ = self._entries.pop(key)
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+CACHE_BACKENDS = {
+    'null': NullCache,
+    'lru': LRUCache,
+}
+
+
+class AppCache:
+    """
+    Base for the caches used as app factory extensions. init_app() stores a cache
+    built from each app's config in app.extensions; an instance created without a
+    backend, like the shared ones in extensions.py, works on the current app's.
+    """
+    extension_name = None
+    backend = None
+
+    def init_app(self, app):
+        """Configures a cache from the app's config, for use as an app factory extension."""
+        app.extensions[self.extension_name] = self.from_config(app.config)
+
+    def bound(self):
+        """The cache holding the backend: this one, or the current app's if unbound."""
+        if self.backend is not None:
+            return self
+        return current_app.extensions[self.extension_name]
+
+
+class ResponseCache(AppCache):
+    """
+    Caches per-user views keyed by (user id, user version, view, parameters).
+    Including the user's version in the key means a write on any worker makes
+    older entries unreachable everywhere; invalidate_user() additionally frees
+    them right away in the backend that saw the write.
+    """
+    extension_name = 'response_cache'
+
+    def __init__(self, backend=None, max_value_size=1024 * 1024):
+        self.backend = backend
+        self.max_value_size = max_value_size
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds the cache from CACHE_BACKEND ('null', 'lru' or an import string)."""
+        name = config.get('CACHE_BACKEND', 'null')
+        backend_cls = CACHE_BACKENDS.get(name) or import_string(name)
+        return cls(backend_cls.from_config(config), config.get('CACHE_MAX_VALUE_SIZE', 1024 * 1024))
+
+    @property
+    def enabled(self):
+        return not isinstance(self.bound().backend, NullCache)
+
+    @staticmethod
+    def make_key(user, view, params):
+        """Builds the cache key for a user's view with the given parameters."""
+        query = '&'.join(f'{name}={value}' for name, value in sorted(params.items()) if value is not None)
+        return f'{user.id}:{user.version}:{view}?{query}'
+
+    def get(self, user, view, params):
+        return self.bound().backend.get(self.make_key(user, view, params))
+
+    def set(self, user, view, params, value):
+        self.bound().backend.set(self.make_key(user, view, params), value, tag=f'user:{user.id}')
+
+    def tee(self, user, view, params, chunks):
+        """
+        Passes a streamed body through while caching it, unless it grows past
+        max_value_size; huge bodies are streamed without being buffered.
+        """
+        # Resolved now: the body may be iterated after the app context is gone
+        cache = self.bound()
+        return cache._tee(self.make_key(user, view, params), f'user:{user.id}', chunks)
+
+    def _tee(self, key, tag, chunks):
+        parts = []
+        size = 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size > self.max_value_size:
+                    parts = None
+                else:
+                    parts.append(chunk)
+            yield chunk
+        if parts is not None:
+            self.backend.set(key, b''.join(parts), tag=tag)
+
+    def invalidate_user(self, user_id):
+        """Drops every cached view of the given user."""
+        self.bound().backend.invalidate_tag(f'user:{user_id}')
+
+
+class IdentityCache(AppCache):
+    """
+    Bounded TTL cache of user column snapshots, so authenticated requests can
+    skip the users-table lookup in load_user().
+    """
+    extension_name = 'identity_cache'
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds the cache from USER_CACHE_TTL (seconds, 0 disables) and USER_CACHE_SIZE."""
+        ttl = config.get('USER_CACHE_TTL', 0)
+        if not ttl:
+            return cls(NullCache())
+        return cls(LRUCache(max_entries=config.get('USER_CACHE_SIZE', 10000), ttl=ttl))
+
+    def get(self, user_id):
+        return self.bound().backend.get(f'user:{user_id}')
+
+    def set(self, user_id, snapshot):
+        self.bound().backend.set(f'user:{user_id}', snapshot)
+
+    def invalidate(self, user_id):
+        self.bound().backend.delete(f'user:{user_id}')
@@ -0,0 +1,169 @@
+"""
+changes module for TaskFlow application.
+Change sequence numbers and delete tombstones for incremental sync. Every
+transaction that writes a user's tasks bumps the user's version once and stamps
+the rows it inserts or updates with the new value in Task.change_seq; deleted
+tasks leave a TaskTombstone with it. A client that has seen everything up to
+some sequence number then only needs the rows stamped after it.
+
+Single-task changes are stamped as they are flushed; bulk statements, which
+bypass the flush hooks, take next_seq() and record_deletes() explicitly.
+"""
+from calendar import timegm
+from datetime import datetime, timedelta
+from heapq import merge
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from models import db, User, Task, TaskTombstone, TASK_VIEW_COLUMNS
+
+SESSION_KEY = 'change_seqs'
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+TOMBSTONE_RETENTION_DAYS = 30
+
+
+class CursorExpired(Exception):
+    """The cursor predates the tombstones still kept; the client must sync from scratch."""
+
+
+# --- Sequence numbers ---
+def allocate(executor, session, user_id):
+    """
+    Returns the sequence number of the user's changes in the session's current
+    transaction, bumping the user's version on first use. The bumped users row
+    stays locked until commit, so a user's sequence numbers become visible in order.
+    """
+    seqs = session.info.setdefault(SESSION_KEY, {})
+    if user_id not in seqs:
+        users = User.__table__
+        seqs[user_id] = executor.execute(
+            db.update(users)
+            .where(users.c.id == user_id)
+            .values(version=users.c.version + 1, updated_at=datetime.utcnow())
+            .returning(users.c.version)
+        ).scalar_one()
+    return seqs[user_id]
+
+
+def next_seq(user_id):
+    """The sequence number to stamp on the user's tasks written by a bulk statement."""
+    return allocate(db.session, db.session(), user_id)
+
+
+def record_deletes(user_id, task_ids):
+    """Writes tombstones for tasks about to be removed with a bulk DELETE."""
+    if task_ids:
+        seq = next_seq(user_id)
+        db.session.execute(db.insert(TaskTombstone), [
+            {'task_id': task_id, 'user_id': user_id, 'change_seq': seq, 'deleted_at': datetime.utcnow()}
+            for task_id in task_ids
+        ])
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def forget_seqs(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(SESSION_KEY, None)
+
+
+# --- Flush hooks for single-task changes ---
+@event.listens_for(Task, 'before_insert')
+def task_inserting(mapper, connection, task):
+    task.change_seq = allocate(connection, object_session(task), task.user_id)
+
+
+@event.listens_for(Task, 'before_update')
+def task_updating(mapper, connection, task):
+    attrs = inspect(task).attrs
+    if any(attrs[prop.key].history.has_changes() for prop in mapper.column_attrs if prop.key != 'change_seq'):
+        task.change_seq = allocate(connection, object_session(task), task.user_id)
+
+
+@event.listens_for(Task, 'after_delete')
+def task_deleted(mapper, connection, task):
+    connection.execute(db.insert(TaskTombstone).values(
+        task_id=task.id, user_id=task.user_id,
+        change_seq=allocate(connection, object_session(task), task.user_id),
+        deleted_at=datetime.utcnow(),
+    ))
+
+
+# --- Reading changes ---
+def encode_cursor(seq, task_id, issued):
+    """
+    Cursor for changes after position (seq, task_id); task_id None means after
+    all of seq. ``issued`` is when the client's view was last complete, in epoch seconds.
+    """
+    return f"{seq}|{'' if task_id is None else task_id}|{issued}"
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(). Raises ValueError for a malformed cursor."""
+    seq, task_id, issued = cursor.split('|')
+    return int(seq), int(task_id) if task_id else None, int(issued)
+
+
+def after(seq_column, id_column, seq, task_id):
+    if task_id is None:
+        return seq_column > seq
+    return db.or_(seq_column > seq, db.and_(seq_column == seq, id_column > task_id))
+
+
+def changes_since(user_id, cursor=None, limit=PAGE_SIZE, columns=TASK_VIEW_COLUMNS,
+                  retention_days=TOMBSTONE_RETENTION_DAYS, now=None):
+    """
+    Returns (changed, deleted_ids, cursor, has_more): the user's tasks inserted or
+    updated and the ids of those deleted after ``cursor``, in sequence order, at most
+    ``limit`` of them together. Without a cursor every task counts as changed.
+    ``changed`` holds rows of ``columns``, read by name. Raises CursorExpired when tombstones the
+    client needs may have been pruned, and ValueError for a malformed cursor.
+    """
+    now = now or datetime.utcnow()
+    issued = timegm(now.utctimetuple())
+    if cursor:
+        seq, task_id, issued = decode_cursor(cursor)
+        if datetime.utcfromtimestamp(issued) < now - timedelta(days=retention_days):
+            raise CursorExpired(cursor)
+    else:
+        seq, task_id = -1, None  # Includes rows written before sequence numbers existed
+
+    # Read the version first: everything stamped up to it is committed, later
+    # changes are stamped higher and left for the next call
+    version = db.session.scalar(db.select(User.version).where(User.id == user_id))
+    rows = db.session.execute(
+        db.select(*columns, Task.change_seq.label('_seq'), Task.id.label('_id'))
+        .where(Task.user_id == user_id, Task.change_seq <= version,
+               after(Task.change_seq, Task.id, seq, task_id))
+        .order_by(Task.change_seq, Task.id)
+        .limit(limit + 1)
+    ).all()
+    tombstones = []
+    if cursor:  # A fresh client has nothing to delete
+        tombstones = db.session.execute(
+            db.select(TaskTombstone.change_seq, TaskTombstone.task_id)
+            .where(TaskTombstone.user_id == user_id, TaskTombstone.change_seq <= version,
+                   after(TaskTombstone.change_seq, TaskTombstone.task_id, seq, task_id))
+            .order_by(TaskTombstone.change_seq, TaskTombstone.task_id)
+            .limit(limit + 1)
+        ).all()
+
+    entries = list(merge(
+        ((row._seq, row._id, row) for row in rows),
+        ((tombstone.change_seq, tombstone.task_id, None) for tombstone in tombstones),
+        key=lambda entry: entry[:2],
+    ))
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    changed = [row for _, _, row in entries if row is not None]
+    deleted = [task_id for _, task_id, row in entries if row is None]
+    if has_more:
+        next_cursor = encode_cursor(entries[-1][0], entries[-1][1], issued)
+    else:
+        next_cursor = encode_cursor(version, None, timegm(now.utctimetuple()))
+    return changed, deleted, next_cursor, has_more
+
+
+def prune_tombstones(retention_days=TOMBSTONE_RETENTION_DAYS, now=None):
+    """Deletes tombstones older than the retention period. Returns the number deleted."""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    return db.session.execute(db.delete(TaskTombstone).where(TaskTombstone.deleted_at < cutoff)).rowcount
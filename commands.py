@@ -0,0 +1,110 @@
+"""
+commands module for TaskFlow application.
+"flask" CLI commands and the maintenance jobs they share with the background
+scheduler. Modules only some commands need are imported when those commands run.
+"""
+import click
+from flask import Blueprint, current_app
+from models import db, User, Task
+from transfer import EXPORT_FORMATS, IMPORT_FORMATS, export_rows, import_tasks
+import stats
+
+# No group name, so the commands stay top-level ("flask init-db")
+bp = Blueprint('commands', __name__, cli_group=None)
+
+def sweep_task_statuses():
+    """Marks every task whose start date has passed as Pending."""
+    count = Task.sweep_started()
+    db.session.commit()
+    return count
+
+def reconcile_task_stats():
+    """Recomputes every user's task counters from the tasks table."""
+    return stats.reconcile_all()
+
+@bp.cli.command("init-db")
+def init_db():
+    db.create_all()
+    print(f"Database initialized in {current_app.config['ENVIRONMENT']} mode!")
+
+@bp.cli.command("search-index")
+def search_index():
+    """Creates the full-text search index and fills it from existing tasks."""
+    from search import install as install_search_index
+    with db.engine.begin() as connection:
+        install_search_index(connection, rebuild=True)
+    print("Search index is up to date.")
+
+@bp.cli.command("sweep-status")
+def sweep_status():
+    count = sweep_task_statuses()
+    print(f"{count} task(s) marked as Pending.")
+
+@bp.cli.command("reconcile-stats")
+def reconcile_stats():
+    """Recomputes the precomputed task statistics; run daily, as counters depend on the date."""
+    count = reconcile_task_stats()
+    print(f"Task statistics recomputed for {count} user(s).")
+
+@bp.cli.command("prune-tombstones")
+def prune_tombstones():
+    """Deletes the delete records kept for incremental sync once they are past retention."""
+    from changes import prune_tombstones as prune
+    count = prune(current_app.config['SYNC_TOMBSTONE_RETENTION_DAYS'])
+    db.session.commit()
+    print(f"{count} tombstone(s) pruned.")
+
+@bp.cli.command("run-reminders")
+def run_reminders():
+    """Runs the reminder scheduler in the foreground, e.g. as a dedicated process."""
+    from reminders import ReminderScheduler
+    scheduler = ReminderScheduler.from_config(current_app.config)
+    print(f"Reminder scheduler started as {scheduler.owner}; press Ctrl+C to stop.")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+
+def find_user_or_fail(username):
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username!r}.")
+    return user
+
+@bp.cli.command("export-tasks")
+@click.argument("username")
+@click.option("--format", "fmt", type=click.Choice(sorted(EXPORT_FORMATS)), default="csv")
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-", help="Defaults to stdout.")
+def export_tasks_command(username, fmt, output):
+    user = find_user_or_fail(username)
+    writer, _ = EXPORT_FORMATS[fmt]
+    for chunk in writer(export_rows(user.id)):
+        output.write(chunk)
+
+@bp.cli.command("import-tasks")
+@click.argument("username")
+@click.argument("input_file", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "fmt", type=click.Choice(sorted(IMPORT_FORMATS)), default=None,
+              help="Defaults to the file extension (.ndjson/.jsonl or .csv).")
+def import_tasks_command(username, input_file, fmt):
+    user = find_user_or_fail(username)
+    if fmt is None:
+        fmt = 'ndjson' if input_file.name.endswith(('.ndjson', '.jsonl')) else 'csv'
+    try:
+        count = import_tasks(user, IMPORT_FORMATS[fmt](input_file))
+    except ValueError as e:
+        db.session.rollback()
+        raise click.ClickException(f"Import failed, no tasks were imported. {e}")
+    db.session.commit()
+    print(f"Imported {count} task(s) for {user.username}.")
+
+@bp.cli.command("benchmark-hashing")
+@click.option("--method", "methods", multiple=True, help="Hash method to time; repeatable.")
+@click.option("--seconds", default=1.0, show_default=True, help="Time spent on each method.")
+def benchmark_hashing(methods, seconds):
+    from passwords import BENCHMARK_METHODS, benchmark
+    configured = current_app.config['PASSWORD_HASH_METHOD']
+    methods = methods or tuple(dict.fromkeys((configured,) + BENCHMARK_METHODS))
+    for method in methods:
+        marker = ' (configured)' if method == configured else ''
+        print(f"{method:<28} {benchmark(method, seconds):8.1f} hashes/sec{marker}")
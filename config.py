@@ -1,28 +1,164 @@
 '''
 Configuration management for Flask application.
+Values are read from the environment when the configuration is loaded by
+create_app(), not when this module is imported, so .env files and variables set
+after import (e.g. by tests or benchmarks) are honored.
 '''
 import os
-from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+from dbpool import MeteredQueuePool
 
-load_dotenv()  # Load .env file
+def flag(value):
+    """Parses a '0'/'1' environment flag."""
+    return value == '1'
+
+class env:
+    """Config attribute holding the value of an environment variable, cast on each read."""
+
+    def __init__(self, name, default=None, cast=str):
+        self.name = name
+        self.default = default
+        self.cast = cast
+
+    def __get__(self, instance, owner):
+        value = os.getenv(self.name)
+        return self.default if value is None else self.cast(value)
 
 class Config:
     """Base configuration class."""
-    SECRET_KEY = os.getenv('SECRET_KEY')
+    SECRET_KEY = env('SECRET_KEY')
+    SQLALCHEMY_DATABASE_URI = env('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Seconds between in-process status sweeps. Pages show the stored status, so this is on by
+    # default; 0 disables it, in which case run "flask sweep-status" from cron instead
+    STATUS_SWEEP_INTERVAL = env('STATUS_SWEEP_INTERVAL', 300, int)
+    # Seconds between in-process task statistics reconciliations (0 disables; use "flask reconcile-stats")
+    STATS_RECONCILE_INTERVAL = env('STATS_RECONCILE_INTERVAL', 0, int)
+    # Start/due date reminders, run by whichever worker holds the scheduler lease
+    # (or by a dedicated "flask run-reminders" process)
+    REMINDERS_ENABLED = env('REMINDERS_ENABLED', False, flag)
+    REMINDER_NOTIFIERS = env('REMINDER_NOTIFIERS', 'log')  # Comma-separated: 'log', 'webhook' or import strings
+    REMINDER_WEBHOOK_URL = env('REMINDER_WEBHOOK_URL')
+    REMINDER_DUE_LEAD = env('REMINDER_DUE_LEAD', 86400, int)  # Seconds before the due date
+    REMINDER_START_LEAD = env('REMINDER_START_LEAD', 0, int)  # Seconds before the start date
+    REMINDER_LOOKAHEAD = env('REMINDER_LOOKAHEAD', 3600, int)  # Seconds of upcoming events kept in memory
+    REMINDER_REFRESH_INTERVAL = env('REMINDER_REFRESH_INTERVAL', 60, int)
+    REMINDER_BATCH_SIZE = env('REMINDER_BATCH_SIZE', 500, int)
+    REMINDER_LEASE_SECONDS = env('REMINDER_LEASE_SECONDS', 60, int)
+    # Days deleted tasks are remembered for /api/tasks/changes; older cursors must resync from scratch
+    # (prune with "flask prune-tombstones")
+    SYNC_TOMBSTONE_RETENTION_DAYS = env('SYNC_TOMBSTONE_RETENTION_DAYS', 30, int)
+    # Werkzeug hash method with cost parameters, e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'
+    # (see "flask benchmark-hashing"); hashes made with other settings are upgraded on login
+    PASSWORD_HASH_METHOD = env('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    # Max concurrent hashes per worker process (0 hashes on the request thread) and
+    # seconds a request waits for a slot before giving up. Only useful with threaded or
+    # async workers: a sync worker never runs two hashes at once
+    PASSWORD_HASH_WORKERS = env('PASSWORD_HASH_WORKERS', 0, int)
+    PASSWORD_HASH_TIMEOUT = env('PASSWORD_HASH_TIMEOUT', 5.0, float)
+    # Server-side cache for task lists and calendar JSON: 'null', 'lru' or an import string
+    CACHE_BACKEND = env('CACHE_BACKEND', 'null')
+    CACHE_MAX_ENTRIES = env('CACHE_MAX_ENTRIES', 1024, int)
+    CACHE_TTL = env('CACHE_TTL', 300, int)  # Seconds
+    CACHE_MAX_VALUE_SIZE = env('CACHE_MAX_VALUE_SIZE', 1024 * 1024, int)  # Larger bodies are not cached
+    # Seconds a user's identity may be served from memory in load_user() (0 disables)
+    USER_CACHE_TTL = env('USER_CACHE_TTL', 0, int)
+    USER_CACHE_SIZE = env('USER_CACHE_SIZE', 10000, int)
+    # Stream the home page, sending cards as their rows are read in batches of STREAM_BATCH_SIZE
+    # (streamed pages bypass the response cache)
+    STREAM_INDEX = env('STREAM_INDEX', False, flag)
+    STREAM_BATCH_SIZE = env('STREAM_BATCH_SIZE', 50, int)
+    STREAM_CHUNK_SIZE = env('STREAM_CHUNK_SIZE', 4096, int)  # Characters per write to the client
+    # Request latency, SQL and template timing metrics, served at METRICS_PATH in Prometheus format
+    INSTRUMENTATION_ENABLED = env('INSTRUMENTATION_ENABLED', False, flag)
+    METRICS_PATH = env('METRICS_PATH', '/metrics')
+    SERVER_TIMING_HEADER = env('SERVER_TIMING_HEADER', False, flag)
+    # Warn when one request runs the same SQL statement this many times
+    N_PLUS_ONE_THRESHOLD = env('N_PLUS_ONE_THRESHOLD', 10, int)
+    # Connection pool; see SQLALCHEMY_ENGINE_OPTIONS below
+    DB_POOL_SIZE = env('DB_POOL_SIZE', 5, int)
+    DB_MAX_OVERFLOW = env('DB_MAX_OVERFLOW', 10, int)
+    DB_POOL_TIMEOUT = env('DB_POOL_TIMEOUT', 10.0, float)  # Seconds to wait for a connection
+    DB_POOL_RECYCLE = env('DB_POOL_RECYCLE', 1800, int)  # Seconds before a connection is replaced
+    DB_POOL_PRE_PING = env('DB_POOL_PRE_PING', False, flag)
+    DB_STATEMENT_TIMEOUT = env('DB_STATEMENT_TIMEOUT', 0, int)  # Milliseconds, PostgreSQL only
+    # Database URL for the async API in asgi.py (default: DATABASE_URL with aiosqlite/asyncpg)
+    ASYNC_DATABASE_URL = env('ASYNC_DATABASE_URL')
+    # Seconds a browser keeps reading from the primary after it wrote, to read its own writes
+    REPLICA_STICKY_SECONDS = env('REPLICA_STICKY_SECONDS', 5, int)
+
+    @property
+    def SQLALCHEMY_BINDS(self):
+        """Read replicas for GET/HEAD requests, from comma-separated DATABASE_REPLICA_URLS (empty disables)."""
+        return {
+            f'replica{index}': url
+            for index, url in enumerate(filter(None, os.getenv('DATABASE_REPLICA_URLS', '').split(',')))
+        }
+
+    @property
+    def SQLITE_PRAGMAS(self):
+        """Applied to every new SQLite connection, so concurrent workers wait for locks instead of failing."""
+        return {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+            'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),  # Milliseconds
+        }
+
+    @property
+    def SQLALCHEMY_ENGINE_OPTIONS(self):
+        """Engine options built from the DB_* settings for the configured database."""
+        if not self.SQLALCHEMY_DATABASE_URI:
+            return {}
+        url = make_url(self.SQLALCHEMY_DATABASE_URI)
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            return {}  # In-memory SQLite shares one connection; there is no pool to tune
+        options = {
+            'poolclass': MeteredQueuePool,
+            'pool_size': self.DB_POOL_SIZE,
+            'max_overflow': self.DB_MAX_OVERFLOW,
+            'pool_timeout': self.DB_POOL_TIMEOUT,
+            'pool_recycle': self.DB_POOL_RECYCLE,
+            'pool_pre_ping': self.DB_POOL_PRE_PING,
+        }
+        if url.get_backend_name() == 'postgresql' and self.DB_STATEMENT_TIMEOUT:
+            options['connect_args'] = {'options': f'-c statement_timeout={self.DB_STATEMENT_TIMEOUT}'}
+        return options
 
 class DevelopmentConfig(Config):
     """Development configuration."""
-    ENVIRONMENT = 'dev'
-    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')  # SQLite in dev
+    ENVIRONMENT = 'dev'  # SQLite in dev
 
 class ProductionConfig(Config):
     """Production configuration."""
-    ENVIRONMENT = 'prod'
-    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')  # PostgreSQL in prod
-
-# Select config based on ENVIRONMENT
-if os.getenv('ENVIRONMENT') == 'prod':
-    config = ProductionConfig()
-else:
-    config = DevelopmentConfig()
+    ENVIRONMENT = 'prod'  # PostgreSQL in prod
+    CACHE_BACKEND = env('CACHE_BACKEND', 'lru')
+    USER_CACHE_TTL = env('USER_CACHE_TTL', 60, int)
+    DB_POOL_SIZE = env('DB_POOL_SIZE', 10, int)
+    DB_MAX_OVERFLOW = env('DB_MAX_OVERFLOW', 20, int)
+    DB_POOL_PRE_PING = env('DB_POOL_PRE_PING', True, flag)  # Survive server restarts/failovers
+    DB_STATEMENT_TIMEOUT = env('DB_STATEMENT_TIMEOUT', 30000, int)
+
+class TestingConfig(Config):
+    """Test configuration: a private in-memory database and no background jobs."""
+    ENVIRONMENT = 'test'
+    TESTING = True
+    SECRET_KEY = 'test-secret-key'
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_BINDS = {}
+    STATUS_SWEEP_INTERVAL = 0
+    STATS_RECONCILE_INTERVAL = 0
+    REMINDERS_ENABLED = False
+    CACHE_BACKEND = 'null'
+    USER_CACHE_TTL = 0
+
+CONFIGS = {'dev': DevelopmentConfig, 'prod': ProductionConfig, 'test': TestingConfig}
+
+def load_config(environment=None):
+    """
+    Loads the .env file and returns the configuration for ``environment``
+    (default: the ENVIRONMENT variable, falling back to development).
+    """
+    from dotenv import load_dotenv
+    load_dotenv()  # Variables already set in the environment take precedence
+    return CONFIGS.get(environment or os.getenv('ENVIRONMENT'), DevelopmentConfig)()
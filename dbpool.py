@@ -0,0 +1,76 @@
+"""
+dbpool module for TaskFlow application.
+Connection pool instrumentation and per-connection SQLite tuning.
+"""
+import threading
+import time
+from functools import partial
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that records how many checkouts it served and how long they waited."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self._record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self._record_wait(time.perf_counter() - start)
+        return connection
+
+    def _record_wait(self, seconds, timed_out=False):
+        with self._metrics_lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def stats(self):
+        """Returns a snapshot of the pool's occupancy and checkout statistics."""
+        return {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': max(self.overflow(), 0),
+            'checkouts': self.checkouts,
+            'timeouts': self.timeouts,
+            'wait_seconds_total': round(self.wait_seconds_total, 6),
+            'wait_seconds_max': round(self.wait_seconds_max, 6),
+        }
+
+
+def pool_stats(engine):
+    """Returns pool statistics for an engine, or just the pool type if it is not metered."""
+    if isinstance(engine.pool, MeteredQueuePool):
+        return engine.pool.stats()
+    return {'pool': type(engine.pool).__name__}
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine, config):
+    """Applies SQLITE_PRAGMAS to every new connection of a SQLite engine."""
+    pragmas = config.get('SQLITE_PRAGMAS')
+    if engine.dialect.name == 'sqlite' and pragmas:
+        event.listen(engine, 'connect', partial(_apply_pragmas, pragmas))
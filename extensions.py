@@ -0,0 +1,14 @@
+"""
+extensions module for TaskFlow application.
+Extension objects shared by the blueprints. They are created unbound at import
+time and attached to each application by create_app().
+"""
+from flask_login import LoginManager
+from cache import ResponseCache, IdentityCache
+
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'
+login_manager.login_message = None  # Suppress the default flash message
+
+response_cache = ResponseCache()
+identity_cache = IdentityCache()
@@ -0,0 +1,184 @@
+"""
+instrumentation module for TaskFlow application.
+Per-request timing, SQL statement accounting, template render timing and N+1 detection,
+exposed in the Prometheus text format and optionally as a Server-Timing header.
+"""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """Cumulative histogram in the shape Prometheus expects."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class Metrics:
+    """Thread-safe, process-local metric registry (one per gunicorn worker)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.request_statements = defaultdict(lambda: Histogram(STATEMENT_BUCKETS))
+        self.db_seconds = defaultdict(float)
+        self.render_seconds = defaultdict(float)
+        self.render_count = defaultdict(int)
+        self.n_plus_one = defaultdict(int)
+
+    def record_request(self, endpoint, seconds, statements, db_seconds, n_plus_one):
+        with self._lock:
+            self.request_latency[endpoint].observe(seconds)
+            self.request_statements[endpoint].observe(statements)
+            self.db_seconds[endpoint] += db_seconds
+            if n_plus_one:
+                self.n_plus_one[endpoint] += 1
+
+    def record_render(self, template, seconds):
+        with self._lock:
+            self.render_seconds[template] += seconds
+            self.render_count[template] += 1
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, help_text, histograms in (
+                ('taskflow_request_duration_seconds', 'Request latency by endpoint.', self.request_latency),
+                ('taskflow_request_db_statements', 'SQL statements per request by endpoint.', self.request_statements),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for endpoint, histogram in sorted(histograms.items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{name}_bucket{_labels(endpoint=endpoint, le=bound)} {count}')
+                    lines.append(f'{name}_bucket{_labels(endpoint=endpoint, le="+Inf")} {histogram.count}')
+                    lines.append(f'{name}_sum{_labels(endpoint=endpoint)} {histogram.sum}')
+                    lines.append(f'{name}_count{_labels(endpoint=endpoint)} {histogram.count}')
+            for name, help_text, label, values in (
+                ('taskflow_request_db_seconds_total', 'Time spent in SQL by endpoint.', 'endpoint', self.db_seconds),
+                ('taskflow_template_render_seconds_total', 'Time spent rendering by template.', 'template',
+                 self.render_seconds),
+                ('taskflow_template_renders_total', 'Template renders by template.', 'template', self.render_count),
+                ('taskflow_n_plus_one_requests_total', 'Requests that repeated an identical SQL statement.',
+                 'endpoint', self.n_plus_one),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for key, value in sorted(values.items()):
+                    lines.append(f'{name}{_labels(**{label: key})} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class Instrumentation:
+    """Collects request, SQL and template timings for an app and serves them at METRICS_PATH."""
+
+    def __init__(self):
+        self.metrics = Metrics()
+
+    def init_app(self, app, engines):
+        self.app = app
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app, weak=False)
+        template_rendered.connect(self._after_render, app, weak=False)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', self._metrics_view)
+
+    def _before_request(self):
+        g.instrumentation = {
+            'start': time.perf_counter(),
+            'statements': Counter(),
+            'db_seconds': 0.0,
+            'render_seconds': 0.0,
+        }
+
+    def _after_request(self, response):
+        stats = g.get('instrumentation')
+        if stats is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        if response.is_streamed:
+            # The body (and the queries feeding it) runs after this hook returns, so the
+            # request is only accounted for once the server closes the response. Its
+            # Server-Timing header would be sent before those numbers exist.
+            response.call_on_close(lambda: self._finish(stats, endpoint))
+            return response
+        g.pop('instrumentation')
+        elapsed = self._finish(stats, endpoint)
+        if self.app.config.get('SERVER_TIMING_HEADER'):
+            statements = sum(stats['statements'].values())
+            response.headers['Server-Timing'] = (
+                f'db;dur={stats["db_seconds"] * 1000:.1f};desc="{statements} queries", '
+                f'tpl;dur={stats["render_seconds"] * 1000:.1f}, '
+                f'app;dur={elapsed * 1000:.1f}'
+            )
+        return response
+
+    def _finish(self, stats, endpoint):
+        """Records a finished request's metrics and returns its elapsed time."""
+        elapsed = time.perf_counter() - stats['start']
+        statements = sum(stats['statements'].values())
+
+        threshold = self.app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+        repeated = [(sql, count) for sql, count in stats['statements'].items() if count >= threshold]
+        for sql, count in repeated:
+            logger.warning('Possible N+1 query in %s: statement ran %d times: %s', endpoint, count, sql)
+
+        self.metrics.record_request(endpoint, elapsed, statements, stats['db_seconds'], bool(repeated))
+        return elapsed
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+        stats = g.get('instrumentation') if has_request_context() else None
+        if stats is not None:
+            stats['statements'][statement] += 1
+            stats['db_seconds'] += elapsed
+
+    def _before_render(self, sender, template, context, **extra):
+        if has_request_context():
+            g.setdefault('render_starts', []).append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        starts = g.get('render_starts') if has_request_context() else None
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        self.metrics.record_render(template.name or 'string', elapsed)
+        stats = g.get('instrumentation')
+        # Nested renders are already included in their parent's time
+        if stats is not None and not starts:
+            stats['render_seconds'] += elapsed
+
+    def _metrics_view(self):
+        return self.app.response_class(self.metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,453 @@
+"""
+loadtest module for TaskFlow application.
+Synthetic data generation and a benchmark driver for the main routes, with JSON results
+that can be compared between commits:
+
+    python loadtest.py --users 2 --tasks 100000 --output results.json
+    python loadtest.py --tasks 100000 --compare results.json
+    python loadtest.py --startup 20 --output startup.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, build_opener
+from flask import render_template
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from werkzeug.serving import WSGIRequestHandler, make_server
+from models import db, User, Task, TaskView, TASK_VIEW_COLUMNS
+
+LOADTEST_PASSWORD = 'loadtest-password'
+# Seeding thousands of users should not be dominated by the KDF; the hash is upgraded at login
+SEED_HASH_METHOD = 'pbkdf2:sha256:1000'
+BATCH_SIZE = 1000
+# Tasks loaded and rendered at once when comparing Task instances with TaskViews
+READ_MODEL_TASKS = 20000
+
+DESCRIPTIONS = (
+    None,
+    'Follow up with the team.',
+    'Review the draft and leave comments before the meeting.',
+    'Blocked until the previous step is done. ' * 4,
+)
+
+# Run in a fresh interpreter per sample; prints the seconds spent in each startup phase.
+# 'preloaded_worker' forks after create_app(), as gunicorn --preload does, and times the
+# child's first request.
+STARTUP_PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+phases = {'import': imported - start, 'create_app': created - imported}
+if hasattr(os, 'fork'):
+    read_end, write_end = os.pipe()
+    forked = time.perf_counter()
+    if os.fork() == 0:
+        app.test_client().get(sys.argv[1])
+        os.write(write_end, repr(time.perf_counter() - forked).encode())
+        os._exit(0)
+    os.wait()
+    phases['preloaded_worker'] = float(os.read(read_end, 64))
+first_request = time.perf_counter()
+status = app.test_client().get(sys.argv[1]).status_code
+phases['first_request'] = time.perf_counter() - first_request
+print(json.dumps(dict(phases, status=status)))
+"""
+
+
+def generate_tasks(user_id, count, rng, now):
+    """
+    Yields Task column values for ``count`` synthetic tasks. Tasks were created over
+    the past year, start within a few days of creation, are usually due a week or
+    two after starting, and are more likely completed the older they are.
+    """
+    for number in range(1, count + 1):
+        created_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        start_date = None
+        if rng.random() >= 0.05:
+            start_date = (created_at + timedelta(days=rng.expovariate(1 / 3))).replace(
+                hour=0, minute=0, second=0, microsecond=0)
+        due_date = None
+        if rng.random() >= 0.15:
+            due_date = (start_date or created_at) + timedelta(days=int(rng.lognormvariate(2, 0.8)))
+        if start_date is not None and start_date > now:
+            status = 'Not started'
+        elif rng.random() < min((now - created_at).days / 60, 0.9):
+            status = 'Completed'
+        else:
+            status = 'Pending'
+        yield {
+            'title': f'Task {number}',
+            'description': rng.choice(DESCRIPTIONS),
+            'status': status,
+            'created_at': created_at,
+            'start_date': start_date,
+            'due_date': due_date,
+            'user_id': user_id,
+        }
+
+
+def seed_database(users, tasks_per_user, seed=0):
+    """
+    Creates ``users`` users named loadtest<N> with ``tasks_per_user`` tasks each,
+    skipping users that already exist. Returns their usernames.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    usernames = []
+    for index in range(users):
+        username = f'loadtest{index}'
+        usernames.append(username)
+        if User.query.filter_by(username=username).first() is not None:
+            continue
+        user_id = db.session.execute(db.insert(User).values(
+            username=username, email=f'{username}@example.com',
+            password_hash=generate_password_hash(LOADTEST_PASSWORD, SEED_HASH_METHOD),
+        )).inserted_primary_key[0]
+        batch = []
+        for values in generate_tasks(user_id, tasks_per_user, rng, now):
+            batch.append(values)
+            if len(batch) >= BATCH_SIZE:
+                db.session.execute(db.insert(Task), batch)
+                batch = []
+        if batch:
+            db.session.execute(db.insert(Task), batch)
+        db.session.commit()
+    return usernames
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, **extra):
+    """Latency percentiles (milliseconds) and throughput for a list of timings in seconds."""
+    if not latencies:
+        return dict(extra, requests=0)
+    return dict(
+        extra,
+        requests=len(latencies),
+        p50_ms=round(percentile(latencies, 50) * 1000, 3),
+        p99_ms=round(percentile(latencies, 99) * 1000, 3),
+        mean_ms=round(sum(latencies) / len(latencies) * 1000, 3),
+        max_ms=round(max(latencies) * 1000, 3),
+        throughput_per_s=round(len(latencies) / elapsed, 1) if elapsed else None,
+    )
+
+
+@contextmanager
+def count_queries(engine):
+    """Counts the SQL statements an engine executes inside the block."""
+    counter = {'queries': 0}
+
+    def after_cursor_execute(*args):
+        counter['queries'] += 1
+
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def benchmark_routes(app, engine, username, routes, iterations):
+    """Requests each route ``iterations`` times through the Flask test client."""
+    client = app.test_client()
+    client.post('/login', data={'username': username, 'password': LOADTEST_PASSWORD})
+    results = {}
+    for name, path in routes.items():
+        client.get(path)  # Warm up templates and caches
+        latencies = []
+        with count_queries(engine) as counter:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                request_start = time.perf_counter()
+                response = client.get(path)
+                response.get_data()  # Drain streamed bodies
+                latencies.append(time.perf_counter() - request_start)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{path} returned {response.status_code}')
+            elapsed = time.perf_counter() - start
+        results[name] = summarize(latencies, elapsed, queries_per_request=counter['queries'] / iterations)
+    return results
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Request handler that does not log every request."""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def benchmark_server(app, username, routes, concurrency, duration):
+    """Drives each route with ``concurrency`` threads for ``duration`` seconds over a local WSGI server."""
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.port}'
+    opener = build_opener(HTTPCookieProcessor(CookieJar()))
+    opener.open(f'{base_url}/login', urlencode(
+        {'username': username, 'password': LOADTEST_PASSWORD}).encode()).read()
+
+    results = {}
+    try:
+        for name, path in routes.items():
+            latencies = []
+            errors = []
+            deadline = time.perf_counter() + duration
+
+            def worker():
+                while time.perf_counter() < deadline:
+                    request_start = time.perf_counter()
+                    try:
+                        opener.open(base_url + path).read()
+                    except (HTTPError, URLError) as e:
+                        errors.append(e)
+                        continue
+                    latencies.append(time.perf_counter() - request_start)
+
+            start = time.perf_counter()
+            threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results[name] = summarize(latencies, time.perf_counter() - start, errors=len(errors))
+    finally:
+        server.shutdown()
+    return results
+
+
+def benchmark_functions(app, load_user, username, iterations):
+    """Times load_user() and Task.get_effective_status() outside of any route."""
+    results = {}
+    with app.test_request_context():
+        user_id = User.query.filter_by(username=username).one().id
+        latencies = []
+        with count_queries(db.engine) as counter:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                db.session.expunge_all()  # As in a fresh request
+                call_start = time.perf_counter()
+                load_user(str(user_id))
+                latencies.append(time.perf_counter() - call_start)
+            elapsed = time.perf_counter() - start
+        results['load_user'] = summarize(latencies, elapsed, queries_per_request=counter['queries'] / iterations)
+
+        # One call per task on a full page, as the task list template would
+        tasks = Task.query.filter_by(user_id=user_id).limit(BATCH_SIZE).all()
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(iterations):
+            call_start = time.perf_counter()
+            for task in tasks:
+                task.get_effective_status()
+            latencies.append(time.perf_counter() - call_start)
+        results['get_effective_status'] = summarize(latencies, time.perf_counter() - start,
+                                                    calls_per_iteration=len(tasks))
+    return results
+
+
+def benchmark_startup(runs, database, path='/health'):
+    """
+    Times ``runs`` cold starts, each in a new interpreter: importing the app module,
+    create_app() and serving ``path`` once (the first request opens the first database
+    connection). 'total' is the cold start of one process and 'process' the wall time
+    of the whole interpreter; 'preloaded_worker' is what a worker forked from a
+    preloaded master pays instead.
+    """
+    env = dict(os.environ, DATABASE_URL=database)
+    env.setdefault('SECRET_KEY', 'loadtest')
+    timings = defaultdict(list)
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP_PROBE, path], capture_output=True, text=True,
+                                check=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        timings['process'].append(time.perf_counter() - start)
+        phases = json.loads(output.splitlines()[-1])
+        if phases.pop('status') >= 500:
+            raise RuntimeError(f'{path} failed during the startup benchmark.')
+        for name, seconds in phases.items():
+            timings[name].append(seconds)
+        timings['total'].append(phases['import'] + phases['create_app'] + phases['first_request'])
+    return {name: summarize(values, None) for name, values in timings.items()}
+
+
+def load_task_list(user_id, limit, orm):
+    """A user's first ``limit`` tasks, as Task instances or as TaskViews."""
+    if orm:
+        return Task.query.filter_by(user_id=user_id).order_by(Task.id).limit(limit).all()
+    rows = db.session.execute(
+        db.select(*TASK_VIEW_COLUMNS).where(Task.user_id == user_id).order_by(Task.id).limit(limit))
+    return [TaskView._make(row) for row in rows]
+
+
+def benchmark_read_models(app, username, iterations, limit=READ_MODEL_TASKS):
+    """
+    Compares Task instances with TaskViews for up to ``limit`` of a user's tasks: the
+    memory each task takes while the list is held, and the time to load the list and
+    render it as task cards.
+    """
+    results = {}
+    with app.test_request_context():
+        user_id = User.query.filter_by(username=username).one().id
+        for name, orm in (('orm', True), ('task_view', False)):
+            # Warm up statement and template caches, so only the list itself is traced
+            render_template('_task_cards.html', tasks=load_task_list(user_id, limit, orm))
+            db.session.expunge_all()
+            tracemalloc.start()
+            tasks = load_task_list(user_id, limit, orm)
+            allocated = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            count = len(tasks)
+            del tasks
+            db.session.expunge_all()
+
+            latencies = []
+            start = time.perf_counter()
+            for _ in range(iterations):
+                call_start = time.perf_counter()
+                render_template('_task_cards.html', tasks=load_task_list(user_id, limit, orm))
+                latencies.append(time.perf_counter() - call_start)
+                db.session.expunge_all()  # As in a fresh request
+            results[name] = summarize(latencies, time.perf_counter() - start, tasks=count,
+                                      bytes_per_task=round(allocated / count) if count else None)
+    return results
+
+
+def default_routes(now):
+    """The routes benchmarked by default, keyed by a stable name for comparisons."""
+    month_start = now.replace(day=1).date()
+    return {
+        'index': '/',
+        'index_sorted_due': '/?sort=due',
+        'index_overdue': '/?overdue=1',
+        'api_tasks_month': f'/api/tasks?start={month_start}&end={month_start + timedelta(days=42)}',
+        'api_tasks_all': '/api/tasks',
+    }
+
+
+def git_revision():
+    """Returns the current commit hash, or None outside of a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(app, load_user, users=1, tasks=10000, iterations=50, concurrency=4, duration=5.0, seed=0,
+        routes=None):
+    """Seeds the database and runs every benchmark, returning JSON-serializable results."""
+    with app.app_context():
+        db.create_all()
+        usernames = seed_database(users, tasks, seed)
+        engine = db.engine
+    routes = routes or default_routes(datetime.utcnow())
+    # Requests push their own app contexts, as they do in production
+    results = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'database': engine.dialect.name,
+        'parameters': {
+            'users': users, 'tasks_per_user': tasks, 'iterations': iterations,
+            'concurrency': concurrency, 'duration': duration, 'seed': seed,
+            'cache_backend': app.config.get('CACHE_BACKEND'),
+        },
+        'routes': benchmark_routes(app, engine, usernames[0], routes, iterations),
+        'functions': benchmark_functions(app, load_user, usernames[0], iterations),
+        # Each iteration renders a whole account's worth of cards, so run fewer of them
+        'read_models': benchmark_read_models(app, usernames[0], max(1, iterations // 10)),
+    }
+    if concurrency and duration:
+        results['server'] = benchmark_server(app, usernames[0], routes, concurrency, duration)
+    return results
+
+
+def compare(baseline, current, tolerance):
+    """
+    Yields (name, metric, before, after, regressed) for every latency measured in both
+    result sets; regressed is True when ``after`` is more than ``tolerance`` slower.
+    """
+    for section in ('routes', 'functions', 'read_models', 'server', 'startup'):
+        for name, after in current.get(section, {}).items():
+            before = baseline.get(section, {}).get(name)
+            if not before:
+                continue
+            for metric in ('p50_ms', 'p99_ms'):
+                if metric in before and metric in after:
+                    regressed = after[metric] > before[metric] * (1 + tolerance)
+                    yield f'{section}.{name}', metric, before[metric], after[metric], regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark TaskFlow routes against synthetic data.')
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--tasks', type=int, default=10000, help='Tasks per user')
+    parser.add_argument('--iterations', type=int, default=50, help='Requests per route through the test client')
+    parser.add_argument('--concurrency', type=int, default=4, help='Threads driving the local server (0 skips it)')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per route against the local server')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--database', help='Database URL (default: a fresh temporary SQLite file)')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Fraction a latency may grow before counting as a regression')
+    parser.add_argument('--startup', type=int, default=0, metavar='RUNS',
+                        help='Time this many cold starts in new processes instead of the route benchmarks')
+    args = parser.parse_args(argv)
+
+    # The app reads its configuration when it is created
+    os.environ['DATABASE_URL'] = args.database or f'sqlite:///{tempfile.mkdtemp()}/loadtest.db'
+    os.environ.setdefault('SECRET_KEY', 'loadtest')
+    if args.startup:
+        results = {
+            'revision': git_revision(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'parameters': {'startup_runs': args.startup},
+            'startup': benchmark_startup(args.startup, os.environ['DATABASE_URL']),
+        }
+    else:
+        from app import create_app
+        from auth import load_user
+        results = run(create_app(), load_user, args.users, args.tasks, args.iterations, args.concurrency,
+                      args.duration, args.seed)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        for name, metric, before, after, regressed in compare(baseline, results, args.tolerance):
+            regressions += regressed
+            print(f'{name:40} {metric:7} {before:10.3f} -> {after:10.3f}{"  REGRESSED" if regressed else ""}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,13 +2,18 @@
 models module for TaskFlow application.
 Defines the User and Task models with relationships and authentication methods.
 """
-from datetime import datetime
+from collections import namedtuple
+from datetime import datetime, time, timedelta
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import make_transient_to_detached
+from routing import RoutingSession
+from passwords import hash_password, verify_password, needs_rehash
 
-# Initialize SQLAlchemy
-db = SQLAlchemy()
+# Initialize SQLAlchemy; the session sends read-only requests to replicas when configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+TASK_STATUSES = ('Not started', 'Pending', 'Completed')
 
 class User(db.Model, UserMixin):
     """
@@ -19,8 +24,13 @@ class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)  # Room for scrypt hashes
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped whenever the user's tasks or profile change; drives HTTP caching of task views
+    # and numbers the changes to the user's tasks for incremental sync. Only bump it through
+    # changes.next_seq(), which bumps once per transaction
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     tasks = db.relationship('Task', backref='author', lazy=True)
 
     def __init__(self, **kwargs):
@@ -35,11 +45,31 @@ class User(db.Model, UserMixin):
         """Hashes and stores the password."""
         if not password:
             raise ValueError("Password cannot be empty")
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        """Verifies the password against the stored hash."""
-        return check_password_hash(self.password_hash, password)
+        """
+        Verifies the password against the stored hash. A correct password whose hash
+        uses outdated parameters is transparently rehashed; the caller commits.
+        """
+        if not verify_password(self.password_hash, password):
+            return False
+        if needs_rehash(self.password_hash):
+            self.password_hash = hash_password(password)
+        return True
+
+    def snapshot(self):
+        """Returns the user's column values, for caching outside the session."""
+        return {column.key: getattr(self, column.key) for column in self.__table__.columns}
+
+    @classmethod
+    def from_snapshot(cls, data):
+        """Rebuilds a detached User from snapshot() output without querying the database."""
+        user = cls.__mapper__.class_manager.new_instance()
+        for key, value in data.items():
+            setattr(user, key, value)
+        make_transient_to_detached(user)
+        return user
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -50,6 +80,25 @@ class Task(db.Model):
     Task model with user association.
     """
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Calendar windowing and index sorting/pagination scan a user's tasks by date
+        db.Index('ix_tasks_user_created_at', 'user_id', 'created_at'),
+        db.Index('ix_tasks_user_start_date', 'user_id', 'start_date'),
+        db.Index('ix_tasks_user_due_date', 'user_id', 'due_date'),
+        # Status/overdue filters narrow a user's tasks by status, then due date
+        db.Index('ix_tasks_user_status_due_date', 'user_id', 'status', 'due_date'),
+        # The reminder scheduler reads upcoming start/due dates across all users by range
+        db.Index('ix_tasks_due_date', 'due_date'),
+        db.Index('ix_tasks_start_date', 'start_date'),
+        # The status sweep looks up 'Not started' tasks by start date
+        db.Index('ix_tasks_status_start_date', 'status', 'start_date'),
+        # Calendar expansion looks up a user's recurring series without scanning their other tasks
+        db.Index('ix_tasks_user_recurrence', 'user_id', 'recurrence'),
+        # At most one exception row per occurrence of a series
+        db.UniqueConstraint('recurrence_parent_id', 'occurrence_date', name='uq_tasks_occurrence'),
+        # Incremental sync reads a user's tasks changed after a sequence number
+        db.Index('ix_tasks_user_change_seq', 'user_id', 'change_seq'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -59,22 +108,160 @@ class Task(db.Model):
     start_date = db.Column(db.DateTime, default=datetime.utcnow)
     due_date = db.Column(db.DateTime)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    # Recurrence rule of a series ('daily', 'weekly' or 'monthly'); start_date/due_date
+    # are those of the first occurrence
+    recurrence = db.Column(db.String(10))
+    recurrence_interval = db.Column(db.Integer)
+    recurrence_until = db.Column(db.DateTime)
+    recurrence_count = db.Column(db.Integer)
+    # Set on exception rows: a completed or edited occurrence of a series, by its original start
+    recurrence_parent_id = db.Column(db.Integer, db.ForeignKey('tasks.id'))
+    occurrence_date = db.Column(db.DateTime)
+    # The owner's version when the task was last inserted or updated, set by the changes module
+    change_seq = db.Column(db.Integer, nullable=False, default=0)
 
     def get_effective_status(self):
         """Returns the effective status based on start date and current status."""
         if self.status == 'Completed':
             return 'Completed'
+        return self.status_from_start_date(self.start_date)
 
-        if not self.start_date:
+    def recurrence_summary(self):
+        """Describes the recurrence rule, e.g. 'Every 2 weeks, 10 times', or None for one-off tasks."""
+        if not self.recurrence:
+            return None
+        interval = self.recurrence_interval or 1
+        unit = {'daily': 'day', 'weekly': 'week', 'monthly': 'month'}[self.recurrence]
+        summary = f'Every {unit}' if interval == 1 else f'Every {interval} {unit}s'
+        if self.recurrence_until:
+            summary += f" until {self.recurrence_until.strftime('%Y-%m-%d')}"
+        if self.recurrence_count:
+            summary += f', {self.recurrence_count} times'
+        return summary
+
+    @staticmethod
+    def status_from_start_date(start_date):
+        """Returns the status of an open task with the given start date."""
+        if not start_date:
             return 'Not started'
 
         current_date = datetime.utcnow().date()
-        start_date = self.start_date.date()
 
-        if current_date < start_date:
+        if current_date < start_date.date():
             return 'Not started'
         else:
             return 'Pending'
 
+    @classmethod
+    def sweep_started(cls, now=None):
+        """
+        Materializes the 'Not started' -> 'Pending' transition for every task whose
+        start date has arrived, in one set-based UPDATE. Returns the number of tasks changed.
+        """
+        now = now or datetime.utcnow()
+        # Matches get_effective_status(): a task is pending from the start of its start day
+        cutoff = datetime.combine(now.date() + timedelta(days=1), time.min)
+        starting = db.select(cls.user_id).where(cls.status == 'Not started', cls.start_date < cutoff)
+        db.session.execute(
+            db.update(User)
+            .where(User.id.in_(starting))
+            .values(version=User.version + 1, updated_at=now)
+        )
+        # The statistics count stored statuses; recompute the owners' counters on their next read
+        db.session.execute(db.update(UserStats).where(UserStats.user_id.in_(starting)).values(as_of=None))
+        result = db.session.execute(
+            db.update(cls)
+            .where(cls.status == 'Not started', cls.start_date < cutoff)
+            .values(
+                status='Pending',
+                # The owner's version bumped above, so sync clients see the new status
+                change_seq=db.select(User.version).where(User.id == cls.user_id).scalar_subquery(),
+            )
+        )
+        return result.rowcount
+
     def __repr__(self):
         return f'<Task {self.title} (Status: {self.status})>'
+
+
+class TaskView(namedtuple('TaskView', 'id title description status created_at start_date due_date '
+                                      'recurrence recurrence_interval recurrence_until recurrence_count')):
+    """
+    Read-only task for list pages, fragments and search results. A plain tuple built
+    from a column query, without the instance state, identity map entry and change
+    tracking of a Task; it offers the attributes and methods the templates use.
+    """
+    __slots__ = ()
+
+    def get_effective_status(self):
+        """Returns the effective status based on start date and current status."""
+        if self.status == 'Completed':
+            return 'Completed'
+        return Task.status_from_start_date(self.start_date)
+
+    # Only reads the recurrence columns, which a TaskView has too
+    recurrence_summary = Task.recurrence_summary
+
+    def __repr__(self):
+        return f'<TaskView {self.title} (Status: {self.status})>'
+
+# Select these (e.g. with Query.with_entities()) and build each row with TaskView._make()
+TASK_VIEW_COLUMNS = tuple(getattr(Task, name) for name in TaskView._fields)
+
+
+class TaskTombstone(db.Model):
+    """
+    Record of a deleted task, so incremental sync clients can observe the delete.
+    Pruned after the sync retention period.
+    """
+    __tablename__ = 'task_tombstones'
+    __table_args__ = (
+        db.Index('ix_task_tombstones_user_change_seq', 'user_id', 'change_seq'),
+        db.Index('ix_task_tombstones_deleted_at', 'deleted_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, nullable=False)  # Not a foreign key: the row is gone
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    change_seq = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TaskTombstone {self.task_id} (Seq: {self.change_seq})>'
+
+
+class UserStats(db.Model):
+    """
+    Precomputed per-user task counters, kept up to date by the stats module.
+    Counters depend on the current date, so a row is only valid on its as_of day.
+    """
+    __tablename__ = 'user_stats'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    not_started = db.Column(db.Integer, nullable=False, default=0)
+    pending = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    overdue = db.Column(db.Integer, nullable=False, default=0)
+    due_soon = db.Column(db.Integer, nullable=False, default=0)  # Due within the next DUE_SOON_DAYS days
+    as_of = db.Column(db.Date)  # NULL marks the row for recomputation
+
+    def __repr__(self):
+        return f'<UserStats {self.user_id} as of {self.as_of}>'
+
+
+class SchedulerState(db.Model):
+    """
+    Persistent state of a background scheduler: the lease naming the worker that
+    owns it, and how far it has delivered.
+    """
+    __tablename__ = 'scheduler_state'
+
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100))
+    lease_until = db.Column(db.DateTime)
+    # Keyset position (column value, task id) of the last delivered event
+    cursor_time = db.Column(db.DateTime)
+    cursor_id = db.Column(db.Integer)
+
+    def __repr__(self):
+        return f'<SchedulerState {self.name} owned by {self.owner}>'
@@ -0,0 +1,105 @@
+"""
+passwords module for TaskFlow application.
+Password hashing with configurable cost, outdated-hash detection and a bounded worker pool.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Werkzeug's own default, so existing hashes are not considered outdated
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+BENCHMARK_METHODS = (
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+)
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when no hashing slot frees up within PASSWORD_HASH_TIMEOUT seconds."""
+
+
+_lock = threading.Lock()
+_pool = None  # (pid, executor, semaphore), created lazily in each worker process
+
+
+def _config(name, default):
+    return current_app.config.get(name, default) if has_app_context() else default
+
+
+def hash_method():
+    """Returns the configured werkzeug hash method, including its cost parameters."""
+    return _config('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+
+def _get_pool(workers):
+    global _pool
+    with _lock:
+        # Pools do not survive a fork, so each gunicorn worker builds its own
+        if _pool is None or _pool[0] != os.getpid():
+            _pool = (os.getpid(), ThreadPoolExecutor(workers, thread_name_prefix='password-hash'),
+                     threading.BoundedSemaphore(workers))
+        return _pool[1], _pool[2]
+
+
+def _run(func, *args):
+    """
+    Runs a hashing function, on the bounded pool when PASSWORD_HASH_WORKERS is set.
+    Werkzeug's KDFs run in hashlib, which releases the GIL, so threads are enough.
+    The request thread waits for the result, and the bound is per process: it only
+    limits hashing when a worker serves concurrent requests (threaded or async
+    workers). Under sync workers, the number of workers is the bound.
+    """
+    workers = _config('PASSWORD_HASH_WORKERS', 0)
+    if not workers:
+        return func(*args)
+    pool, slots = _get_pool(workers)
+    if not slots.acquire(timeout=_config('PASSWORD_HASH_TIMEOUT', 5)):
+        raise PasswordHashingBusy()
+    try:
+        return pool.submit(func, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(password):
+    """Hashes a password with the configured method."""
+    return _run(generate_password_hash, password, hash_method())
+
+
+def verify_password(pwhash, password):
+    """Checks a password against a stored hash."""
+    return _run(check_password_hash, pwhash, password)
+
+
+@lru_cache(maxsize=None)
+def method_prefix(method):
+    """
+    The method prefix werkzeug writes into hashes made with ``method``. Short forms
+    such as 'scrypt' or 'pbkdf2:sha256' are written with their default costs filled
+    in, so this hashes a probe once per method and reads the prefix back.
+    """
+    return generate_password_hash('probe', method).split('$', 1)[0]
+
+
+def needs_rehash(pwhash):
+    """Returns True if a stored hash was made with a different method or cost than configured."""
+    return pwhash.split('$', 1)[0] != method_prefix(hash_method())
+
+
+def benchmark(method, duration=1.0):
+    """Returns how many hashes per second one thread on this host manages with ``method``."""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        generate_password_hash('benchmark-password', method)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= duration:
+            return count / elapsed
@@ -0,0 +1,98 @@
+"""
+recurrence module for TaskFlow application.
+Recurrence rules stored on a single task row and expanded into occurrences only
+for the date window being displayed. Occurrences that are completed or edited
+are materialized as exception rows pointing back at their series.
+"""
+import calendar
+from datetime import datetime, time, timedelta
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+# Upper bound on the occurrences one series yields for a single window
+MAX_WINDOW_OCCURRENCES = 1000
+
+
+def add_months(value, months):
+    """Shifts a datetime by whole months, clamping the day to the end of shorter months."""
+    month_index = value.month - 1 + months
+    year, month = value.year + month_index // 12, month_index % 12 + 1
+    return value.replace(year=year, month=month, day=min(value.day, calendar.monthrange(year, month)[1]))
+
+
+def validate_rule(frequency, interval, until, count, start_date):
+    """Checks a recurrence rule's values. Raises ValueError on bad input."""
+    if frequency not in FREQUENCIES:
+        raise ValueError('Repeat must be daily, weekly or monthly.')
+    if start_date is None:
+        raise ValueError('A repeating task needs a start date.')
+    if not isinstance(interval, int) or interval < 1:
+        raise ValueError('Repeat interval must be a positive whole number.')
+    if count is not None and (not isinstance(count, int) or count < 1):
+        raise ValueError('Number of occurrences must be a positive whole number.')
+    if until is not None and until < start_date:
+        raise ValueError('Repeat end date must not be before the start date.')
+
+
+class Rule:
+    """The recurrence of a series task: when its occurrences start and how long each lasts."""
+
+    def __init__(self, task):
+        self.start = task.start_date
+        self.frequency = task.recurrence
+        self.interval = task.recurrence_interval or 1
+        self.until = task.recurrence_until
+        self.count = task.recurrence_count
+        self.duration = task.due_date - task.start_date if task.due_date else None
+
+    def nth(self, n):
+        """
+        Start of the ``n``-th occurrence, counting from 0. Computed from the series
+        start, so monthly rules keep their day of month after a clamped short month.
+        """
+        if self.frequency == 'monthly':
+            return add_months(self.start, n * self.interval)
+        days = self.interval * (7 if self.frequency == 'weekly' else 1)
+        return self.start + timedelta(days=n * days)
+
+    def first_index(self, moment):
+        """The smallest n whose occurrence starts at or after ``moment``."""
+        if moment <= self.start:
+            return 0
+        if self.frequency == 'monthly':
+            months = (moment.year - self.start.year) * 12 + moment.month - self.start.month
+            n = max(months // self.interval - 1, 0)
+        else:
+            step = timedelta(days=self.interval * (7 if self.frequency == 'weekly' else 1))
+            n = (moment - self.start) // step
+        while self.nth(n) < moment:
+            n += 1
+        return n
+
+    def valid(self, n, start):
+        """Whether occurrence ``n`` (starting at ``start``) is within the rule's end date and count."""
+        if self.count is not None and n >= self.count:
+            return False
+        return self.until is None or start.date() <= self.until.date()
+
+    def occurrences(self, window_start=None, window_end=None):
+        """
+        Yields (start, due) for the occurrences overlapping [window_start, window_end),
+        with the same overlap rule as tasks_in_window(). Only the occurrences in the
+        window are computed, however long the series has been running.
+        """
+        earliest = window_start
+        if earliest is not None and self.duration:
+            # An occurrence that started earlier may still run into the window
+            earliest -= self.duration
+        n = self.first_index(earliest) if earliest is not None else 0
+        for n in range(n, n + MAX_WINDOW_OCCURRENCES):
+            start = self.nth(n)
+            if not self.valid(n, start) or (window_end is not None and start >= window_end):
+                return
+            yield start, start + self.duration if self.duration is not None else None
+
+    def occurrence_on(self, day):
+        """Returns the start of the occurrence starting on date ``day``, or None."""
+        n = self.first_index(datetime.combine(day, time.min))
+        start = self.nth(n)
+        return start if start.date() == day and self.valid(n, start) else None
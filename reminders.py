@@ -0,0 +1,245 @@
+"""
+reminders module for TaskFlow application.
+Start-date and due-date reminders. A background worker keeps upcoming events in a
+min-heap, loaded in bounded batches by indexed range queries, and hands them to
+pluggable notifiers once they fall due. Its position is persisted so restarts
+resume where it left off, and a database lease lets only one worker across all
+processes run it.
+"""
+import heapq
+import logging
+import os
+import socket
+import time
+import urllib.request
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import import_string
+from models import db, Task, SchedulerState
+from serializers import dumps
+
+logger = logging.getLogger(__name__)
+
+Reminder = namedtuple('Reminder', 'kind task_id user_id title at')
+
+# Reminder kind -> the task column it follows
+EVENT_COLUMNS = {'start': Task.start_date, 'due': Task.due_date}
+LOCK_NAME = 'reminders'
+
+
+class Notifier:
+    """Interface for reminder delivery channels."""
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds the notifier from the application config."""
+        return cls()
+
+    def notify(self, reminder):
+        """Delivers one Reminder. Exceptions are logged and do not stop other deliveries."""
+        raise NotImplementedError
+
+
+class LogNotifier(Notifier):
+    """Logs reminders instead of delivering them, for local development."""
+
+    def notify(self, reminder):
+        logger.info('Reminder for user %s: task %s (%r) %s on %s', reminder.user_id, reminder.task_id,
+                    reminder.title, 'starts' if reminder.kind == 'start' else 'is due', reminder.at.date())
+
+
+class WebhookNotifier(Notifier):
+    """POSTs each reminder as JSON to REMINDER_WEBHOOK_URL."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, config):
+        if not config.get('REMINDER_WEBHOOK_URL'):
+            raise ValueError('The webhook notifier needs REMINDER_WEBHOOK_URL.')
+        return cls(config['REMINDER_WEBHOOK_URL'], config.get('REMINDER_WEBHOOK_TIMEOUT', 5))
+
+    def notify(self, reminder):
+        body = dumps(dict(reminder._asdict(), at=reminder.at.isoformat()))
+        request = urllib.request.Request(self.url, data=body, method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+NOTIFIERS = {'log': LogNotifier, 'webhook': WebhookNotifier}
+
+
+def notifiers_from_config(config):
+    """Builds the notifiers named in REMINDER_NOTIFIERS (comma-separated names or import strings)."""
+    names = [name.strip() for name in config.get('REMINDER_NOTIFIERS', 'log').split(',') if name.strip()]
+    return [(NOTIFIERS.get(name) or import_string(name)).from_config(config) for name in names]
+
+
+class ReminderScheduler:
+    """
+    Fires reminders for task start and due dates, each ``leads[kind]`` ahead of the
+    date. Call tick() repeatedly; it returns how long to sleep before the next call.
+
+    Each refresh reloads the heap with the events between the persisted cursor and
+    ``lookahead`` past now, at most ``batch_size`` per kind, so a tick never reads
+    more than that window. Events are re-checked against their task just before
+    delivery, which drops completed, deleted and rescheduled tasks. Tasks created
+    or rescheduled into the window are picked up by the next refresh. Delivery is
+    at least once: a worker that dies between notifying and saving its cursor
+    sends those reminders again after a restart.
+    """
+
+    def __init__(self, notifiers, leads=None, lookahead=3600, refresh_interval=60, batch_size=500,
+                 lease_seconds=60, owner=None):
+        self.notifiers = notifiers
+        self.leads = leads or {'start': timedelta(0), 'due': timedelta(days=1)}
+        self.lookahead = timedelta(seconds=lookahead)
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.owner = owner or f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.owning = False
+        self.heap = []  # (fire_at, kind, event time, task id)
+        self.cursors = {}  # kind -> (event time, task id) of the last delivered event
+        self.truncated = False  # Whether the last refresh hit batch_size for some kind
+        self.refreshed_at = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds the scheduler from the REMINDER_* settings."""
+        return cls(
+            notifiers_from_config(config),
+            leads={'start': timedelta(seconds=config.get('REMINDER_START_LEAD', 0)),
+                   'due': timedelta(seconds=config.get('REMINDER_DUE_LEAD', 86400))},
+            lookahead=config.get('REMINDER_LOOKAHEAD', 3600),
+            refresh_interval=config.get('REMINDER_REFRESH_INTERVAL', 60),
+            batch_size=config.get('REMINDER_BATCH_SIZE', 500),
+            lease_seconds=config.get('REMINDER_LEASE_SECONDS', 60),
+        )
+
+    # --- Ownership ---
+    def acquire(self, now):
+        """Takes or renews the scheduler lease. Returns whether this worker owns the scheduler."""
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+        result = db.session.execute(
+            db.update(SchedulerState)
+            .where(SchedulerState.name == LOCK_NAME,
+                   db.or_(SchedulerState.owner == self.owner, SchedulerState.lease_until.is_(None),
+                          SchedulerState.lease_until < now))
+            .values(owner=self.owner, lease_until=lease_until)
+        )
+        owned = result.rowcount == 1
+        if not owned and db.session.get(SchedulerState, LOCK_NAME) is None:
+            db.session.add(SchedulerState(name=LOCK_NAME, owner=self.owner, lease_until=lease_until))
+            owned = True
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created the lease row first
+            db.session.rollback()
+            owned = False
+        if owned and not self.owning:
+            # The previous owner may have delivered further than this worker knows
+            self.load_cursors(now)
+        self.owning = owned
+        return owned
+
+    def load_cursors(self, now):
+        """Reads the persisted cursors; a new scheduler starts from now rather than the past."""
+        for kind in EVENT_COLUMNS:
+            state = db.session.get(SchedulerState, f'{LOCK_NAME}.{kind}')
+            if state is None:
+                state = SchedulerState(name=f'{LOCK_NAME}.{kind}', cursor_time=now + self.leads[kind], cursor_id=0)
+                db.session.add(state)
+            self.cursors[kind] = (state.cursor_time, state.cursor_id)
+        db.session.commit()
+        self.heap = []
+        self.refreshed_at = None
+
+    def save_cursors(self):
+        for kind, (cursor_time, cursor_id) in self.cursors.items():
+            db.session.execute(
+                db.update(SchedulerState)
+                .where(SchedulerState.name == f'{LOCK_NAME}.{kind}')
+                .values(cursor_time=cursor_time, cursor_id=cursor_id)
+            )
+        db.session.commit()
+
+    # --- Loading ---
+    def refresh(self, now):
+        """Rebuilds the heap from one indexed range query per kind."""
+        events = []
+        self.truncated = False
+        for kind, column in EVENT_COLUMNS.items():
+            cursor_time, cursor_id = self.cursors[kind]
+            rows = db.session.execute(
+                db.select(column, Task.id)
+                .where(db.or_(column > cursor_time, db.and_(column == cursor_time, Task.id > cursor_id)),
+                       column <= now + self.leads[kind] + self.lookahead,
+                       Task.status.is_distinct_from('Completed'))
+                .order_by(column, Task.id)
+                .limit(self.batch_size)
+            ).all()
+            self.truncated = self.truncated or len(rows) == self.batch_size
+            events.extend((at - self.leads[kind], kind, at, task_id) for at, task_id in rows)
+        heapq.heapify(events)
+        self.heap = events
+        self.refreshed_at = now
+
+    def pop_due(self, now):
+        """Removes and returns the events whose time has come, earliest first."""
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            due.append(heapq.heappop(self.heap))
+        return due
+
+    # --- Delivery ---
+    def deliver(self, events):
+        """Notifies the events still matching their task, then advances and saves the cursors."""
+        rows = db.session.execute(
+            db.select(Task.id, Task.user_id, Task.title, Task.status, Task.start_date, Task.due_date)
+            .where(Task.id.in_({task_id for _, _, _, task_id in events}))
+        )
+        tasks = {row.id: row for row in rows}
+        for _, kind, at, task_id in events:
+            self.cursors[kind] = (at, task_id)
+            task = tasks.get(task_id)
+            if task is None or task.status == 'Completed' or getattr(task, f'{kind}_date') != at:
+                continue
+            reminder = Reminder(kind, task_id, task.user_id, task.title, at)
+            for notifier in self.notifiers:
+                try:
+                    notifier.notify(reminder)
+                except Exception:
+                    logger.exception('Notifier %s failed for %s', type(notifier).__name__, reminder)
+        self.save_cursors()
+
+    def tick(self, now=None):
+        """Delivers the reminders that are due. Returns the seconds to wait before the next tick."""
+        now = now or datetime.utcnow()
+        # Renew well before the lease runs out
+        renew_in = self.lease_seconds / 3
+        if not self.acquire(now):
+            return renew_in
+        if (self.refreshed_at is None or (now - self.refreshed_at).total_seconds() >= self.refresh_interval
+                or (self.truncated and not self.heap)):
+            self.refresh(now)
+        due = self.pop_due(now)
+        if due:
+            self.deliver(due)
+        if self.truncated and not self.heap:
+            return 0
+        wait = min(renew_in, self.refresh_interval - (now - self.refreshed_at).total_seconds())
+        if self.heap:
+            wait = min(wait, (self.heap[0][0] - now).total_seconds())
+        return max(wait, 0)
+
+    def run(self):
+        """Ticks forever on the calling thread."""
+        while True:
+            time.sleep(self.tick())
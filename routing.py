@@ -0,0 +1,51 @@
+"""
+routing module for TaskFlow application.
+Sends the queries of read-only requests to read replicas and everything else to the primary.
+"""
+import random
+import time
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+READ_ONLY_METHODS = ('GET', 'HEAD')
+
+
+class RoutingSession(Session):
+    """
+    Session that uses the replica chosen for the current request, if any.
+    Flushes (writes) always go to the primary, and so does everything after
+    them in the same request.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g.db_wrote = True
+            elif not g.get('db_wrote') and g.get('replica_bind') is not None:
+                return self._db.engines[g.replica_bind]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_keys(app):
+    """Returns the SQLALCHEMY_BINDS keys that name read replicas."""
+    return [key for key in app.config.get('SQLALCHEMY_BINDS') or {} if key.startswith('replica')]
+
+
+def init_replica_routing(app):
+    """Registers the request hooks that route reads to replicas, when any are configured."""
+    keys = replica_keys(app)
+    if not keys:
+        return
+
+    @app.before_request
+    def choose_replica():
+        # Read-your-writes: a browser that just wrote sticks to the primary for a while
+        if request.method in READ_ONLY_METHODS and session.get('primary_until', 0) < time.time():
+            # One replica per request, so all of its reads see the same snapshot
+            g.replica_bind = random.choice(keys)
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('db_wrote'):
+            session['primary_until'] = time.time() + app.config.get('REPLICA_STICKY_SECONDS', 5)
+        return response
@@ -0,0 +1,49 @@
+"""
+scheduler module for TaskFlow application.
+Runs periodic maintenance jobs on background threads inside the app process.
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+def start_periodic_job(app, interval, job, name=None):
+    """
+    Runs ``job()`` every ``interval`` seconds inside an app context on a daemon thread.
+    Returns a threading.Event that stops the job once set.
+    """
+    name = name or job.__name__
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            with app.app_context():
+                try:
+                    job()
+                except Exception:
+                    logger.exception('Periodic job %s failed', name)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return stop
+
+def start_timer_loop(app, job, name=None):
+    """
+    Runs ``job()`` on a daemon thread inside an app context, waiting the number of
+    seconds it returns before running it again. Returns a threading.Event that
+    stops the loop once set.
+    """
+    name = name or job.__name__
+    stop = threading.Event()
+
+    def run():
+        wait = 0
+        while not stop.wait(wait):
+            with app.app_context():
+                try:
+                    wait = job()
+                except Exception:
+                    logger.exception('Timer job %s failed', name)
+                    wait = 60  # Back off before retrying
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return stop
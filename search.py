@@ -0,0 +1,89 @@
+"""
+search module for TaskFlow application.
+Ranked full-text search over task titles and descriptions: a GIN-indexed tsvector on
+PostgreSQL and an FTS5 table kept in sync by triggers on SQLite.
+"""
+import re
+from sqlalchemy import column, event, func, literal_column, table, text
+from models import db, Task, TaskView, TASK_VIEW_COLUMNS
+
+# Must match the indexed expression exactly for PostgreSQL to use the GIN index
+SEARCH_VECTOR = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+POSTGRESQL_DDL = (
+    f'CREATE INDEX IF NOT EXISTS ix_tasks_search ON tasks USING gin ({SEARCH_VECTOR})',
+)
+
+# External-content FTS5 table: it indexes the tasks table without storing a second copy
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+)
+
+tasks_fts = table('tasks_fts', column('rowid'))
+
+
+def install(connection, rebuild=False):
+    """
+    Creates the search index for the connection's database if it is missing. With
+    ``rebuild``, the SQLite index is refilled from the tasks table, for databases
+    that had tasks before it existed.
+    """
+    if connection.dialect.name == 'postgresql':
+        for statement in POSTGRESQL_DDL:
+            connection.execute(text(statement))
+    elif connection.dialect.name == 'sqlite':
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        if rebuild:
+            connection.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+
+
+def uninstall(connection):
+    # The triggers go with the tasks table, but the FTS table would outlive it
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text('DROP TABLE IF EXISTS tasks_fts'))
+
+
+event.listen(Task.__table__, 'after_create', lambda target, connection, **kw: install(connection))
+event.listen(Task.__table__, 'before_drop', lambda target, connection, **kw: uninstall(connection))
+
+
+def fts5_query(text_query):
+    """Turns free text into an FTS5 query matching every word as a prefix, ignoring FTS5 syntax."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text_query))
+
+
+def search_tasks(user_id, text_query, limit, offset=0):
+    """
+    Returns the user's tasks matching ``text_query`` as TaskViews, best matches first.
+    Databases without full-text support fall back to an unranked substring match.
+    """
+    query = Task.query.filter(Task.user_id == user_id)
+    dialect = db.session.get_bind(Task.__mapper__).dialect.name
+    if dialect == 'postgresql':
+        vector = literal_column(SEARCH_VECTOR)
+        ts_query = func.websearch_to_tsquery('english', text_query)
+        query = query.filter(vector.op('@@')(ts_query)).order_by(func.ts_rank(vector, ts_query).desc(), Task.id)
+    elif dialect == 'sqlite':
+        match = fts5_query(text_query)
+        if not match:
+            return []
+        query = (query.join(tasks_fts, tasks_fts.c.rowid == Task.id)
+                 .filter(literal_column('tasks_fts').op('MATCH')(match))
+                 # bm25() is lower for better matches
+                 .order_by(func.bm25(literal_column('tasks_fts')), Task.id))
+    else:
+        pattern = f'%{text_query}%'
+        query = query.filter(db.or_(Task.title.ilike(pattern), Task.description.ilike(pattern))).order_by(Task.id)
+    rows = query.with_entities(*TASK_VIEW_COLUMNS).limit(limit).offset(offset)
+    return [TaskView._make(row) for row in rows]
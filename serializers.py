@@ -0,0 +1,58 @@
+"""
+serializers module for TaskFlow application.
+Lean JSON serialization of task rows for the high-traffic API endpoints.
+"""
+import json
+
+try:
+    import orjson  # Optional, much faster JSON encoder
+except ImportError:
+    orjson = None
+
+
+def dumps(obj):
+    """Encodes an object as compact UTF-8 JSON bytes, using orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def task_events(rows):
+    """
+    Converts (id, title, description, start_date, due_date, status) rows into
+    calendar event dicts.
+    """
+    # Tasks share relatively few distinct dates, so format each one only once
+    dates = {None: None}
+
+    def format_date(value):
+        formatted = dates.get(value)
+        if formatted is None and value is not None:
+            formatted = dates[value] = value.date().isoformat()
+        return formatted
+
+    for task_id, title, description, start_date, due_date, status in rows:
+        yield {
+            'id': task_id,
+            'title': title,
+            'description': description,
+            'start': format_date(start_date),
+            'end': format_date(due_date),
+            'status': status,
+        }
+
+
+def stream_json_array(items, batch_size=500):
+    """Encodes an iterable as a JSON array, yielding bytes one batch of items at a time."""
+    yield b'['
+    first = True
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield (b'' if first else b',') + dumps(batch)[1:-1]
+            first = False
+            batch = []
+    if batch:
+        yield (b'' if first else b',') + dumps(batch)[1:-1]
+    yield b']'
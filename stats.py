@@ -0,0 +1,204 @@
+"""
+stats module for TaskFlow application.
+Per-user task counters (by stored status, overdue, due soon) stored in the
+user_stats table. Single-task changes adjust them as they are flushed, bulk
+statements report their change explicitly, and reconcile() recomputes them from
+the tasks table for new days, new rows and drift.
+"""
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from sqlalchemy import case, event, func, inspect
+from sqlalchemy.exc import IntegrityError
+from models import db, User, Task, UserStats
+
+COUNTERS = ('not_started', 'pending', 'completed', 'overdue', 'due_soon')
+DUE_SOON_DAYS = 7
+RECONCILE_BATCH_SIZE = 1000
+
+# The task columns the counters are derived from
+TRACKED_COLUMNS = ('status', 'due_date')
+# Statuses the overdue and due-soon counters apply to, as in the overdue filter
+OPEN_STATUSES = ('Not started', 'Pending')
+
+
+def today():
+    return datetime.utcnow().date()
+
+
+def contribution(status, due_date, as_of):
+    """
+    Returns what one task adds to its owner's counters on day ``as_of``. Must agree
+    with counter_columns(). Statuses are counted as stored, like the task list's
+    status filters count them, so the counters match the cards and filters.
+    """
+    if status == 'Completed':
+        return {'completed': 1}
+    counts = {'pending' if status == 'Pending' else 'not_started': 1}
+    if status in OPEN_STATUSES and due_date is not None:
+        midnight = datetime.combine(as_of, time.min)
+        if due_date < midnight:
+            counts['overdue'] = 1
+        elif due_date < midnight + timedelta(days=DUE_SOON_DAYS):
+            counts['due_soon'] = 1
+    return counts
+
+
+def counter_columns(as_of):
+    """SQL aggregates computing each counter over a set of task rows on day ``as_of``."""
+    midnight = datetime.combine(as_of, time.min)
+    is_open = Task.status.in_(OPEN_STATUSES)
+    conditions = {
+        'not_started': db.or_(Task.status.is_(None), Task.status.notin_(('Pending', 'Completed'))),
+        'pending': Task.status == 'Pending',
+        'completed': Task.status == 'Completed',
+        'overdue': db.and_(is_open, Task.due_date < midnight),
+        'due_soon': db.and_(is_open, Task.due_date >= midnight,
+                            Task.due_date < midnight + timedelta(days=DUE_SOON_DAYS)),
+    }
+    return [func.coalesce(func.sum(case((conditions[name], 1), else_=0)), 0).label(name) for name in COUNTERS]
+
+
+def aggregate(condition, as_of):
+    """Computes the counters over the tasks matching ``condition``."""
+    row = db.session.execute(db.select(*counter_columns(as_of)).where(condition)).one()
+    return dict(row._mapping)
+
+
+def apply_delta(executor, user_id, delta, as_of=None):
+    """
+    Adds ``delta`` to the user's counters in one UPDATE, computed in SQL so concurrent
+    writers never lose an increment. Rows from another day are left for reconcile().
+    """
+    values = {name: getattr(UserStats, name) + amount for name, amount in delta.items() if amount}
+    if values:
+        executor.execute(
+            db.update(UserStats)
+            .where(UserStats.user_id == user_id, UserStats.as_of == (as_of or today()))
+            .values(values)
+        )
+
+
+def invalidate(executor, user_ids):
+    """Marks the users' counters for recomputation on their next read."""
+    executor.execute(db.update(UserStats).where(UserStats.user_id.in_(user_ids)).values(as_of=None))
+
+
+def difference(after, before):
+    return {name: after.get(name, 0) - before.get(name, 0) for name in COUNTERS}
+
+
+def add_tasks(user_id, rows):
+    """Counts Task column dicts inserted with a bulk INSERT, which bypasses the flush hooks."""
+    as_of = today()
+    delta = dict.fromkeys(COUNTERS, 0)
+    for row in rows:
+        for name, amount in contribution(row.get('status'), row.get('due_date'), as_of).items():
+            delta[name] += amount
+    apply_delta(db.session, user_id, delta, as_of)
+
+
+@contextmanager
+def tracking(user_id, task_ids):
+    """Applies the counter change made by a bulk UPDATE or DELETE of the given tasks."""
+    as_of = today()
+    condition = Task.id.in_(task_ids)
+    before = aggregate(condition, as_of)
+    yield
+    apply_delta(db.session, user_id, difference(aggregate(condition, as_of), before), as_of)
+
+
+# --- Flush hooks for single-task changes ---
+def task_contribution(task, as_of):
+    return contribution(task.status, task.due_date, as_of)
+
+
+@event.listens_for(Task, 'after_insert')
+def task_inserted(mapper, connection, task):
+    apply_delta(connection, task.user_id, task_contribution(task, today()))
+
+
+@event.listens_for(Task, 'after_delete')
+def task_deleted(mapper, connection, task):
+    apply_delta(connection, task.user_id, difference({}, task_contribution(task, today())))
+
+
+@event.listens_for(Task, 'after_update')
+def task_updated(mapper, connection, task):
+    attrs = inspect(task).attrs
+    histories = [attrs[name].history for name in TRACKED_COLUMNS]
+    if not any(history.has_changes() for history in histories):
+        return
+    previous = []
+    for history in histories:
+        if history.deleted or history.unchanged:
+            previous.append((history.deleted or history.unchanged)[0])
+        else:
+            # The old value was never loaded, so the change cannot be computed
+            invalidate(connection, [task.user_id])
+            return
+    as_of = today()
+    before = contribution(*previous, as_of)
+    apply_delta(connection, task.user_id, difference(task_contribution(task, as_of), before), as_of)
+
+
+# --- Reads and reconciliation ---
+def reconcile(user_ids, as_of=None):
+    """
+    Recomputes the users' counters from their tasks and stores them, in one
+    aggregate query and at most two bulk statements. Returns {user_id: counters}.
+    """
+    as_of = as_of or today()
+    # Both reads go to the primary even on GET requests: later deltas are applied on
+    # top of the stored counts, so they must not come from a lagging replica
+    primary = {'bind': db.engine}
+    counts = {user_id: dict.fromkeys(COUNTERS, 0) for user_id in user_ids}
+    rows = db.session.execute(
+        db.select(Task.user_id, *counter_columns(as_of)).where(Task.user_id.in_(user_ids)).group_by(Task.user_id),
+        bind_arguments=primary,
+    )
+    for row in rows:
+        counts[row.user_id] = {name: row._mapping[name] for name in COUNTERS}
+
+    existing = set(db.session.scalars(
+        db.select(UserStats.user_id).where(UserStats.user_id.in_(user_ids)), bind_arguments=primary
+    ))
+    values = [dict(counters, user_id=user_id, as_of=as_of) for user_id, counters in counts.items()]
+    updates = [row for row in values if row['user_id'] in existing]
+    inserts = [row for row in values if row['user_id'] not in existing]
+    if updates:
+        # Bulk UPDATE by primary key, executed as a single executemany
+        db.session.execute(db.update(UserStats), updates)
+    if inserts:
+        db.session.execute(db.insert(UserStats), inserts)
+    return counts
+
+
+def reconcile_all(batch_size=RECONCILE_BATCH_SIZE):
+    """Recomputes every user's counters, committing per batch. Returns the number of users."""
+    user_ids = db.session.scalars(db.select(User.id).order_by(User.id)).all()
+    for start in range(0, len(user_ids), batch_size):
+        reconcile(user_ids[start:start + batch_size])
+        db.session.commit()
+    return len(user_ids)
+
+
+def user_stats(user_id):
+    """
+    Returns the user's counters from their user_stats row. A missing or outdated
+    row is recomputed and committed first; this runs on GET requests, so two first
+    reads may race to create the row.
+    """
+    as_of = today()
+    row = db.session.get(UserStats, user_id)
+    if row is not None and row.as_of == as_of:
+        counts = {name: getattr(row, name) for name in COUNTERS}
+    else:
+        try:
+            counts = reconcile([user_id], as_of)[user_id]
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request stored the row first; update it instead
+            db.session.rollback()
+            counts = reconcile([user_id], as_of)[user_id]
+            db.session.commit()
+    return dict(counts, as_of=as_of.isoformat(), due_soon_days=DUE_SOON_DAYS)
@@ -0,0 +1,599 @@
+"""
+tasks module for TaskFlow application.
+HTML task views: the home page list with its sorting, filters and pagination,
+task forms, recurring task occurrences, the calendar page and search.
+"""
+from flask import (Blueprint, current_app, render_template, request, redirect, url_for, flash, jsonify, abort,
+                   make_response, session, stream_template, get_flashed_messages)
+from flask_login import login_required, current_user
+from datetime import datetime, time, timedelta
+from functools import wraps
+from werkzeug.http import is_resource_modified
+from markupsafe import Markup
+from sqlalchemy.exc import IntegrityError
+from models import db, Task, TaskView, TASK_STATUSES, TASK_VIEW_COLUMNS
+from recurrence import Rule, validate_rule
+from search import search_tasks
+from extensions import response_cache
+from auth import user_changed
+import stats
+import changes
+
+bp = Blueprint('tasks', __name__)
+
+# --- Conditional GET support ---
+def conditional_on_user_tasks(view):
+    """
+    Answers conditional GETs for views derived from the current user's tasks and profile.
+    The validators come from the user's version counter, so a 304 never loads any Task rows.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # The date is part of the ETag because overdue filtering depends on it
+        etag = f'{current_user.id}-{current_user.version}-{datetime.utcnow().date().isoformat()}'
+        last_modified = current_user.updated_at
+        # Pending flash messages are only shown once the page is actually rendered
+        if '_flashes' not in session and not is_resource_modified(
+                request.environ, etag=etag, last_modified=last_modified):
+            response = current_app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+        if response.status_code in (200, 304):
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            # Private to the user, and always revalidated
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+        return response
+    return wrapper
+
+# --- Task list sorting and pagination ---
+TASK_SORT_COLUMNS = {
+    'created': Task.created_at,
+    'start_date': Task.start_date,
+    'due_date': Task.due_date,
+}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(task, sort_by):
+    """Encodes the (sort_key, id) position of a task as an opaque page cursor."""
+    value = getattr(task, TASK_SORT_COLUMNS[sort_by].key)
+    return f"{value.isoformat() if value else ''}|{task.id}"
+
+def decode_cursor(cursor):
+    """Decodes a page cursor into a (sort_key, id) tuple, or None for the first page."""
+    if not cursor:
+        return None
+    value, _, task_id = cursor.rpartition('|')
+    return (datetime.fromisoformat(value) if value else None, int(task_id))
+
+def sorted_tasks(query, sort_by, after=None):
+    """Orders a Task query by sort mode and seeks past the ``after`` cursor position."""
+    column = TASK_SORT_COLUMNS[sort_by]
+    if sort_by == 'created':
+        # Newest first
+        if after is not None:
+            value, task_id = after
+            query = query.filter(db.or_(column < value, db.and_(column == value, Task.id < task_id)))
+        return query.order_by(column.desc(), Task.id.desc())
+
+    # Earliest first, tasks without the date go to the end
+    if after is not None:
+        value, task_id = after
+        if value is None:
+            query = query.filter(column.is_(None), Task.id > task_id)
+        else:
+            query = query.filter(db.or_(
+                column > value,
+                db.and_(column == value, Task.id > task_id),
+                column.is_(None),
+            ))
+    return query.order_by(column.asc().nulls_last(), Task.id.asc())
+
+class TaskPage:
+    """
+    One page of a sorted Task query as TaskViews, read as it is iterated so a streamed
+    template can send the first cards before the last row is fetched. next_cursor is
+    set once iteration reaches the end of the page and there are more tasks after it.
+    """
+
+    def __init__(self, query, sort_by, per_page, batch_size=None):
+        # Fetch one extra row to know whether there is a next page
+        query = query.with_entities(*TASK_VIEW_COLUMNS).limit(per_page + 1)
+        self.query = query.yield_per(batch_size) if batch_size else query
+        self.sort_by = sort_by
+        self.per_page = per_page
+        self.count = 0
+        self.next_cursor = None
+
+    def __iter__(self):
+        last = None
+        for task in map(TaskView._make, self.query):
+            if self.count == self.per_page:
+                self.next_cursor = encode_cursor(last, self.sort_by)
+                break
+            self.count += 1
+            last = task
+            yield task
+
+# --- Task filters ---
+TASK_FILTER_PARAMS = ('status', 'overdue', 'due_after', 'due_before', 'start_after', 'start_before')
+
+def task_filter_args(args):
+    """Collects the non-empty task filter query parameters from ``args``."""
+    return {name: args[name] for name in TASK_FILTER_PARAMS if args.get(name)}
+
+def filtered_tasks(query, filters):
+    """Applies task filters to a Task query. Raises ValueError on malformed values."""
+    if 'status' in filters:
+        statuses = [status for status in filters['status'].split(',') if status]
+        if any(status not in TASK_STATUSES for status in statuses):
+            raise ValueError(f"Invalid status filter: {filters['status']}")
+        query = query.filter(Task.status.in_(statuses))
+    if filters.get('overdue') in ('1', 'true'):
+        # Overdue means due before today and still open
+        today = datetime.combine(datetime.utcnow().date(), time.min)
+        query = query.filter(Task.status.in_(('Not started', 'Pending')), Task.due_date < today)
+
+    # Date bounds are inclusive of the given day
+    for name, column in (('due', Task.due_date), ('start', Task.start_date)):
+        after = parse_date_param(filters.get(f'{name}_after'))
+        before = parse_date_param(filters.get(f'{name}_before'))
+        if after is not None:
+            query = query.filter(column >= after)
+        if before is not None:
+            query = query.filter(column < before + timedelta(days=1))
+    return query
+
+def occurrence_matches(filters, status, start_date, due_date):
+    """Applies the task filters to an occurrence of a recurring task; mirrors filtered_tasks()."""
+    if 'status' in filters and status not in filters['status'].split(','):
+        return False
+    if filters.get('overdue') in ('1', 'true'):
+        today = datetime.combine(datetime.utcnow().date(), time.min)
+        if status == 'Completed' or due_date is None or due_date >= today:
+            return False
+    for name, value in (('due', due_date), ('start', start_date)):
+        after = parse_date_param(filters.get(f'{name}_after'))
+        before = parse_date_param(filters.get(f'{name}_before'))
+        if (after is not None or before is not None) and value is None:
+            return False
+        if after is not None and value < after:
+            return False
+        if before is not None and value >= before + timedelta(days=1):
+            return False
+    return True
+
+def task_list_args():
+    """Reads the sort mode, page size and filters of a task list request."""
+    sort_by = request.args.get('sort', 'created')
+    if sort_by not in TASK_SORT_COLUMNS:
+        sort_by = 'created'
+    per_page = request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int)
+    per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+    return sort_by, per_page, task_filter_args(request.args)
+
+def user_task_page(sort_by, per_page, filters, batch_size=None):
+    """The current user's TaskPage after the request's cursor. Raises ValueError on malformed parameters."""
+    after = decode_cursor(request.args.get('after'))
+    query = filtered_tasks(Task.query.filter_by(user_id=current_user.id), filters)
+    return TaskPage(sorted_tasks(query, sort_by, after), sort_by, per_page, batch_size)
+
+def coalesce(chunks, size):
+    """Joins small template output chunks so each write to the client carries at least ``size`` characters."""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+@bp.route('/', methods=['GET'])
+@login_required
+@conditional_on_user_tasks
+def index():
+    """Home page showing user's tasks."""
+    sort_by, per_page, filters = task_list_args()
+    context = dict(current_sort=sort_by, filters=filters, per_page=per_page,
+                   is_first_page=not request.args.get('after'), stats=stats.user_stats(current_user.id))
+
+    if current_app.config.get('STREAM_INDEX'):
+        # Send the page header right away and the cards as their rows arrive
+        try:
+            tasks = user_task_page(sort_by, per_page, filters, current_app.config.get('STREAM_BATCH_SIZE', 50))
+        except ValueError:
+            abort(400)
+        counts = context['stats']
+        has_tasks = counts['not_started'] + counts['pending'] + counts['completed'] > 0
+        # The session cookie is saved before the body streams, so the flashed messages are
+        # taken from the session now; base.html then reads them from the request
+        get_flashed_messages(with_categories=True)
+        chunks = stream_template('index.html', tasks=tasks, has_tasks=has_tasks, **context)
+        return current_app.response_class(coalesce(chunks, current_app.config.get('STREAM_CHUNK_SIZE', 4096)),
+                                  mimetype='text/html')
+
+    # Overdue filtering depends on the current date
+    params = dict(filters, sort=sort_by, per_page=per_page, after=request.args.get('after'),
+                  today=datetime.utcnow().date().isoformat())
+    cached = response_cache.get(current_user, 'index', params)
+    if cached is None:
+        try:
+            tasks = user_task_page(sort_by, per_page, filters)
+        except ValueError:
+            abort(400)
+        task_list = render_template('_task_list.html', tasks=tasks, **context)
+        cached = (task_list, tasks.count > 0)
+        response_cache.set(current_user, 'index', params, cached)
+
+    task_list, has_tasks = cached
+    return render_template('index.html', task_list=Markup(task_list), has_tasks=has_tasks, **context)
+
+@bp.route('/tasks/page')
+@login_required
+@conditional_on_user_tasks
+def task_page():
+    """The next page of task cards as an HTML fragment, for infinite scroll on the home page."""
+    sort_by, per_page, filters = task_list_args()
+    try:
+        tasks = user_task_page(sort_by, per_page, filters)
+    except ValueError:
+        return jsonify({'error': 'Invalid page cursor or filter.'}), 400
+    html = render_template('_task_cards.html', tasks=tasks)
+    next_url = page_url = None
+    if tasks.next_cursor:
+        args = dict(filters, sort=sort_by, per_page=per_page, after=tasks.next_cursor)
+        next_url = url_for('tasks.task_page', **args)
+        page_url = url_for('tasks.index', **args)
+    return jsonify({'html': html, 'count': tasks.count, 'next_url': next_url, 'page_url': page_url})
+
+@bp.route('/tasks/<int:task_id>/detail')
+@login_required
+@conditional_on_user_tasks
+def task_detail(task_id):
+    """Task detail modal content, fetched when a task card is opened."""
+    row = db.session.execute(
+        db.select(*TASK_VIEW_COLUMNS).where(Task.id == task_id, Task.user_id == current_user.id)
+    ).first()
+    if row is None:
+        abort(404)
+    return render_template('_task_modal.html', task=TaskView._make(row))
+
+# --- Recurring tasks ---
+RECURRENCE_COLUMNS = ('recurrence', 'recurrence_interval', 'recurrence_until', 'recurrence_count')
+
+def recurrence_form_values(form, start_date):
+    """Reads a task form's recurrence rule into Task column values. Raises ValueError on bad input."""
+    frequency = form.get('recurrence')
+    if not frequency:
+        return dict.fromkeys(RECURRENCE_COLUMNS)
+    try:
+        interval = int(form.get('recurrence_interval') or 1)
+        count = int(form['recurrence_count']) if form.get('recurrence_count') else None
+    except ValueError:
+        raise ValueError('Repeat interval and occurrences must be whole numbers.')
+    until = None
+    if form.get('recurrence_until'):
+        try:
+            until = datetime.strptime(form['recurrence_until'], '%Y-%m-%d')
+        except ValueError:
+            raise ValueError('Invalid repeat end date format.')
+    validate_rule(frequency, interval, until, count, start_date)
+    return {'recurrence': frequency, 'recurrence_interval': interval, 'recurrence_until': until,
+            'recurrence_count': count}
+
+def check_series_dates(task, start_date):
+    """Checks that a recurring task's rule still holds with a new start date. Raises ValueError."""
+    if task.recurrence:
+        validate_rule(task.recurrence, task.recurrence_interval or 1, task.recurrence_until,
+                      task.recurrence_count, start_date)
+
+def recurring_series(user_id, window_end):
+    """Statement selecting the user's recurring tasks that can have occurrences before ``window_end``."""
+    # A series without a start date has no occurrences to expand
+    statement = db.select(Task).where(Task.user_id == user_id, Task.recurrence.isnot(None),
+                                      Task.start_date.isnot(None))
+    if window_end is not None:
+        statement = statement.where(Task.start_date < window_end)
+    return statement.order_by(Task.id)
+
+def series_occurrences(series, window_start, window_end):
+    """(task, start, due) for each occurrence of the given series within the window."""
+    return [(task, start, due) for task in series if task.start_date is not None
+            for start, due in Rule(task).occurrences(window_start, window_end)]
+
+def materialized_occurrences(occurrences):
+    """Statement selecting (series id, occurrence date) of the exception rows among ``occurrences``."""
+    starts = [start for _, start, _ in occurrences]
+    return db.select(Task.recurrence_parent_id, Task.occurrence_date).where(
+        Task.recurrence_parent_id.in_({task.id for task, _, _ in occurrences}),
+        Task.occurrence_date.between(min(starts), max(starts)),
+    )
+
+def series_events(occurrences, materialized, filters):
+    """Calendar events for occurrences that were not materialized as exception rows."""
+    for task, start, due in occurrences:
+        if (task.id, start) in materialized:
+            continue
+        # A completed series has no open occurrences left
+        status = 'Completed' if task.status == 'Completed' else Task.status_from_start_date(start)
+        if not occurrence_matches(filters, status, start, due):
+            continue
+        day = start.date().isoformat()
+        yield {
+            'id': f'{task.id}:{day}',
+            'title': task.title,
+            'description': task.description,
+            'start': day,
+            'end': due.date().isoformat() if due else None,
+            'status': status,
+            'series_id': task.id,
+            'occurrence': day,
+        }
+
+def occurrence_events(window_start, window_end, filters):
+    """
+    Calendar events for the current user's recurring tasks, expanded only for the
+    requested window. Occurrences that were materialized as exception rows are
+    skipped here; those rows are ordinary tasks and come from the main query.
+    """
+    series = db.session.scalars(recurring_series(current_user.id, window_end))
+    occurrences = series_occurrences(series, window_start, window_end)
+    if not occurrences:
+        return
+    materialized = set(db.session.execute(materialized_occurrences(occurrences)).all())
+    yield from series_events(occurrences, materialized, filters)
+
+def delete_exception_rows(series_ids):
+    """
+    Deletes the current user's exception rows of the given series, keeping the
+    statistics and sync tombstones in step. Call before deleting the series
+    themselves, which the rows reference. Returns the deleted ids.
+    """
+    exception_ids = db.session.scalars(
+        db.select(Task.id).where(Task.recurrence_parent_id.in_(series_ids), Task.user_id == current_user.id)
+    ).all()
+    if exception_ids:
+        changes.record_deletes(current_user.id, exception_ids)
+        with stats.tracking(current_user.id, exception_ids):
+            db.session.execute(db.delete(Task).where(Task.id.in_(exception_ids)))
+    return exception_ids
+
+def owned_series_or_404(task_id):
+    """The current user's recurring task with the given id."""
+    series = Task.query.get_or_404(task_id)
+    if series.user_id != current_user.id or not series.recurrence or series.start_date is None:
+        abort(404)
+    return series
+
+def materialize_occurrence(series, occurrence):
+    """
+    Returns the exception row for the series' occurrence on ``occurrence``
+    ('YYYY-MM-DD'), creating it from the series on first use. Aborts with 404 if
+    the series has no occurrence that day.
+    """
+    try:
+        day = datetime.strptime(occurrence, '%Y-%m-%d').date()
+    except ValueError:
+        abort(404)
+    rule = Rule(series)
+    start = rule.occurrence_on(day)
+    if start is None:
+        abort(404)
+    exception = Task.query.filter_by(recurrence_parent_id=series.id, occurrence_date=start).first()
+    if exception is None:
+        exception = Task(title=series.title, description=series.description, start_date=start,
+                         due_date=start + rule.duration if rule.duration is not None else None,
+                         user_id=series.user_id, recurrence_parent_id=series.id, occurrence_date=start)
+        exception.status = exception.get_effective_status()
+        db.session.add(exception)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # A concurrent request materialized it first
+            db.session.rollback()
+            exception = Task.query.filter_by(recurrence_parent_id=series.id, occurrence_date=start).one()
+    return exception
+
+@bp.route('/tasks/<int:task_id>/occurrences/<occurrence>/complete', methods=['POST'])
+@login_required
+def complete_occurrence(task_id, occurrence):
+    """Mark one occurrence of a recurring task as completed."""
+    task = materialize_occurrence(owned_series_or_404(task_id), occurrence)
+    task.status = 'Completed'
+    user_changed()
+    db.session.commit()
+    flash('Occurrence marked as completed!')
+    return redirect(url_for('tasks.calendar'))
+
+@bp.route('/tasks/<int:task_id>/occurrences/<occurrence>/edit', methods=['POST'])
+@login_required
+def edit_occurrence(task_id, occurrence):
+    """Materialize one occurrence of a recurring task and open it for editing."""
+    task = materialize_occurrence(owned_series_or_404(task_id), occurrence)
+    user_changed()
+    db.session.commit()
+    return redirect(url_for('tasks.edit_task', task_id=task.id))
+
+@bp.route('/create-task', methods=['GET', 'POST'])
+@login_required
+def create_task():
+    """Task creation page."""
+    if request.method == 'POST':
+        title = request.form['title']
+        description = request.form.get('description')
+        start_date = request.form.get('start_date')
+        due_date = request.form.get('due_date')
+        from datetime import datetime
+        start_date_obj = None
+        due_date_obj = None
+        if start_date:
+            try:
+                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
+            except ValueError:
+                flash('Invalid start date format.', 'error')
+                return redirect(url_for('tasks.create_task'))
+        if due_date:
+            try:
+                due_date_obj = datetime.strptime(due_date, '%Y-%m-%d')
+            except ValueError:
+                flash('Invalid due date format.', 'error')
+                return redirect(url_for('tasks.create_task'))
+        try:
+            rule = recurrence_form_values(request.form, start_date_obj)
+        except ValueError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('tasks.create_task'))
+        task = Task(title=title, description=description, start_date=start_date_obj, due_date=due_date_obj, user_id=current_user.id, **rule)
+        # Set initial status based on start date
+        task.status = task.get_effective_status()
+        db.session.add(task)
+        user_changed()
+        db.session.commit()
+        flash('Task created successfully!')
+        return redirect(url_for('tasks.index'))
+    from datetime import datetime
+    today_date = datetime.now().strftime('%Y-%m-%d')
+    return render_template('create_task.html', today_date=today_date)
+
+@bp.route('/edit-task/<int:task_id>', methods=['GET', 'POST'])
+@login_required
+def edit_task(task_id):
+    """Edit task page."""
+    task = Task.query.get_or_404(task_id)
+    # Ensure the task belongs to the current user
+    if task.user_id != current_user.id:
+        flash('You can only edit your own tasks.', 'error')
+        return redirect(url_for('tasks.index'))
+
+    if request.method == 'POST':
+        task.title = request.form['title']
+        task.description = request.form.get('description')
+        task.status = request.form.get('status', 'Not started')
+        start_date = request.form.get('start_date')
+        due_date = request.form.get('due_date')
+        from datetime import datetime
+        start_date_obj = None
+        due_date_obj = None
+        if start_date:
+            try:
+                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
+            except ValueError:
+                flash('Invalid start date format.', 'error')
+                return redirect(url_for('tasks.edit_task', task_id=task_id))
+        if due_date:
+            try:
+                due_date_obj = datetime.strptime(due_date, '%Y-%m-%d')
+            except ValueError:
+                flash('Invalid due date format.', 'error')
+                return redirect(url_for('tasks.edit_task', task_id=task_id))
+        # Exception rows stand for a single occurrence and cannot repeat
+        if not task.recurrence_parent_id:
+            try:
+                rule = recurrence_form_values(request.form, start_date_obj)
+            except ValueError as e:
+                flash(str(e), 'error')
+                return redirect(url_for('tasks.edit_task', task_id=task_id))
+            for name, value in rule.items():
+                setattr(task, name, value)
+        task.start_date = start_date_obj
+        task.due_date = due_date_obj
+
+        # Auto-update status based on start date (only if not completed)
+        if task.status != 'Completed':
+            task.status = task.get_effective_status()
+
+        user_changed()
+        db.session.commit()
+        flash('Task updated successfully!')
+        return redirect(url_for('tasks.index'))
+    return render_template('edit_task.html', task=task)
+
+@bp.route('/delete-task/<int:task_id>', methods=['POST'])
+@login_required
+def delete_task(task_id):
+    """Delete task."""
+    task = Task.query.get_or_404(task_id)
+    # Ensure the task belongs to the current user
+    if task.user_id != current_user.id:
+        flash('You can only delete your own tasks.', 'error')
+        return redirect(url_for('tasks.index'))
+
+    # A series goes together with its materialized occurrences
+    delete_exception_rows([task.id])
+    db.session.delete(task)
+    user_changed()
+    db.session.commit()
+    flash('Task deleted successfully!')
+    return redirect(url_for('tasks.index'))
+
+@bp.route('/complete-task/<int:task_id>', methods=['POST'])
+@login_required
+def complete_task(task_id):
+    """Mark task as completed."""
+    task = Task.query.get_or_404(task_id)
+    # Ensure the task belongs to the current user
+    if task.user_id != current_user.id:
+        flash('You can only modify your own tasks.', 'error')
+        return redirect(url_for('tasks.index'))
+
+    task.status = 'Completed'
+    user_changed()
+    db.session.commit()
+    flash('Task marked as completed!')
+    return redirect(url_for('tasks.index'))
+
+@bp.route('/calendar')
+@login_required
+def calendar():
+    return render_template('calendar.html')
+
+def parse_date_param(value):
+    """Parses a date query parameter (e.g. FullCalendar's ISO8601 start/end)."""
+    if not value:
+        return None
+    # FullCalendar sends e.g. '2024-01-01T00:00:00+02:00'; only the date part matters
+    return datetime.strptime(value[:10], '%Y-%m-%d')
+
+def tasks_in_window(query, window_start, window_end):
+    """Restricts a Task query to tasks overlapping [window_start, window_end)."""
+    if window_start is not None:
+        query = query.filter(db.or_(
+            Task.due_date >= window_start,
+            db.and_(Task.due_date.is_(None), Task.start_date >= window_start),
+        ))
+    if window_end is not None:
+        query = query.filter(db.or_(
+            Task.start_date < window_end,
+            db.and_(Task.start_date.is_(None), Task.due_date < window_end),
+        ))
+    return query
+# --- Search ---
+SEARCH_PAGE_SIZE = 20
+
+def task_search_page():
+    """Runs the request's search query; returns (query, page, per_page, tasks, has_more)."""
+    text_query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = max(1, min(request.args.get('per_page', SEARCH_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    tasks = []
+    if text_query:
+        # Fetch one extra row to know whether there is a next page
+        tasks = search_tasks(current_user.id, text_query, per_page + 1, (page - 1) * per_page)
+    return text_query, page, per_page, tasks[:per_page], len(tasks) > per_page
+
+@bp.route('/search')
+@login_required
+@conditional_on_user_tasks
+def search():
+    """Search results page."""
+    text_query, page, per_page, tasks, has_more = task_search_page()
+    return render_template('search.html', q=text_query, page=page, per_page=per_page, tasks=tasks,
+                           has_more=has_more)
@@ -3,16 +3,25 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
-from app import app, db
+from app import create_app
+from auth import load_user
+from cache import LRUCache
+from config import TestingConfig
+from extensions import response_cache, identity_cache
+from models import db
+from tasks import decode_cursor, sorted_tasks
 from models import User, Task
 from datetime import datetime, timedelta
 from flask_login import login_user
+from flask import session as flask_session
+from sqlalchemy import event
 
 @pytest.fixture
-def client():
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    app.config['SECRET_KEY'] = 'test-secret-key'
+def app():
+    return create_app(TestingConfig)
+
+@pytest.fixture
+def client(app):
     with app.app_context():
         db.create_all()
         yield app.test_client()
@@ -20,7 +29,7 @@ def client():
         db.drop_all()
 
 @pytest.fixture
-def session():
+def session(app):
     with app.app_context():
         yield db.session
 
@@ -159,6 +168,118 @@ class TestTaskManagement:
         response = logged_in_client.get('/?sort=due_date')
         assert response.status_code == 200
 
+    def test_index_page_pagination(self, logged_in_client, session, test_user):
+        """Test keyset pagination follows the sort order across pages."""
+        create_task(session, test_user, 'Due Third', due_date=datetime(2024, 1, 3))
+        create_task(session, test_user, 'No Due Date')
+        create_task(session, test_user, 'Due First', due_date=datetime(2024, 1, 1))
+        create_task(session, test_user, 'Due Second', due_date=datetime(2024, 1, 2))
+
+        response = logged_in_client.get('/?sort=due_date&per_page=2')
+        assert b'Due First' in response.data
+        assert b'Due Second' in response.data
+        assert b'Due Third' not in response.data
+        assert b'Next page' in response.data
+
+        query = sorted_tasks(Task.query.filter_by(user_id=test_user.id), 'due_date')
+        titles = [task.title for task in query]
+        assert titles == ['Due First', 'Due Second', 'Due Third', 'No Due Date']
+
+        second = sorted_tasks(Task.query.filter_by(user_id=test_user.id), 'due_date',
+                              decode_cursor(f'2024-01-02T00:00:00|{query[1].id}'))
+        assert [task.title for task in second] == ['Due Third', 'No Due Date']
+
+    def test_index_page_invalid_cursor(self, logged_in_client):
+        """Test malformed page cursors are rejected."""
+        response = logged_in_client.get('/?after=garbage')
+        assert response.status_code == 400
+
+    def test_index_page_filters(self, logged_in_client, session, test_user):
+        """Test status and overdue filters on the index page."""
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        create_task(session, test_user, 'Late Task', due_date=yesterday, status='Pending')
+        create_task(session, test_user, 'Late But Done', due_date=yesterday, status='Completed')
+        create_task(session, test_user, 'Future Task', due_date=datetime.utcnow() + timedelta(days=5))
+
+        response = logged_in_client.get('/?overdue=1')
+        assert b'Late Task' in response.data
+        assert b'Late But Done' not in response.data
+        assert b'Future Task' not in response.data
+
+        response = logged_in_client.get('/?status=Completed')
+        assert b'Late But Done' in response.data
+        assert b'Late Task' not in response.data
+
+        response = logged_in_client.get('/?status=Bogus')
+        assert response.status_code == 400
+
+    def test_index_page_streaming(self, app, logged_in_client, session, test_user):
+        """Test the streamed home page renders the same page of tasks."""
+        for day in range(1, 4):
+            create_task(session, test_user, f'Due {day}', due_date=datetime(2024, 1, day))
+        app.config['STREAM_INDEX'] = True
+        response = logged_in_client.get('/?sort=due_date&per_page=2')
+        assert response.is_streamed
+        data = response.get_data()
+        assert b'Due 1' in data and b'Due 2' in data
+        assert b'Due 3' not in data
+        assert b'Next page' in data
+        assert b'id="sort-select"' in data
+
+    def test_index_page_streaming_consumes_flashes(self, app, logged_in_client, session, test_user):
+        """Test flashed messages are shown once on the streamed home page."""
+        app.config['STREAM_INDEX'] = True
+        logged_in_client.post('/create-task', data={'title': 'Flashed'})
+        assert b'Task created successfully!' in logged_in_client.get('/').get_data()
+        response = logged_in_client.get('/')
+        assert b'Task created successfully!' not in response.get_data()
+        # With the flashes gone, the page can be revalidated again
+        assert logged_in_client.get('/', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    def test_task_page_fragment(self, logged_in_client, session, test_user):
+        """Test the load-more endpoint pages through card fragments."""
+        for day in range(1, 4):
+            create_task(session, test_user, f'Due {day}', due_date=datetime(2024, 1, day))
+        page = logged_in_client.get('/tasks/page?sort=due_date&per_page=2').get_json()
+        assert page['count'] == 2
+        assert 'Due 1' in page['html'] and 'Due 3' not in page['html']
+        assert page['page_url'].startswith('/?')
+
+        page = logged_in_client.get(page['next_url']).get_json()
+        assert page['count'] == 1
+        assert 'Due 3' in page['html']
+        assert page['next_url'] is None
+
+        response = logged_in_client.get('/tasks/page?after=garbage')
+        assert response.status_code == 400
+
+    def test_index_page_renders_cards_only(self, logged_in_client, session, test_user):
+        """Test task details are not rendered into the index page."""
+        task = create_task(session, test_user, 'My Task', description='Full details')
+        response = logged_in_client.get('/')
+        assert f'data-task-url="/tasks/{task.id}/detail"'.encode() in response.data
+        assert b'Delete Task' not in response.data
+        assert response.data.count(b'class="modal fade"') == 1
+
+    def test_task_detail_fragment(self, logged_in_client, session, test_user):
+        """Test the task detail modal content is served on its own."""
+        task = create_task(session, test_user, 'My Task', description='Full details')
+        response = logged_in_client.get(f'/tasks/{task.id}/detail')
+        assert response.status_code == 200
+        assert b'Full details' in response.data
+        assert b'Delete Task' in response.data
+        assert b'<html' not in response.data
+
+    def test_task_detail_other_users_task(self, logged_in_client, session):
+        """Test another user's task detail is not found."""
+        other = User(username='other', email='other@example.com', password='pw')
+        session.add(other)
+        session.commit()
+        task = create_task(session, other, 'Secret Task')
+        response = logged_in_client.get(f'/tasks/{task.id}/detail')
+        assert response.status_code == 404
+        assert b'Secret Task' not in response.data
+
     def test_create_task_page_get(self, logged_in_client):
         """Test create task page loads correctly."""
         response = logged_in_client.get('/create-task')
@@ -254,6 +375,39 @@ class TestAccountManagement:
         assert response.status_code == 200
         assert b'Account Settings' in response.data
 
+    def test_identity_cache(self, app, client, session, test_user, monkeypatch):
+        """Test load_user serves cached identities until the browser has seen a newer version."""
+        monkeypatch.setattr(app.extensions['identity_cache'], 'backend', LRUCache(ttl=60))
+        user_id = test_user.id
+        with app.test_request_context():
+            assert load_user(str(user_id)).username == 'testuser'
+        assert identity_cache.get(user_id)['username'] == 'testuser'
+
+        # A change made elsewhere is not seen until the snapshot expires...
+        session.execute(db.update(User).where(User.id == user_id).values(username='renamed'))
+        session.commit()
+        session.expunge_all()
+        with app.test_request_context():
+            assert load_user(str(user_id)).username == 'testuser'
+
+        # ...unless this browser has already seen a newer version
+        session.expunge_all()
+        with app.test_request_context():
+            flask_session['user_version'] = 2
+            assert load_user(str(user_id)).username == 'renamed'
+
+    def test_identity_cache_invalidated_by_profile_update(self, app, logged_in_client, session, test_user, monkeypatch):
+        """Test profile updates drop the cached identity and record the new version."""
+        monkeypatch.setattr(app.extensions['identity_cache'], 'backend', LRUCache(ttl=60))
+        identity_cache.set(test_user.id, test_user.snapshot())
+        logged_in_client.post('/account', data={
+            'username': 'updateduser',
+            'email': 'updated@example.com'
+        })
+        assert identity_cache.get(test_user.id) is None
+        with logged_in_client.session_transaction() as sess:
+            assert sess['user_version'] == 2
+
     def test_account_page_requires_login(self, client):
         """Test that account page requires authentication."""
         response = client.get('/account', follow_redirects=True)
@@ -356,9 +510,491 @@ class TestCalendarAndAPI:
         data = response.get_json()
         assert len(data) == 0
 
+    def test_api_tasks_date_window(self, logged_in_client, session, test_user):
+        """Test API tasks endpoint only returns tasks overlapping the requested window."""
+        create_task(session, test_user, 'Inside', start_date=datetime(2024, 1, 10), due_date=datetime(2024, 1, 12))
+        create_task(session, test_user, 'Spanning', start_date=datetime(2023, 12, 20), due_date=datetime(2024, 2, 5))
+        create_task(session, test_user, 'Ends Inside', start_date=datetime(2023, 12, 1), due_date=datetime(2024, 1, 3))
+        create_task(session, test_user, 'Before', start_date=datetime(2023, 11, 1), due_date=datetime(2023, 11, 5))
+        create_task(session, test_user, 'After', start_date=datetime(2024, 2, 1))
+
+        response = logged_in_client.get('/api/tasks?start=2024-01-01T00:00:00%2B02:00&end=2024-02-01T00:00:00%2B02:00')
+        assert response.status_code == 200
+        titles = sorted(event['title'] for event in response.get_json())
+        assert titles == ['Ends Inside', 'Inside', 'Spanning']
+
+    def test_api_tasks_date_filters(self, logged_in_client, session, test_user):
+        """Test due/start date bounds on the API tasks endpoint are inclusive."""
+        create_task(session, test_user, 'Due Monday', start_date=datetime(2024, 1, 1), due_date=datetime(2024, 1, 8))
+        create_task(session, test_user, 'Due Sunday', start_date=datetime(2024, 1, 1), due_date=datetime(2024, 1, 14))
+        create_task(session, test_user, 'Due Later', start_date=datetime(2024, 1, 5), due_date=datetime(2024, 1, 20))
+
+        response = logged_in_client.get('/api/tasks?due_after=2024-01-08&due_before=2024-01-14')
+        assert sorted(event['title'] for event in response.get_json()) == ['Due Monday', 'Due Sunday']
+
+        response = logged_in_client.get('/api/tasks?start_after=2024-01-02&status=Not started,Pending')
+        assert [event['title'] for event in response.get_json()] == ['Due Later']
+
+    def test_api_tasks_invalid_window(self, logged_in_client):
+        """Test API tasks endpoint rejects malformed window dates."""
+        response = logged_in_client.get('/api/tasks?start=not-a-date')
+        assert response.status_code == 400
+
+    def test_api_tasks_conditional_get(self, logged_in_client, session, test_user):
+        """Test API tasks endpoint answers If-None-Match with 304 until tasks change."""
+        create_task(session, test_user, 'Cached Task')
+        response = logged_in_client.get('/api/tasks')
+        etag = response.headers['ETag']
+        assert response.status_code == 200
+
+        response = logged_in_client.get('/api/tasks', headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+        logged_in_client.post('/create-task', data={'title': 'Another Task'})
+        response = logged_in_client.get('/api/tasks', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert len(response.get_json()) == 2
+
+    def test_api_tasks_metrics_include_streamed_queries(self):
+        """Test request metrics count the queries run while the response streams."""
+        class InstrumentedConfig(TestingConfig):
+            INSTRUMENTATION_ENABLED = True
+
+        app = create_app(InstrumentedConfig)
+        with app.app_context():
+            db.create_all()
+            user = User(username='metered', email='metered@example.com', password='testpass')
+            db.session.add(user)
+            db.session.commit()
+            create_task(db.session, user, 'Metered Task')
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['_user_id'] = user.id
+            executed = []
+            event.listen(db.engine, 'after_cursor_execute', lambda *args: executed.append(args[2]))
+            with client.get('/api/tasks') as response:
+                assert len(response.get_json()) == 1
+            body = client.get('/metrics').get_data(as_text=True)
+        # The task query runs while the body streams
+        assert any(statement.startswith('SELECT tasks.') for statement in executed)
+        assert 'taskflow_request_db_statements_count{endpoint="api.api_tasks"} 1' in body
+        assert f'taskflow_request_db_statements_sum{{endpoint="api.api_tasks"}} {float(len(executed))}' in body
+
+    def test_index_conditional_get_skipped_with_flash(self, logged_in_client, session, test_user):
+        """Test the index page is re-rendered when a flash message is pending."""
+        etag = logged_in_client.get('/').headers['ETag']
+        assert logged_in_client.get('/', headers={'If-None-Match': etag}).status_code == 304
+
+        with logged_in_client.session_transaction() as sess:
+            sess['_flashes'] = [('message', 'Hello again')]
+        response = logged_in_client.get('/', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert b'Hello again' in response.data
+
+    def test_api_tasks_response_cache(self, app, logged_in_client, session, test_user, monkeypatch):
+        """Test cached API responses are invalidated by task mutations."""
+        monkeypatch.setattr(app.extensions['response_cache'], 'backend', LRUCache())
+        create_task(session, test_user, 'First Task')
+        assert len(logged_in_client.get('/api/tasks').get_json()) == 1
+        assert len(app.extensions['response_cache'].backend) == 1
+
+        logged_in_client.post('/create-task', data={'title': 'Second Task'})
+        assert len(app.extensions['response_cache'].backend) == 0
+        assert len(logged_in_client.get('/api/tasks').get_json()) == 2
+
+# Batch API Tests
+class TestBatchAPI:
+    def test_batch_create(self, logged_in_client, session, test_user):
+        """Test creating several tasks at once with a per-item report."""
+        response = logged_in_client.post('/api/tasks/batch/create', json={'tasks': [
+            {'title': 'Batch One', 'start_date': '2024-01-01'},
+            {'title': ''},
+            {'title': 'Batch Two', 'due_date': 'not-a-date'},
+            {'title': 'Batch Three', 'description': 'Third'},
+        ]})
+        data = response.get_json()
+        assert data['succeeded'] == 2
+        assert data['failed'] == 2
+        assert data['results'][1] == {'index': 1, 'ok': False, 'error': 'Title is required.'}
+        assert data['results'][2]['error'] == 'Invalid due date format.'
+
+        created = {task.id: task for task in Task.query.filter_by(user_id=test_user.id)}
+        assert created[data['results'][0]['id']].title == 'Batch One'
+        assert created[data['results'][0]['id']].status == 'Pending'
+        assert created[data['results'][3]['id']].description == 'Third'
+
+    def test_batch_complete_and_delete_check_ownership(self, logged_in_client, session, test_user):
+        """Test batch complete/delete only touch the current user's tasks."""
+        other_user = User(username='other', email='other@example.com', password='pass')
+        session.add(other_user)
+        session.commit()
+        mine = create_task(session, test_user, 'Mine')
+        theirs = create_task(session, other_user, 'Theirs')
+
+        response = logged_in_client.post('/api/tasks/batch/complete', json={'ids': [mine.id, theirs.id, 99999]})
+        data = response.get_json()
+        assert data['succeeded'] == 1
+        assert data['results'][1] == {'id': theirs.id, 'ok': False, 'error': 'Task not found.'}
+        session.refresh(mine)
+        session.refresh(theirs)
+        assert mine.status == 'Completed'
+        assert theirs.status == 'Not started'
+
+        response = logged_in_client.post('/api/tasks/batch/delete', json={'ids': [mine.id, theirs.id]})
+        assert response.get_json()['succeeded'] == 1
+        assert session.get(Task, mine.id) is None
+        assert session.get(Task, theirs.id) is not None
+
+    def test_batch_reschedule(self, logged_in_client, session, test_user):
+        """Test rescheduling updates dates and open tasks' status."""
+        open_task = create_task(session, test_user, 'Open', start_date=datetime(2024, 1, 1), status='Pending')
+        done_task = create_task(session, test_user, 'Done', start_date=datetime(2024, 1, 1), status='Completed')
+        future = (datetime.utcnow() + timedelta(days=10)).strftime('%Y-%m-%d')
+
+        response = logged_in_client.post('/api/tasks/batch/reschedule', json={'tasks': [
+            {'id': open_task.id, 'start_date': future, 'due_date': None},
+            {'id': done_task.id, 'start_date': future, 'due_date': future},
+            {'id': 'x'},
+        ]})
+        data = response.get_json()
+        assert data['succeeded'] == 2
+        assert data['failed'] == 1
+        session.refresh(open_task)
+        session.refresh(done_task)
+        assert open_task.start_date.strftime('%Y-%m-%d') == future
+        assert open_task.status == 'Not started'
+        assert done_task.status == 'Completed'
+        assert done_task.due_date.strftime('%Y-%m-%d') == future
+
+    def test_batch_rejects_malformed_body(self, logged_in_client):
+        """Test batch endpoints reject bodies without the expected list."""
+        response = logged_in_client.post('/api/tasks/batch/delete', json={'ids': 'all'})
+        assert response.status_code == 400
+        assert response.get_json()['error']
+
+# Search Tests
+class TestSearch:
+    def test_search_page(self, logged_in_client, session, test_user):
+        """Test the search page lists matching tasks only."""
+        create_task(session, test_user, 'Write report', description='Quarterly numbers')
+        create_task(session, test_user, 'Buy milk')
+        response = logged_in_client.get('/search?q=quarterly')
+        assert response.status_code == 200
+        assert b'Write report' in response.data
+        assert b'Buy milk' not in response.data
+
+    def test_search_api_paginates(self, logged_in_client, session, test_user):
+        """Test the search API returns ranked pages of results."""
+        for number in range(3):
+            create_task(session, test_user, f'Report {number}')
+        data = logged_in_client.get('/api/tasks/search?q=report&per_page=2').get_json()
+        assert len(data['results']) == 2
+        assert data['has_more'] is True
+        data = logged_in_client.get('/api/tasks/search?q=report&per_page=2&page=2').get_json()
+        assert len(data['results']) == 1
+        assert data['has_more'] is False
+        assert logged_in_client.get('/api/tasks/search').status_code == 400
+
+    def test_search_follows_edits(self, logged_in_client, session, test_user):
+        """Test edited and deleted tasks are found by their current text only."""
+        task = create_task(session, test_user, 'Draft')
+        logged_in_client.post(f'/edit-task/{task.id}', data={'title': 'Final', 'description': ''})
+        assert logged_in_client.get('/api/tasks/search?q=draft').get_json()['results'] == []
+        assert len(logged_in_client.get('/api/tasks/search?q=final').get_json()['results']) == 1
+        logged_in_client.post(f'/delete-task/{task.id}')
+        assert logged_in_client.get('/api/tasks/search?q=final').get_json()['results'] == []
+
+# Recurring Task Tests
+class TestRecurringTasks:
+    WINDOW = '/api/tasks?start=2024-03-01&end=2024-04-01'
+
+    def create_series(self, client, **fields):
+        data = {'title': 'Standup', 'start_date': '2024-01-01', 'recurrence': 'weekly', 'recurrence_interval': '1'}
+        data.update(fields)
+        return client.post('/create-task', data=data, follow_redirects=True)
+
+    def test_create_recurring_task(self, logged_in_client, session, test_user):
+        """Test a recurring task is stored once with its rule."""
+        self.create_series(logged_in_client, recurrence_count='10')
+        task = Task.query.filter_by(user_id=test_user.id).one()
+        assert (task.recurrence, task.recurrence_interval, task.recurrence_count) == ('weekly', 1, 10)
+        assert task.recurrence_summary() == 'Every week, 10 times'
+
+    def test_create_recurring_task_invalid_rule(self, logged_in_client, session, test_user):
+        """Test invalid recurrence rules are rejected."""
+        response = self.create_series(logged_in_client, recurrence_interval='0')
+        assert b'Repeat interval must be a positive whole number.' in response.data
+        assert Task.query.filter_by(user_id=test_user.id).count() == 0
+
+    def test_api_expands_occurrences_in_window(self, logged_in_client, session, test_user):
+        """Test occurrences are generated for the requested window only."""
+        self.create_series(logged_in_client)
+        create_task(session, test_user, 'One-off', start_date=datetime(2024, 3, 5), due_date=datetime(2024, 3, 6))
+        data = logged_in_client.get(self.WINDOW).get_json()
+        occurrences = [event for event in data if event.get('series_id')]
+        assert [event['start'] for event in occurrences] == ['2024-03-04', '2024-03-11', '2024-03-18', '2024-03-25']
+        assert occurrences[0]['id'] == f"{occurrences[0]['series_id']}:2024-03-04"
+        assert [event['title'] for event in data if not event.get('series_id')] == ['One-off']
+        # Filters apply to occurrences too
+        data = logged_in_client.get(self.WINDOW + '&due_after=2024-03-10').get_json()
+        assert [event['title'] for event in data] == []
+
+    def test_complete_occurrence_materializes_exception(self, logged_in_client, session, test_user):
+        """Test completing an occurrence stores one exception row in its place."""
+        self.create_series(logged_in_client)
+        series = Task.query.filter_by(user_id=test_user.id).one()
+        response = logged_in_client.post(f'/tasks/{series.id}/occurrences/2024-03-11/complete')
+        assert response.status_code == 302
+        exception = Task.query.filter_by(recurrence_parent_id=series.id).one()
+        assert (exception.status, exception.occurrence_date) == ('Completed', datetime(2024, 3, 11))
+
+        data = logged_in_client.get(self.WINDOW).get_json()
+        assert len(data) == 4
+        assert [event['id'] for event in data if event['start'] == '2024-03-11'] == [exception.id]
+        # Editing the same occurrence reuses its exception row
+        response = logged_in_client.post(f'/tasks/{series.id}/occurrences/2024-03-11/edit')
+        assert response.headers['Location'].endswith(f'/edit-task/{exception.id}')
+        assert Task.query.filter_by(recurrence_parent_id=series.id).count() == 1
+
+    def test_occurrence_routes_reject_other_dates(self, logged_in_client, session, test_user):
+        """Test only real occurrences of the user's own series can be materialized."""
+        self.create_series(logged_in_client)
+        series = Task.query.filter_by(user_id=test_user.id).one()
+        assert logged_in_client.post(f'/tasks/{series.id}/occurrences/2024-03-12/complete').status_code == 404
+        assert logged_in_client.post(f'/tasks/{series.id}/occurrences/garbage/edit').status_code == 404
+        one_off = create_task(session, test_user, 'One-off', start_date=datetime(2024, 3, 4))
+        assert logged_in_client.post(f'/tasks/{one_off.id}/occurrences/2024-03-04/complete').status_code == 404
+
+    def test_delete_series_deletes_exceptions(self, logged_in_client, session, test_user):
+        """Test deleting a series removes its materialized occurrences."""
+        self.create_series(logged_in_client)
+        series = Task.query.filter_by(user_id=test_user.id).one()
+        logged_in_client.post(f'/tasks/{series.id}/occurrences/2024-03-11/complete')
+        logged_in_client.post(f'/delete-task/{series.id}')
+        assert Task.query.filter_by(user_id=test_user.id).count() == 0
+
+    def test_batch_reschedule_keeps_series_valid(self, logged_in_client, session, test_user):
+        """Test a series cannot lose its start date or start after its end date through the batch API."""
+        self.create_series(logged_in_client, recurrence_until='2024-06-01')
+        series = Task.query.filter_by(user_id=test_user.id).one()
+        data = logged_in_client.post('/api/tasks/batch/reschedule', json={'tasks': [
+            {'id': series.id, 'due_date': '2026-02-01'},
+            {'id': series.id, 'start_date': '2024-07-01'},
+        ]}).get_json()
+        assert data['succeeded'] == 0
+        assert data['results'][0]['error'] == 'A repeating task needs a start date.'
+        assert data['results'][1]['error'] == 'Repeat end date must not be before the start date.'
+        session.refresh(series)
+        assert series.start_date == datetime(2024, 1, 1)
+
+    def test_unwindowed_api_lists_series_once(self, logged_in_client, session, test_user):
+        """Test /api/tasks without a bounded window lists series rows instead of expanding them."""
+        self.create_series(logged_in_client)
+        series = Task.query.filter_by(user_id=test_user.id).one()
+        for path in ('/api/tasks', '/api/tasks?start=2024-01-01'):
+            events = logged_in_client.get(path).get_json()
+            assert [event['id'] for event in events] == [series.id]
+
+    def test_series_without_start_date_is_skipped(self, logged_in_client, session, test_user):
+        """Test a series stored without a start date is not expanded rather than failing."""
+        session.add(Task(title='Broken', user_id=test_user.id, start_date=None, recurrence='weekly'))
+        session.commit()
+        response = logged_in_client.get('/api/tasks?start=2024-01-01&end=2024-02-01')
+        assert response.status_code == 200
+        assert response.get_json() == []
+
+    def test_batch_delete_series_deletes_exceptions(self, logged_in_client, session, test_user):
+        """Test the batch API also removes a deleted series' materialized occurrences."""
+        self.create_series(logged_in_client)
+        series = Task.query.filter_by(user_id=test_user.id).one()
+        logged_in_client.post(f'/tasks/{series.id}/occurrences/2024-03-11/complete')
+        exception = Task.query.filter_by(recurrence_parent_id=series.id).one()
+        cursor = logged_in_client.get('/api/tasks/changes').get_json()['cursor']
+
+        response = logged_in_client.post('/api/tasks/batch/delete', json={'ids': [series.id]})
+        assert response.get_json()['succeeded'] == 1
+        assert Task.query.filter_by(user_id=test_user.id).count() == 0
+        assert logged_in_client.get('/api/tasks?start=2024-03-01&end=2024-04-01').get_json() == []
+        deleted = logged_in_client.get(f'/api/tasks/changes?since={cursor}').get_json()['deleted']
+        assert sorted(deleted) == sorted([series.id, exception.id])
+
+# Task Statistics Tests
+class TestStats:
+    def stats(self, client):
+        return client.get('/api/stats').get_json()
+
+    def test_stats_follow_routes(self, logged_in_client, session, test_user):
+        """Test the counters follow single-task and batch changes without being recomputed."""
+        yesterday = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d')
+        assert self.stats(logged_in_client)['pending'] == 0
+        logged_in_client.post('/create-task', data={'title': 'Late', 'start_date': yesterday,
+                                                    'due_date': yesterday})
+        data = logged_in_client.post('/api/tasks/batch/create', json={'tasks': [
+            {'title': 'Soon', 'start_date': yesterday, 'due_date': datetime.utcnow().strftime('%Y-%m-%d')},
+            {'title': 'Later'},
+        ]}).get_json()
+        stats = self.stats(logged_in_client)
+        assert (stats['not_started'], stats['pending'], stats['overdue'], stats['due_soon']) == (1, 2, 1, 1)
+
+        late = Task.query.filter_by(title='Late').one()
+        logged_in_client.post(f'/complete-task/{late.id}')
+        logged_in_client.post('/api/tasks/batch/delete', json={'ids': [data['results'][0]['id']]})
+        stats = self.stats(logged_in_client)
+        assert (stats['not_started'], stats['pending'], stats['completed'], stats['overdue']) == (1, 0, 1, 0)
+        assert stats['due_soon'] == 0
+
+    def test_stats_match_status_filters(self, logged_in_client, session, test_user):
+        """Test the counters count stored statuses, like the cards and status filters."""
+        create_task(session, test_user, 'Unswept', start_date=datetime.utcnow() - timedelta(days=1))
+        stats = self.stats(logged_in_client)
+        assert (stats['not_started'], stats['pending']) == (1, 0)
+        assert logged_in_client.get('/api/tasks?status=Pending').get_json() == []
+        assert len(logged_in_client.get('/api/tasks?status=Not started').get_json()) == 1
+
+    def test_stats_widget(self, logged_in_client, session, test_user):
+        """Test the home page header shows the counters once the user has tasks."""
+        assert b'id="task-stats"' not in logged_in_client.get('/').data
+        create_task(session, test_user, 'Overdue', start_date=datetime(2024, 1, 1),
+                    due_date=datetime(2024, 1, 2), status='Pending')
+        response = logged_in_client.get('/')
+        assert b'id="task-stats"' in response.data
+        assert b'1 overdue' in response.data
+
+    def test_reconcile_stats_command(self, app, client, session, test_user):
+        """Test the reconcile-stats CLI command."""
+        create_task(session, test_user, 'Task')
+        result = app.test_cli_runner().invoke(args=['reconcile-stats'])
+        assert 'recomputed for 1 user(s)' in result.output
+
+# Incremental Sync Tests
+class TestDeltaSync:
+    def changes(self, client, cursor=None, **params):
+        if cursor:
+            params['since'] = cursor
+        response = client.get('/api/tasks/changes', query_string=params)
+        assert response.status_code == 200
+        return response.get_json()
+
+    def test_changes_follow_routes(self, logged_in_client, session, test_user):
+        """Test only tasks written or deleted since the cursor are returned."""
+        kept = create_task(session, test_user, 'Kept')
+        edited = create_task(session, test_user, 'Edited')
+        deleted = create_task(session, test_user, 'Deleted')
+        data = self.changes(logged_in_client)
+        assert [task['title'] for task in data['changed']] == ['Kept', 'Edited', 'Deleted']
+        assert data['deleted'] == []
+        assert not data['has_more']
+        unchanged = self.changes(logged_in_client, data['cursor'])
+        assert (unchanged['changed'], unchanged['deleted']) == ([], [])
+
+        logged_in_client.post(f'/edit-task/{edited.id}', data={'title': 'Edited Again', 'status': 'Pending'})
+        logged_in_client.post(f'/delete-task/{deleted.id}')
+        created = logged_in_client.post('/api/tasks/batch/create', json={'tasks': [{'title': 'Batch'}]}).get_json()
+        data = self.changes(logged_in_client, data['cursor'])
+        assert [task['title'] for task in data['changed']] == ['Edited Again', 'Batch']
+        assert data['deleted'] == [deleted.id]
+
+        logged_in_client.post('/api/tasks/batch/complete', json={'ids': [kept.id]})
+        logged_in_client.post('/api/tasks/batch/delete', json={'ids': [created['results'][0]['id']]})
+        data = self.changes(logged_in_client, data['cursor'])
+        assert [(task['id'], task['status']) for task in data['changed']] == [(kept.id, 'Completed')]
+        assert data['deleted'] == [created['results'][0]['id']]
+
+    def test_changes_are_paginated(self, logged_in_client, session, test_user):
+        """Test a large change set is returned in pages, including deletes."""
+        data = logged_in_client.post('/api/tasks/batch/create', json={'tasks': [
+            {'title': f'Task {n}'} for n in range(5)
+        ]}).get_json()
+        cursor = self.changes(logged_in_client)['cursor']
+        ids = [result['id'] for result in data['results']]
+        logged_in_client.post('/api/tasks/batch/delete', json={'ids': ids[:2]})
+        logged_in_client.post('/api/tasks/batch/complete', json={'ids': ids[2:]})
+
+        changed, deleted, pages = [], [], 0
+        while True:
+            data = self.changes(logged_in_client, cursor, limit=2)
+            changed += [task['id'] for task in data['changed']]
+            deleted += data['deleted']
+            cursor = data['cursor']
+            pages += 1
+            if not data['has_more']:
+                break
+        assert deleted == ids[:2]
+        assert changed == ids[2:]
+        assert pages == 3
+
+    def test_changes_reject_bad_cursors(self, logged_in_client):
+        """Test malformed cursors are rejected and expired ones ask for a full sync."""
+        assert logged_in_client.get('/api/tasks/changes?since=garbage').status_code == 400
+        assert logged_in_client.get('/api/tasks/changes?limit=x').status_code == 400
+        response = logged_in_client.get('/api/tasks/changes?since=1||0')
+        assert response.status_code == 410
+        assert response.get_json()['error']
+
+    def test_prune_tombstones_command(self, app, client, session, test_user):
+        """Test the prune-tombstones CLI command keeps recent tombstones."""
+        session.delete(create_task(session, test_user, 'Gone'))
+        session.commit()
+        result = app.test_cli_runner().invoke(args=['prune-tombstones'])
+        assert '0 tombstone(s) pruned' in result.output
+
+# Import/Export Tests
+class TestImportExport:
+    def test_export_csv(self, logged_in_client, session, test_user):
+        """Test streaming CSV export of the user's tasks."""
+        create_task(session, test_user, 'Export Me', description='Line one, with comma',
+                    start_date=datetime(2024, 1, 1))
+        response = logged_in_client.get('/api/tasks/export?format=csv')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert 'attachment' in response.headers['Content-Disposition']
+        lines = response.get_data(as_text=True).splitlines()
+        assert lines[0] == 'id,title,description,status,created_at,start_date,due_date'
+        assert '"Line one, with comma"' in lines[1]
+        assert '2024-01-01T00:00:00' in lines[1]
+
+    def test_export_unknown_format(self, logged_in_client):
+        """Test unsupported export formats are rejected."""
+        response = logged_in_client.get('/api/tasks/export?format=xml')
+        assert response.status_code == 400
+
+    def test_cli_export_import_roundtrip(self, app, client, session, test_user, tmp_path):
+        """Test exporting tasks with the CLI and importing them for another user."""
+        create_task(session, test_user, 'Roundtrip', description='Desc',
+                    start_date=datetime(2024, 1, 1), due_date=datetime(2024, 1, 5), status='Completed')
+        other_user = User(username='other', email='other@example.com', password='pass')
+        session.add(other_user)
+        session.commit()
+        runner = app.test_cli_runner()
+
+        for fmt in ('csv', 'ndjson'):
+            path = tmp_path / f'tasks.{fmt}'
+            result = runner.invoke(args=['export-tasks', 'testuser', '--format', fmt, '--output', str(path)])
+            assert result.exit_code == 0
+            result = runner.invoke(args=['import-tasks', 'other', str(path)])
+            assert 'Imported 1 task(s) for other' in result.output
+
+        imported = Task.query.filter_by(user_id=other_user.id).all()
+        assert len(imported) == 2
+        for task in imported:
+            assert task.title == 'Roundtrip'
+            assert task.status == 'Completed'
+            assert task.due_date == datetime(2024, 1, 5)
+
+    def test_cli_import_rejects_invalid_records(self, app, client, session, test_user, tmp_path):
+        """Test an invalid record aborts the whole import."""
+        path = tmp_path / 'tasks.ndjson'
+        path.write_text('{"title": "Good"}\n{"title": ""}\n')
+        result = app.test_cli_runner().invoke(args=['import-tasks', 'testuser', str(path)])
+        assert result.exit_code != 0
+        assert 'Record 2: Title is required' in result.output
+        assert Task.query.filter_by(user_id=test_user.id).count() == 0
+
 # Database Initialization Test
 class TestDatabaseInitialization:
-    def test_init_db_command(self, client):
+    def test_init_db_command(self, app, client):
         """Test database initialization command."""
         # This would typically be tested with Flask CLI runner
         # For now, we'll test that the command exists
@@ -366,6 +1002,97 @@ class TestDatabaseInitialization:
             # Check that the command is registered
             assert 'init-db' in [cmd.name for cmd in app.cli.commands.values()]
 
+    def test_sweep_status_command(self, app, client, session, test_user):
+        """Test the sweep-status command marks started tasks as Pending."""
+        task = create_task(session, test_user, 'Started', start_date=datetime.utcnow() - timedelta(days=1))
+        result = app.test_cli_runner().invoke(args=['sweep-status'])
+        assert '1 task(s) marked as Pending' in result.output
+        session.refresh(task)
+        assert task.status == 'Pending'
+
+    def test_health_check(self, client):
+        """Test the health check reports database connectivity."""
+        response = client.get('/health')
+        assert response.status_code == 200
+        assert response.get_json()['database'] == 'ok'
+
+# Application Factory Tests
+class TestAppFactory:
+    def test_apps_are_independent(self, app):
+        """Test each app gets its own configuration and database."""
+        other = create_app(TestingConfig)
+        other.config['STREAM_INDEX'] = True
+        assert not app.config['STREAM_INDEX']
+        with app.app_context():
+            app_engine = db.engine
+        with other.app_context():
+            assert db.engine is not app_engine
+
+    def test_apps_have_their_own_caches(self):
+        """Test creating an app does not reconfigure the caches of apps created before it."""
+        class LruConfig(TestingConfig):
+            CACHE_BACKEND = 'lru'
+            USER_CACHE_TTL = 60
+
+        first = create_app(LruConfig)
+        second = create_app(TestingConfig)
+        assert isinstance(first.extensions['response_cache'].backend, LRUCache)
+        assert isinstance(first.extensions['identity_cache'].backend, LRUCache)
+        assert not isinstance(second.extensions['response_cache'].backend, LRUCache)
+        with first.app_context():
+            assert response_cache.enabled
+            identity_cache.set(1, {'version': 1})
+            assert identity_cache.get(1) == {'version': 1}
+        with second.app_context():
+            assert not response_cache.enabled
+            assert identity_cache.get(1) is None
+
+    def test_config_read_when_loaded(self, monkeypatch):
+        """Test environment variables set after import are honored."""
+        from config import load_config
+        monkeypatch.setenv('DATABASE_URL', 'sqlite:///:memory:')
+        monkeypatch.setenv('CACHE_BACKEND', 'lru')
+        monkeypatch.setenv('STREAM_INDEX', '1')
+        app = create_app(load_config('dev'))
+        assert app.config['CACHE_BACKEND'] == 'lru'
+        assert app.config['STREAM_INDEX'] is True
+        assert app.config['ENVIRONMENT'] == 'dev'
+
+    def test_status_sweep_on_by_default(self, monkeypatch):
+        """Test deployed configs keep stored statuses current unless the sweep is turned off."""
+        from config import DevelopmentConfig, ProductionConfig
+        monkeypatch.delenv('STATUS_SWEEP_INTERVAL', raising=False)
+        assert DevelopmentConfig.STATUS_SWEEP_INTERVAL > 0
+        assert ProductionConfig.STATUS_SWEEP_INTERVAL > 0
+        monkeypatch.setenv('STATUS_SWEEP_INTERVAL', '0')
+        assert ProductionConfig.STATUS_SWEEP_INTERVAL == 0
+
+    def test_background_jobs_start_on_first_request(self, monkeypatch):
+        """Test jobs start once per process when it serves a request, not when the app is created."""
+        import scheduler
+        started = []
+        monkeypatch.setattr(scheduler, 'start_periodic_job', lambda app, interval, job: started.append(job))
+
+        class SweepingConfig(TestingConfig):
+            STATUS_SWEEP_INTERVAL = 3600
+
+        app = create_app(SweepingConfig)
+        assert started == []
+        with app.app_context():
+            db.create_all()
+            client = app.test_client()
+            client.get('/health')
+            client.get('/health')
+        assert [job.__name__ for job in started] == ['sweep_task_statuses']
+
+    def test_engines_disposed_after_fork(self, app):
+        """Test a forked child does not reuse the parent's pooled connections."""
+        from app import dispose_engines_after_fork
+        with app.app_context():
+            pool = db.engine.pool
+            dispose_engines_after_fork()
+            assert db.engine.pool is not pool
+
 # Error Handling Tests
 class TestErrorHandling:
     def test_404_task_not_found(self, logged_in_client):
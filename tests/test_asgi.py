@@ -0,0 +1,186 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+pytest.importorskip('aiosqlite')
+
+from app import create_app
+from asgi import AsyncTaskAPI
+from config import TestingConfig
+from models import db, User, Task
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / 'async.db'
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        alice = User(username='alice', email='alice@example.com', password='pw')
+        bob = User(username='bob', email='bob@example.com', password='pw')
+        session.add_all([alice, bob])
+        session.flush()
+        session.add(Task(title='Bob Task', user_id=bob.id))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def api(database):
+    app = create_app(TestingConfig)
+    app.config['ASYNC_DATABASE_URL'] = f'sqlite+aiosqlite:///{database.url.database}'
+    return AsyncTaskAPI(app)
+
+def session_cookie(api, user_id):
+    app = api.app
+    value = app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(user_id)})
+    return f"{app.config['SESSION_COOKIE_NAME']}={value}"
+
+def call(api, method, path, body=None, cookie=None, headers=()):
+    """Runs one request through the ASGI app, returning (status, headers, body)."""
+    path, _, query = path.partition('?')
+    request_headers = [(name.lower().encode(), value.encode()) for name, value in headers]
+    if cookie:
+        request_headers.append((b'cookie', cookie.encode()))
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(),
+             'headers': request_headers}
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode() if body is not None else b''}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        await api(scope, receive, send)
+        await api.engine.dispose()
+
+    asyncio.run(run())
+    response_headers = {}
+    for name, value in sent[0]['headers']:
+        response_headers.setdefault(name.decode(), []).append(value.decode())
+    data = b''.join(message.get('body', b'') for message in sent[1:])
+    return sent[0]['status'], response_headers, json.loads(data) if data else None
+
+def user_version(engine, username):
+    with Session(engine) as session:
+        return session.query(User).filter_by(username=username).one().version
+
+def test_requires_login_session(api):
+    assert call(api, 'GET', '/api/tasks')[0] == 401
+    assert call(api, 'GET', '/api/tasks', cookie=session_cookie(api, 999))[0] == 401
+
+def test_unknown_routes(api):
+    assert call(api, 'GET', '/nowhere')[0] == 404
+    assert call(api, 'PUT', '/api/tasks', cookie=session_cookie(api, 1))[0] == 405
+
+def test_create_and_list(api, database):
+    cookie = session_cookie(api, 1)
+    before = user_version(database, 'alice')
+    status, headers, task = call(api, 'POST', '/api/tasks', {'title': 'Async Task', 'start_date': '2024-01-02', 'due_date': '2024-01-05'},
+                                 cookie=cookie)
+    assert status == 201
+    assert task['title'] == 'Async Task'
+    assert task['due_date'] == '2024-01-05T00:00:00'
+    assert user_version(database, 'alice') == before + 1
+    # The browser's session learns about the write, as with the Flask routes
+    value = headers['set-cookie'][0].split(';')[0].split('=', 1)[1]
+    assert api.app.session_interface.get_signing_serializer(api.app).loads(value)['user_version'] == before + 1
+
+    status, headers, events = call(api, 'GET', '/api/tasks?start=2024-01-01&end=2024-02-01', cookie=cookie)
+    assert status == 200
+    assert [event['title'] for event in events] == ['Async Task']
+    assert events[0]['end'] == '2024-01-05'
+
+    etag = headers['etag'][0]
+    status, _, _ = call(api, 'GET', '/api/tasks', cookie=cookie, headers=[('If-None-Match', etag)])
+    assert status == 304
+
+def test_list_expands_recurring_series(api, database):
+    with Session(database) as session:
+        session.add(Task(title='Weekly', user_id=1, status='Pending', start_date=datetime(2024, 1, 1),
+                         recurrence='weekly', recurrence_interval=1))
+        session.commit()
+    cookie = session_cookie(api, 1)
+    status, _, events = call(api, 'GET', '/api/tasks?start=2024-03-01&end=2024-04-01', cookie=cookie)
+    assert status == 200
+    assert [event['start'] for event in events] == ['2024-03-04', '2024-03-11', '2024-03-18', '2024-03-25']
+    assert {event['series_id'] for event in events} == {events[0]['series_id']}
+
+    # The series row itself is not listed as a one-off task
+    status, _, events = call(api, 'GET', '/api/tasks?start=2024-01-01&end=2024-01-15', cookie=cookie)
+    assert [event['id'] for event in events] == [f"{event['series_id']}:{event['start']}" for event in events]
+    assert len(events) == 2
+
+    # Without a bounded window the series is listed once, unexpanded
+    status, _, events = call(api, 'GET', '/api/tasks', cookie=cookie)
+    assert [event['title'] for event in events] == ['Weekly']
+
+def test_update_complete_and_delete(api, database):
+    cookie = session_cookie(api, 1)
+    task_id = call(api, 'POST', '/api/tasks', {'title': 'Draft'}, cookie=cookie)[2]['id']
+
+    status, _, task = call(api, 'PATCH', f'/api/tasks/{task_id}', {'title': 'Final', 'start_date': '2999-01-01'},
+                           cookie=cookie)
+    assert status == 200
+    assert task['title'] == 'Final'
+    assert task['status'] == 'Not started'
+
+    status, _, task = call(api, 'POST', f'/api/tasks/{task_id}/complete', cookie=cookie)
+    assert task['status'] == 'Completed'
+    assert call(api, 'GET', f'/api/tasks/{task_id}', cookie=cookie)[2]['status'] == 'Completed'
+
+    assert call(api, 'DELETE', f'/api/tasks/{task_id}', cookie=cookie)[0] == 204
+    assert call(api, 'GET', f'/api/tasks/{task_id}', cookie=cookie)[0] == 404
+
+def test_update_keeps_series_valid(api, database):
+    with Session(database) as session:
+        series = Task(title='Weekly', user_id=1, start_date=datetime(2024, 1, 1), recurrence='weekly')
+        session.add(series)
+        session.commit()
+        series_id = series.id
+    status, _, body = call(api, 'PATCH', f'/api/tasks/{series_id}', {'start_date': None},
+                           cookie=session_cookie(api, 1))
+    assert status == 400
+    assert body['error'] == 'A repeating task needs a start date.'
+    with Session(database) as session:
+        assert session.get(Task, series_id).start_date == datetime(2024, 1, 1)
+
+def test_delete_series_deletes_exceptions(api, database):
+    with Session(database) as session:
+        series = Task(title='Weekly', user_id=1, start_date=datetime(2024, 1, 1), recurrence='weekly')
+        session.add(series)
+        session.flush()
+        session.add(Task(title='Weekly', user_id=1, status='Completed', start_date=datetime(2024, 1, 8),
+                         recurrence_parent_id=series.id, occurrence_date=datetime(2024, 1, 8)))
+        session.commit()
+        series_id = series.id
+    assert call(api, 'DELETE', f'/api/tasks/{series_id}', cookie=session_cookie(api, 1))[0] == 204
+    with Session(database) as session:
+        assert session.query(Task).filter_by(user_id=1).count() == 0
+
+def test_other_users_tasks_are_not_found(api, database):
+    with Session(database) as session:
+        task_id = session.query(Task).filter_by(title='Bob Task').one().id
+    cookie = session_cookie(api, 1)
+    assert call(api, 'GET', f'/api/tasks/{task_id}', cookie=cookie)[0] == 404
+    assert call(api, 'DELETE', f'/api/tasks/{task_id}', cookie=cookie)[0] == 404
+    assert call(api, 'GET', '/api/tasks', cookie=cookie)[2] == []
+
+def test_invalid_payloads(api):
+    cookie = session_cookie(api, 1)
+    status, _, body = call(api, 'POST', '/api/tasks', {'description': 'no title'}, cookie=cookie)
+    assert status == 400
+    assert body['error'] == 'Title is required.'
+    status, _, body = call(api, 'POST', '/api/tasks', {'title': 'x', 'due_date': 'soon'}, cookie=cookie)
+    assert body['error'] == 'Invalid due date format.'
+    task_id = call(api, 'POST', '/api/tasks', {'title': 'x'}, cookie=cookie)[2]['id']
+    assert call(api, 'PATCH', f'/api/tasks/{task_id}', {'status': 'Bogus'}, cookie=cookie)[0] == 400
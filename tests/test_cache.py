@@ -0,0 +1,74 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from types import SimpleNamespace
+from cache import LRUCache, NullCache, ResponseCache
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' is now most recently used
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+def test_lru_cache_ttl_expiry():
+    cache = LRUCache(ttl=0)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+def test_lru_cache_invalidate_tag():
+    cache = LRUCache()
+    cache.set('a', 1, tag='user:1')
+    cache.set('b', 2, tag='user:1')
+    cache.set('c', 3, tag='user:2')
+    cache.invalidate_tag('user:1')
+    assert cache.get('a') is None
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+def test_null_cache_stores_nothing():
+    cache = NullCache()
+    cache.set('a', 1)
+    assert cache.get('a') is None
+
+def test_response_cache_keys_include_user_version():
+    cache = ResponseCache(LRUCache())
+    user = SimpleNamespace(id=1, version=1)
+    cache.set(user, 'index', {'sort': 'created'}, 'page')
+    assert cache.get(user, 'index', {'sort': 'created'}) == 'page'
+    assert cache.get(user, 'index', {'sort': 'due_date'}) is None
+
+    user.version = 2
+    assert cache.get(user, 'index', {'sort': 'created'}) is None
+
+def test_response_cache_invalidate_user():
+    cache = ResponseCache(LRUCache())
+    alice = SimpleNamespace(id=1, version=1)
+    bob = SimpleNamespace(id=2, version=1)
+    cache.set(alice, 'api_tasks', {}, '[]')
+    cache.set(bob, 'api_tasks', {}, '[]')
+    cache.invalidate_user(alice.id)
+    assert cache.get(alice, 'api_tasks', {}) is None
+    assert cache.get(bob, 'api_tasks', {}) == '[]'
+
+def test_response_cache_from_config():
+    cache = ResponseCache.from_config({'CACHE_BACKEND': 'lru', 'CACHE_MAX_ENTRIES': 10})
+    assert isinstance(cache.backend, LRUCache)
+    assert cache.backend.max_entries == 10
+    cache = ResponseCache.from_config({'CACHE_BACKEND': 'cache:NullCache'})
+    assert isinstance(cache.backend, NullCache)
+
+def test_response_cache_tee_skips_large_bodies():
+    cache = ResponseCache(LRUCache(), max_value_size=4)
+    user = SimpleNamespace(id=1, version=1)
+    assert b''.join(cache.tee(user, 'small', {}, [b'[', b']'])) == b'[]'
+    assert cache.get(user, 'small', {}) == b'[]'
+    assert b''.join(cache.tee(user, 'large', {}, [b'[1,', b'2,3]'])) == b'[1,2,3]'
+    assert cache.get(user, 'large', {}) is None
@@ -0,0 +1,124 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from calendar import timegm
+from datetime import datetime, timedelta
+from flask import Flask
+from models import db, User, Task, TaskTombstone
+from changes import (CursorExpired, changes_since, decode_cursor, encode_cursor, next_seq, prune_tombstones,
+                     record_deletes)
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['TESTING'] = True
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    user = User(username='alice', email='alice@example.com', password='pw')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def version(user):
+    return db.session.scalar(db.select(User.version).where(User.id == user.id))
+
+def test_one_sequence_number_per_transaction(user):
+    first = Task(title='First', user_id=user.id)
+    second = Task(title='Second', user_id=user.id)
+    db.session.add_all([first, second])
+    db.session.commit()
+    assert first.change_seq == second.change_seq == version(user) == 2
+
+    first.title = 'First, edited'
+    db.session.commit()
+    assert (first.change_seq, second.change_seq, version(user)) == (3, 2, 3)
+
+    db.session.delete(second)
+    assert next_seq(user.id) == 4
+    db.session.commit()
+    tombstone = db.session.scalars(db.select(TaskTombstone)).one()
+    assert (tombstone.task_id, tombstone.change_seq, version(user)) == (second.id, 4, 4)
+
+def test_unchanged_flush_keeps_sequence_number(user):
+    task = Task(title='Task', user_id=user.id)
+    db.session.add(task)
+    db.session.commit()
+    task.title = task.title
+    db.session.commit()
+    assert (task.change_seq, version(user)) == (2, 2)
+
+def test_tasks_added_through_relationship_are_stamped(user):
+    task = Task(title='Task')
+    user.tasks.append(task)
+    db.session.commit()
+    assert task.change_seq == version(user)
+
+def test_sweep_stamps_started_tasks(user):
+    task = Task(title='Started', user_id=user.id, start_date=datetime.utcnow() - timedelta(days=1))
+    db.session.add(task)
+    db.session.commit()
+    assert Task.sweep_started() == 1
+    db.session.commit()
+    db.session.refresh(task)
+    assert task.change_seq == version(user) == 3
+
+def test_changes_since_merges_writes_and_deletes(user):
+    tasks = [Task(title=f'Task {n}', user_id=user.id) for n in range(3)]
+    db.session.add_all(tasks)
+    db.session.commit()
+    changed, deleted, cursor, has_more = changes_since(user.id)
+    assert [row.id for row in changed] == [task.id for task in tasks]
+    assert (deleted, has_more) == ([], False)
+    assert decode_cursor(cursor)[:2] == (version(user), None)
+
+    record_deletes(user.id, [tasks[0].id])
+    db.session.execute(db.delete(Task).where(Task.id == tasks[0].id))
+    db.session.commit()
+    tasks[2].status = 'Completed'
+    db.session.commit()
+
+    changed, deleted, page_cursor, has_more = changes_since(user.id, cursor, limit=1)
+    assert (changed, deleted, has_more) == ([], [tasks[0].id], True)
+    changed, deleted, page_cursor, has_more = changes_since(user.id, page_cursor, limit=1)
+    assert ([row.title for row in changed], deleted, has_more) == (['Task 2'], [], False)
+    assert changes_since(user.id, page_cursor)[:2] == ([], [])
+
+def test_changes_since_ignores_other_users(user):
+    other = User(username='bob', email='bob@example.com', password='pw')
+    db.session.add(other)
+    db.session.commit()
+    cursor = changes_since(user.id)[2]
+    db.session.add(Task(title='Theirs', user_id=other.id))
+    db.session.commit()
+    assert changes_since(user.id, cursor)[:2] == ([], [])
+
+def test_expired_cursor(user):
+    now = datetime.utcnow()
+    cursor = encode_cursor(1, None, timegm((now - timedelta(days=31)).utctimetuple()))
+    with pytest.raises(CursorExpired):
+        changes_since(user.id, cursor, retention_days=30, now=now)
+    with pytest.raises(ValueError):
+        changes_since(user.id, 'not-a-cursor')
+
+def test_prune_tombstones(user):
+    tasks = [Task(title='Old', user_id=user.id), Task(title='New', user_id=user.id)]
+    db.session.add_all(tasks)
+    db.session.commit()
+    for task in tasks:
+        db.session.delete(task)
+    db.session.commit()
+    db.session.execute(db.update(TaskTombstone).where(TaskTombstone.task_id == tasks[0].id)
+                       .values(deleted_at=datetime.utcnow() - timedelta(days=40)))
+    assert prune_tombstones(retention_days=30) == 1
+    db.session.commit()
+    assert db.session.scalars(db.select(TaskTombstone.task_id)).all() == [tasks[1].id]
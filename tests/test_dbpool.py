@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from config import Config, ProductionConfig
+from dbpool import MeteredQueuePool, configure_engine, pool_stats
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "pool.db"}', poolclass=MeteredQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.01)
+    configure_engine(engine, {'SQLITE_PRAGMAS': {'journal_mode': 'WAL', 'busy_timeout': 1234}})
+    yield engine
+    engine.dispose()
+
+def test_sqlite_pragmas_applied(engine):
+    with engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 1234
+
+def test_metered_pool_stats(engine):
+    with engine.connect():
+        stats = pool_stats(engine)
+        assert stats['checked_out'] == 1
+        assert stats['checkouts'] == 1
+        # The only connection is busy, so a second checkout times out
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    stats = pool_stats(engine)
+    assert stats['checked_out'] == 0
+    assert stats['timeouts'] == 1
+    assert stats['wait_seconds_max'] >= 0.01
+
+def test_engine_options_per_database():
+    class MemoryConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+    class PostgresConfig(ProductionConfig):
+        SQLALCHEMY_DATABASE_URI = 'postgresql://db/taskflow'
+        DB_STATEMENT_TIMEOUT = 5000
+
+    assert MemoryConfig().SQLALCHEMY_ENGINE_OPTIONS == {}
+    options = PostgresConfig().SQLALCHEMY_ENGINE_OPTIONS
+    assert options['poolclass'] is MeteredQueuePool
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args'] == {'options': '-c statement_timeout=5000'}
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import logging
+import pytest
+from flask import Flask, render_template_string
+from models import db, User
+from instrumentation import Instrumentation
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "metrics.db"}'
+    app.config['N_PLUS_ONE_THRESHOLD'] = 3
+    db.init_app(app)
+    instrumentation = Instrumentation()
+
+    @app.route('/users')
+    def users():
+        # One query per user, the classic N+1
+        names = [db.session.get(User, user.id, populate_existing=True).username for user in User.query]
+        return render_template_string('{{ names|join(",") }}', names=names)
+
+    with app.app_context():
+        db.create_all()
+        for index in range(4):
+            db.session.add(User(username=f'user{index}', email=f'user{index}@example.com', password='pw'))
+        db.session.commit()
+        instrumentation.init_app(app, db.engines.values())
+    yield app
+
+def test_metrics_endpoint_reports_requests(app):
+    client = app.test_client()
+    assert client.get('/users').status_code == 200
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert 'taskflow_request_duration_seconds_count{endpoint="users"} 1' in body
+    assert 'taskflow_request_duration_seconds_bucket{endpoint="users",le="+Inf"} 1' in body
+    assert 'taskflow_template_renders_total{template="string"} 1' in body
+    assert 'taskflow_request_db_seconds_total{endpoint="users"}' in body
+
+def test_n_plus_one_is_logged_and_counted(app, caplog):
+    with caplog.at_level(logging.WARNING, logger='instrumentation'):
+        app.test_client().get('/users')
+    assert any('Possible N+1 query in users' in record.getMessage() for record in caplog.records)
+    body = app.test_client().get('/metrics').get_data(as_text=True)
+    assert 'taskflow_n_plus_one_requests_total{endpoint="users"} 1' in body
+
+def test_server_timing_header_is_opt_in(app):
+    client = app.test_client()
+    assert 'Server-Timing' not in client.get('/users').headers
+    app.config['SERVER_TIMING_HEADER'] = True
+    header = client.get('/users').headers['Server-Timing']
+    assert header.startswith('db;dur=')
+    assert '5 queries' in header
+    assert 'app;dur=' in header
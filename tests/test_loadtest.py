@@ -0,0 +1,69 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import random
+import pytest
+from datetime import datetime
+from app import create_app
+from auth import load_user
+from config import TestingConfig
+from models import db, TASK_STATUSES
+import loadtest
+
+@pytest.fixture
+def bench_app():
+    app = create_app(TestingConfig)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+def test_generate_tasks_is_reproducible_and_valid():
+    now = datetime(2024, 6, 1)
+    first = list(loadtest.generate_tasks(1, 500, random.Random(3), now))
+    assert first == list(loadtest.generate_tasks(1, 500, random.Random(3), now))
+    assert all(task['status'] in TASK_STATUSES for task in first)
+    assert all(task['created_at'] <= now for task in first)
+    assert all(task['status'] == 'Not started' for task in first
+               if task['start_date'] is not None and task['start_date'] > now)
+    # Some tasks lack dates, as real ones do
+    assert any(task['due_date'] is None for task in first)
+    assert any(task['start_date'] is None for task in first)
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert loadtest.percentile(values, 50) == 50
+    assert loadtest.percentile(values, 99) == 99
+    assert loadtest.percentile([7], 99) == 7
+
+def test_compare_flags_regressions():
+    baseline = {'routes': {'index': {'p50_ms': 10.0, 'p99_ms': 20.0}}}
+    current = {'routes': {'index': {'p50_ms': 10.5, 'p99_ms': 30.0}, 'new': {'p50_ms': 1.0}}}
+    rows = list(loadtest.compare(baseline, current, tolerance=0.2))
+    assert rows == [('routes.index', 'p50_ms', 10.0, 10.5, False), ('routes.index', 'p99_ms', 20.0, 30.0, True)]
+
+def test_run_reports_every_route(bench_app):
+    routes = {'index': '/', 'api_tasks_all': '/api/tasks'}
+    results = loadtest.run(bench_app, load_user, users=1, tasks=30, iterations=3, concurrency=1,
+                           duration=0.2, routes=routes)
+    json.dumps(results)  # Results must be storable as JSON
+    assert results['parameters']['tasks_per_user'] == 30
+    for name in routes:
+        assert results['routes'][name]['requests'] == 3
+        assert results['routes'][name]['p50_ms'] <= results['routes'][name]['p99_ms']
+        assert results['routes'][name]['queries_per_request'] >= 1
+        assert results['server'][name]['errors'] == 0
+        assert results['server'][name]['requests'] > 0
+    assert results['functions']['get_effective_status']['calls_per_iteration'] == 30
+    assert results['functions']['load_user']['requests'] == 3
+    read_models = results['read_models']
+    assert read_models['orm']['tasks'] == read_models['task_view']['tasks'] == 30
+    assert read_models['task_view']['bytes_per_task'] < read_models['orm']['bytes_per_task']
+
+def test_benchmark_startup_times_each_phase(tmp_path):
+    results = loadtest.benchmark_startup(1, f'sqlite:///{tmp_path / "startup.db"}')
+    assert {'import', 'create_app', 'first_request', 'total', 'process'} <= set(results)
+    assert all(result['requests'] == 1 for result in results.values())
+    assert results['total']['p50_ms'] <= results['process']['p50_ms']
@@ -3,7 +3,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
-from models import db, User, Task
+from models import db, User, Task, TaskView, TASK_VIEW_COLUMNS
 from flask import Flask
 from datetime import datetime, timedelta
 
@@ -93,3 +93,73 @@ def test_task_effective_status(session):
     session.add(task4)
     session.commit()
     assert task4.get_effective_status() == 'Completed'
+
+def test_task_sweep_started(session):
+    """Test the status sweep flips only started, not-started tasks to Pending."""
+    user = User(username='erin', email='erin@example.com', password='pw')
+    session.add(user)
+    session.commit()
+
+    started = Task(title='Started', user_id=user.id, start_date=datetime.utcnow() - timedelta(days=1))
+    today = Task(title='Starts Today', user_id=user.id, start_date=datetime.utcnow())
+    future = Task(title='Future', user_id=user.id, start_date=datetime.utcnow() + timedelta(days=2))
+    completed = Task(title='Done', user_id=user.id, status='Completed',
+                     start_date=datetime.utcnow() - timedelta(days=1))
+    session.add_all([started, today, future, completed])
+    session.commit()
+
+    version = user.version
+    assert Task.sweep_started() == 2
+    session.commit()
+    assert user.version == version + 1
+    assert started.status == 'Pending'
+    assert today.status == 'Pending'
+    assert future.status == 'Not started'
+    assert completed.status == 'Completed'
+    assert Task.sweep_started() == 0
+
+def test_user_snapshot_roundtrip(session):
+    user = User(username='grace', email='grace@example.com', password='pw')
+    session.add(user)
+    session.commit()
+    snapshot = user.snapshot()
+    session.expunge_all()
+
+    restored = session.merge(User.from_snapshot(snapshot), load=False)
+    assert restored.id == user.id
+    assert restored.username == 'grace'
+    assert restored.check_password('pw')
+    restored.email = 'grace@example.org'
+    session.commit()
+    assert session.get(User, user.id).email == 'grace@example.org'
+
+def test_check_password_upgrades_outdated_hash(app, session):
+    user = User(username='heidi', email='heidi@example.com', password='pw')
+    session.add(user)
+    session.commit()
+    old_hash = user.password_hash
+
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    assert not user.check_password('wrong')
+    assert user.password_hash == old_hash
+    assert user.check_password('pw')
+    assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+    assert user.check_password('pw')
+
+def test_task_view_matches_task(session):
+    user = User(username='ivan', email='ivan@example.com', password='pw')
+    session.add(user)
+    session.commit()
+    future = datetime.utcnow() + timedelta(days=3)
+    task = Task(title='Series', description='Desc', start_date=future, user_id=user.id,
+                recurrence='weekly', recurrence_interval=2, recurrence_count=4)
+    session.add(task)
+    session.commit()
+    row = session.execute(db.select(*TASK_VIEW_COLUMNS).where(Task.id == task.id)).one()
+    view = TaskView._make(row)
+    assert (view.id, view.title, view.description, view.start_date) == (task.id, 'Series', 'Desc', future)
+    assert view.get_effective_status() == task.get_effective_status() == 'Not started'
+    assert view.recurrence_summary() == task.recurrence_summary() == 'Every 2 weeks, 4 times'
+    # No per-instance dict: a TaskView is just its tuple of column values
+    assert not hasattr(view, '__dict__')
+    assert view._replace(status='Completed').get_effective_status() == 'Completed'
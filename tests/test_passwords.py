@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+import passwords
+from passwords import hash_password, verify_password, needs_rehash, PasswordHashingBusy
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    with app.app_context():
+        yield app
+
+def test_hash_uses_configured_method(app):
+    pwhash = hash_password('secret')
+    assert pwhash.startswith('pbkdf2:sha256:1000$')
+    assert verify_password(pwhash, 'secret')
+    assert not needs_rehash(pwhash)
+
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    assert needs_rehash(pwhash)
+
+@pytest.mark.parametrize('method', ['scrypt', 'pbkdf2:sha256'])
+def test_short_method_names_are_not_outdated(app, method):
+    # Werkzeug fills in the default costs, so the stored prefix is longer than the setting
+    app.config['PASSWORD_HASH_METHOD'] = method
+    pwhash = hash_password('secret')
+    assert pwhash.split('$', 1)[0] != method
+    assert not needs_rehash(pwhash)
+
+def test_hashing_on_bounded_pool(app):
+    app.config['PASSWORD_HASH_WORKERS'] = 2
+    assert verify_password(hash_password('secret'), 'secret')
+
+def test_hashing_fails_fast_when_pool_is_busy(app, monkeypatch):
+    app.config['PASSWORD_HASH_WORKERS'] = 1
+    app.config['PASSWORD_HASH_TIMEOUT'] = 0.01
+    monkeypatch.setattr(passwords, '_pool', None)
+    _, slots = passwords._get_pool(1)
+    slots.acquire()
+    try:
+        with pytest.raises(PasswordHashingBusy):
+            hash_password('secret')
+    finally:
+        slots.release()
+
+def test_benchmark_reports_rate():
+    assert passwords.benchmark('pbkdf2:sha256:1000', duration=0.01) > 0
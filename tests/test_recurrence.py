@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from datetime import date, datetime
+from types import SimpleNamespace
+from recurrence import MAX_WINDOW_OCCURRENCES, Rule, add_months, validate_rule
+
+def series(frequency, start, due=None, interval=1, until=None, count=None):
+    return SimpleNamespace(recurrence=frequency, start_date=start, due_date=due, recurrence_interval=interval,
+                           recurrence_until=until, recurrence_count=count)
+
+def starts(rule, window_start=None, window_end=None):
+    return [start.date().isoformat() for start, _ in rule.occurrences(window_start, window_end)]
+
+def test_add_months_clamps_day():
+    assert add_months(datetime(2024, 1, 31), 1) == datetime(2024, 2, 29)
+    assert add_months(datetime(2024, 11, 30), 3) == datetime(2025, 2, 28)
+
+def test_weekly_window_expansion():
+    rule = Rule(series('weekly', datetime(2024, 1, 1), interval=2))
+    assert starts(rule, datetime(2024, 3, 1), datetime(2024, 4, 1)) == ['2024-03-11', '2024-03-25']
+
+def test_monthly_keeps_day_of_month():
+    rule = Rule(series('monthly', datetime(2024, 1, 31)))
+    assert starts(rule, datetime(2024, 2, 1), datetime(2024, 5, 1)) == ['2024-02-29', '2024-03-31', '2024-04-30']
+
+def test_until_and_count_end_the_series():
+    assert starts(Rule(series('daily', datetime(2024, 1, 1), until=datetime(2024, 1, 3)))) == [
+        '2024-01-01', '2024-01-02', '2024-01-03']
+    rule = Rule(series('daily', datetime(2024, 1, 1), count=5))
+    assert starts(rule, datetime(2024, 1, 4), datetime(2024, 2, 1)) == ['2024-01-04', '2024-01-05']
+
+def test_occurrences_running_into_window():
+    # Each occurrence lasts three days, so the one starting Jan 29 overlaps February
+    rule = Rule(series('weekly', datetime(2024, 1, 1), due=datetime(2024, 1, 4)))
+    occurrences = list(rule.occurrences(datetime(2024, 2, 1), datetime(2024, 2, 10)))
+    assert occurrences[0] == (datetime(2024, 1, 29), datetime(2024, 2, 1))
+    assert len(occurrences) == 2
+
+def test_unbounded_window_is_capped():
+    rule = Rule(series('daily', datetime(2024, 1, 1)))
+    assert len(list(rule.occurrences())) == MAX_WINDOW_OCCURRENCES
+
+def test_occurrence_on():
+    rule = Rule(series('weekly', datetime(2024, 1, 1, 9, 30), count=3))
+    assert rule.occurrence_on(date(2024, 1, 8)) == datetime(2024, 1, 8, 9, 30)
+    assert rule.occurrence_on(date(2024, 1, 9)) is None
+    assert rule.occurrence_on(date(2024, 1, 22)) is None
+
+def test_validate_rule():
+    start = datetime(2024, 1, 1)
+    validate_rule('weekly', 1, None, None, start)
+    with pytest.raises(ValueError):
+        validate_rule('yearly', 1, None, None, start)
+    with pytest.raises(ValueError):
+        validate_rule('daily', 0, None, None, start)
+    with pytest.raises(ValueError):
+        validate_rule('daily', 1, datetime(2023, 1, 1), None, start)
+    with pytest.raises(ValueError):
+        validate_rule('daily', 1, None, None, None)
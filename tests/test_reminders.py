@@ -0,0 +1,152 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask
+from models import db, User, Task, SchedulerState
+from reminders import LogNotifier, Notifier, ReminderScheduler, notifiers_from_config
+
+NOW = datetime(2024, 6, 1, 9, 0)
+NO_LEAD = {'start': timedelta(0), 'due': timedelta(0)}
+
+class Collector(Notifier):
+    def __init__(self):
+        self.sent = []
+
+    def notify(self, reminder):
+        self.sent.append((reminder.kind, reminder.title, reminder.at))
+
+class Broken(Notifier):
+    def notify(self, reminder):
+        raise RuntimeError('delivery failed')
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['TESTING'] = True
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    user = User(username='alice', email='alice@example.com', password='pw')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def add_task(user, title, due_date=None, start_date=NOW - timedelta(days=30), status='Pending'):
+    task = Task(title=title, start_date=start_date, due_date=due_date, status=status, user_id=user.id)
+    db.session.add(task)
+    db.session.commit()
+    return task
+
+def scheduler(collector, owner='worker-1', **kwargs):
+    return ReminderScheduler([collector], leads=kwargs.pop('leads', NO_LEAD), owner=owner, **kwargs)
+
+def titles(collector):
+    return [title for _, title, _ in collector.sent]
+
+def test_fires_due_and_start_events_in_order(user):
+    add_task(user, 'Overdue', due_date=NOW - timedelta(hours=1))
+    add_task(user, 'Later', due_date=NOW + timedelta(minutes=30))
+    add_task(user, 'Soon', due_date=NOW + timedelta(minutes=10))
+    add_task(user, 'Starting', start_date=NOW + timedelta(minutes=20), status='Not started')
+    collector = Collector()
+    worker = scheduler(collector, refresh_interval=3600, lease_seconds=3600)
+
+    # A new scheduler starts from now instead of replaying the past
+    assert worker.tick(NOW) == 10 * 60
+    assert collector.sent == []
+    worker.tick(NOW + timedelta(minutes=31))
+    assert collector.sent == [('due', 'Soon', NOW + timedelta(minutes=10)),
+                              ('start', 'Starting', NOW + timedelta(minutes=20)),
+                              ('due', 'Later', NOW + timedelta(minutes=30))]
+
+def test_lead_time(user):
+    add_task(user, 'Report', due_date=NOW + timedelta(days=1, minutes=5))
+    collector = Collector()
+    worker = scheduler(collector, leads={'start': timedelta(0), 'due': timedelta(days=1)})
+    worker.tick(NOW)
+    worker.tick(NOW + timedelta(minutes=5))
+    assert titles(collector) == ['Report']
+
+def test_changed_tasks_are_rechecked_before_delivery(user):
+    done = add_task(user, 'Done', due_date=NOW + timedelta(minutes=5))
+    moved = add_task(user, 'Moved', due_date=NOW + timedelta(minutes=5))
+    add_task(user, 'Kept', due_date=NOW + timedelta(minutes=5))
+    collector = Collector()
+    worker = scheduler(collector)
+    worker.tick(NOW)
+    done.status = 'Completed'
+    moved.due_date = NOW + timedelta(days=3)
+    db.session.commit()
+    worker.tick(NOW + timedelta(minutes=6))
+    assert titles(collector) == ['Kept']
+
+def test_new_tasks_are_picked_up_by_refresh(user):
+    collector = Collector()
+    worker = scheduler(collector, refresh_interval=60)
+    worker.tick(NOW)
+    add_task(user, 'Created later', due_date=NOW + timedelta(minutes=5))
+    worker.tick(NOW + timedelta(minutes=6))
+    assert titles(collector) == ['Created later']
+
+def test_cursor_survives_restart(user):
+    add_task(user, 'First', due_date=NOW + timedelta(minutes=5))
+    add_task(user, 'Second', due_date=NOW + timedelta(minutes=15))
+    collector = Collector()
+    worker = scheduler(collector, lease_seconds=60)
+    worker.tick(NOW)
+    worker.tick(NOW + timedelta(minutes=6))
+    assert titles(collector) == ['First']
+
+    # A restarted worker takes over once the old lease has run out, missing nothing and repeating nothing
+    restarted = scheduler(collector, owner='worker-2', lease_seconds=60)
+    restarted.tick(NOW + timedelta(minutes=20))
+    assert titles(collector) == ['First', 'Second']
+    assert db.session.get(SchedulerState, 'reminders.due').cursor_time == NOW + timedelta(minutes=15)
+
+def test_only_lease_owner_delivers(user):
+    add_task(user, 'Once', due_date=NOW + timedelta(minutes=5))
+    first, second = Collector(), Collector()
+    owner = scheduler(first, lease_seconds=600)
+    standby = scheduler(second, owner='worker-2', lease_seconds=600)
+    assert owner.acquire(NOW)
+    assert not standby.acquire(NOW)
+    later = NOW + timedelta(minutes=6)
+    assert standby.tick(later) == 200
+    owner.tick(later)
+    assert titles(first) == ['Once']
+    assert second.sent == []
+
+def test_batches_are_loaded_incrementally(user):
+    for number in range(5):
+        add_task(user, f'Task {number}', due_date=NOW + timedelta(minutes=1))
+    collector = Collector()
+    worker = scheduler(collector, batch_size=2)
+    worker.tick(NOW)
+    assert len(worker.heap) == 2
+    waits = [worker.tick(NOW + timedelta(minutes=2)) for _ in range(3)]
+    assert titles(collector) == [f'Task {number}' for number in range(5)]
+    assert waits[:2] == [0, 0]
+
+def test_failing_notifier_does_not_block_others(user):
+    add_task(user, 'Task', due_date=NOW + timedelta(minutes=1))
+    collector = Collector()
+    worker = ReminderScheduler([Broken(), collector], leads=NO_LEAD, owner='worker-1')
+    worker.tick(NOW)
+    worker.tick(NOW + timedelta(minutes=2))
+    assert titles(collector) == ['Task']
+
+def test_notifiers_from_config():
+    notifiers = notifiers_from_config({'REMINDER_NOTIFIERS': 'log, reminders:LogNotifier'})
+    assert [type(notifier) for notifier in notifiers] == [LogNotifier, LogNotifier]
+    with pytest.raises(ValueError):
+        notifiers_from_config({'REMINDER_NOTIFIERS': 'webhook'})
@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from models import db, User
+from routing import init_replica_routing
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'test-secret-key'
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "primary.db"}'
+    app.config['SQLALCHEMY_BINDS'] = {'replica0': f'sqlite:///{tmp_path / "replica.db"}'}
+    db.init_app(app)
+    init_replica_routing(app)
+
+    @app.route('/users', methods=['GET', 'POST'])
+    def users():
+        if app.config.get('WRITE_FIRST'):
+            db.session.add(User(username='new', email='new@example.com', password='pw'))
+            db.session.commit()
+        return ','.join(sorted(user.username for user in User.query))
+
+    with app.app_context():
+        # Same schema on both databases, different rows to tell them apart
+        for engine in (db.engines[None], db.engines['replica0']):
+            db.metadata.create_all(engine)
+        db.session.add(User(username='primary', email='p@example.com', password='pw'))
+        db.session.commit()
+        with db.engines['replica0'].begin() as conn:
+            conn.execute(db.insert(User).values(username='replica', email='r@example.com',
+                                                password_hash='x', version=1))
+    # Requests below push their own app contexts, as they do in production
+    yield app
+    # init_app registered the bind's metadata on the shared db; later apps have no such bind
+    db.metadatas.pop('replica0', None)
+
+def test_get_reads_from_replica(app):
+    assert app.test_client().get('/users').data == b'replica'
+
+def test_post_uses_primary(app):
+    assert app.test_client().post('/users').data == b'primary'
+
+def test_reads_after_write_stick_to_primary(app):
+    client = app.test_client()
+    app.config['WRITE_FIRST'] = True
+    # Reads later in the writing request go to the primary...
+    assert client.post('/users').data == b'new,primary'
+    app.config['WRITE_FIRST'] = False
+    # ...and so do this browser's reads right after the write
+    assert client.get('/users').data == b'new,primary'
+    with client.session_transaction() as sess:
+        sess['primary_until'] = 0
+    assert client.get('/users').data == b'replica'
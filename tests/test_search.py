@@ -0,0 +1,87 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from models import db, User, Task
+from search import fts5_query, install, search_tasks
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['TESTING'] = True
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def users(app):
+    alice = User(username='alice', email='alice@example.com', password='pw')
+    bob = User(username='bob', email='bob@example.com', password='pw')
+    db.session.add_all([alice, bob])
+    db.session.commit()
+    return alice, bob
+
+def add_task(user, title, description=None):
+    task = Task(title=title, description=description, user_id=user.id)
+    db.session.add(task)
+    db.session.commit()
+    return task
+
+def titles(tasks):
+    return [task.title for task in tasks]
+
+def test_fts5_query_ignores_syntax():
+    assert fts5_query('report OR "draft') == '"report"* "OR"* "draft"*'
+    assert fts5_query('  -*  ') == ''
+
+def test_ranked_results(users):
+    alice, _ = users
+    add_task(alice, 'Groceries', 'Buy milk')
+    add_task(alice, 'Quarterly report', 'Finish the report draft and send the report')
+    add_task(alice, 'Call Sam', 'About the report')
+    assert titles(search_tasks(alice.id, 'report', 10)) == ['Quarterly report', 'Call Sam']
+    # Words match as prefixes and in any order
+    assert titles(search_tasks(alice.id, 'draft quart', 10)) == ['Quarterly report']
+    assert search_tasks(alice.id, 'bananas', 10) == []
+    assert search_tasks(alice.id, '"', 10) == []
+
+def test_results_are_per_user_and_paginated(users):
+    alice, bob = users
+    for number in range(3):
+        add_task(alice, f'Plan trip {number}')
+    add_task(bob, 'Plan trip for Bob')
+    assert len(search_tasks(alice.id, 'trip', 10)) == 3
+    first, second = search_tasks(alice.id, 'trip', 2), search_tasks(alice.id, 'trip', 2, offset=2)
+    assert len(first) == 2 and len(second) == 1
+    assert not set(titles(first)) & set(titles(second))
+    assert titles(search_tasks(bob.id, 'trip', 10)) == ['Plan trip for Bob']
+
+def test_index_follows_updates_and_deletes(users):
+    alice, _ = users
+    task = add_task(alice, 'Old title')
+    task.title = 'New title'
+    db.session.commit()
+    assert search_tasks(alice.id, 'old', 10) == []
+    assert titles(search_tasks(alice.id, 'new', 10)) == ['New title']
+    # Bulk statements are indexed too
+    db.session.execute(db.update(Task).where(Task.id == task.id).values(description='renamed twice'))
+    db.session.commit()
+    assert titles(search_tasks(alice.id, 'twice', 10)) == ['New title']
+    db.session.delete(task)
+    db.session.commit()
+    assert search_tasks(alice.id, 'new', 10) == []
+
+def test_install_rebuilds_existing_tasks(users):
+    alice, _ = users
+    add_task(alice, 'Indexed later')
+    with db.engine.begin() as connection:
+        connection.execute(text('DROP TABLE tasks_fts'))
+        install(connection, rebuild=True)
+    assert titles(search_tasks(alice.id, 'later', 10)) == ['Indexed later']
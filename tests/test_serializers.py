@@ -0,0 +1,31 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import pytest
+from datetime import datetime
+import serializers
+from serializers import task_events, stream_json_array
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    """Runs a test with both the optional orjson encoder and the stdlib fallback."""
+    if request.param == 'json':
+        monkeypatch.setattr(serializers, 'orjson', None)
+    elif serializers.orjson is None:
+        pytest.skip('orjson is not installed')
+    return request.param
+
+def test_task_events_formats_dates():
+    rows = [(1, 'Task', None, datetime(2024, 1, 5, 13, 30), None, 'Pending')]
+    assert list(task_events(rows)) == [{
+        'id': 1, 'title': 'Task', 'description': None,
+        'start': '2024-01-05', 'end': None, 'status': 'Pending',
+    }]
+
+@pytest.mark.parametrize('count', [0, 1, 5, 7])
+def test_stream_json_array(encoder, count):
+    items = [{'id': i, 'title': f'Täsk {i}'} for i in range(count)]
+    body = b''.join(stream_json_array(iter(items), batch_size=3))
+    assert json.loads(body) == items
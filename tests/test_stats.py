@@ -0,0 +1,230 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from datetime import datetime, timedelta
+from flask import Flask, g
+from sqlalchemy import create_engine, event
+from models import db, User, Task, UserStats
+from stats import COUNTERS, add_tasks, aggregate, contribution, reconcile, reconcile_all, today, tracking, user_stats
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['TESTING'] = True
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def user(app):
+    user = User(username='alice', email='alice@example.com', password='pw')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def days(n):
+    return datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0) + timedelta(days=n)
+
+# One task per interesting combination of status, start date and due date
+TASKS = [
+    ('Not started', days(1), None),
+    ('Not started', days(3), days(5)),
+    ('Pending', days(-2), days(-1)),
+    ('Pending', days(0), days(0)),
+    ('Not started', days(-1), days(6)),  # Started but not yet swept
+    ('Pending', days(-5), days(7)),
+    ('Completed', days(-3), days(-2)),
+]
+
+def add_all(user):
+    for status, start_date, due_date in TASKS:
+        db.session.add(Task(title='Task', status=status, start_date=start_date, due_date=due_date, user_id=user.id))
+    db.session.commit()
+
+def stored(user):
+    row = db.session.get(UserStats, user.id)
+    db.session.refresh(row)
+    return {name: getattr(row, name) for name in COUNTERS}
+
+def test_contribution_matches_aggregate(user):
+    add_all(user)
+    expected = dict.fromkeys(COUNTERS, 0)
+    for task in TASKS:
+        status, _, due_date = task
+        for name, amount in contribution(status, due_date, today()).items():
+            expected[name] += amount
+    assert expected == {'not_started': 3, 'pending': 3, 'completed': 1, 'overdue': 1, 'due_soon': 3}
+    assert aggregate(Task.user_id == user.id, today()) == expected
+
+def test_user_stats_materializes_row(user):
+    add_all(user)
+    counts = user_stats(user.id)
+    assert counts['pending'] == 3
+    assert counts['as_of'] == today().isoformat()
+    assert db.session.get(UserStats, user.id).as_of == today()
+
+def test_flush_hooks_keep_counters_current(user):
+    user_stats(user.id)
+    task = Task(title='Task', status='Not started', start_date=days(2), due_date=days(3), user_id=user.id)
+    db.session.add(task)
+    db.session.commit()
+    assert stored(user) == {'not_started': 1, 'pending': 0, 'completed': 0, 'overdue': 0, 'due_soon': 1}
+
+    # Loaded as the routes load it, so the previous values are known
+    db.session.refresh(task)
+    task.start_date = days(-1)
+    task.due_date = days(-1)
+    db.session.commit()
+    # Counted by stored status, so the start date alone does not make it pending
+    assert stored(user) == {'not_started': 1, 'pending': 0, 'completed': 0, 'overdue': 1, 'due_soon': 0}
+
+    db.session.refresh(task)
+    task.status = 'Pending'
+    db.session.commit()
+    assert stored(user) == {'not_started': 0, 'pending': 1, 'completed': 0, 'overdue': 1, 'due_soon': 0}
+
+    db.session.refresh(task)
+    task.status = 'Completed'
+    db.session.commit()
+    assert stored(user) == {'not_started': 0, 'pending': 0, 'completed': 1, 'overdue': 0, 'due_soon': 0}
+
+    db.session.refresh(task)
+    db.session.delete(task)
+    db.session.commit()
+    assert stored(user) == dict.fromkeys(COUNTERS, 0)
+
+def test_unloaded_previous_value_invalidates(user):
+    task = Task(title='Task', status='Pending', start_date=days(-1), user_id=user.id)
+    db.session.add(task)
+    db.session.commit()
+    user_stats(user.id)
+    db.session.expire(task)
+    task.status = 'Completed'
+    db.session.commit()
+    assert db.session.get(UserStats, user.id).as_of is None
+    assert user_stats(user.id)['completed'] == 1
+
+def test_bulk_helpers(user):
+    user_stats(user.id)
+    rows = [{'title': 'Bulk', 'status': 'Pending', 'start_date': days(-1), 'due_date': days(1), 'user_id': user.id}
+            for _ in range(3)]
+    ids = db.session.scalars(db.insert(Task).returning(Task.id), rows).all()
+    add_tasks(user.id, rows)
+    db.session.commit()
+    assert stored(user)['pending'] == 3
+    assert stored(user)['due_soon'] == 3
+
+    with tracking(user.id, ids[:2]):
+        db.session.execute(db.update(Task).where(Task.id.in_(ids[:2])).values(status='Completed'))
+    with tracking(user.id, ids[2:]):
+        db.session.execute(db.delete(Task).where(Task.id.in_(ids[2:])))
+    db.session.commit()
+    assert stored(user) == {'not_started': 0, 'pending': 0, 'completed': 2, 'overdue': 0, 'due_soon': 0}
+
+def test_outdated_row_is_recomputed(user):
+    add_all(user)
+    user_stats(user.id)
+    row = db.session.get(UserStats, user.id)
+    row.as_of = today() - timedelta(days=1)
+    row.pending = 99
+    db.session.commit()
+    # Increments only apply to rows computed today
+    db.session.add(Task(title='Task', status='Completed', user_id=user.id))
+    db.session.commit()
+    assert db.session.get(UserStats, user.id).pending == 99
+    counts = user_stats(user.id)
+    assert counts['pending'] == 3
+    assert counts['completed'] == 2
+
+def test_reconcile_all_covers_users_without_tasks(user):
+    other = User(username='bob', email='bob@example.com', password='pw')
+    db.session.add(other)
+    db.session.commit()
+    add_all(user)
+    assert reconcile_all(batch_size=1) == 2
+    assert stored(other) == dict.fromkeys(COUNTERS, 0)
+    assert stored(user)['due_soon'] == 3
+    # Reconciling again updates the existing rows in place
+    assert reconcile([user.id, other.id])[user.id]['overdue'] == 1
+
+def test_deleting_expired_task(user):
+    task = Task(title='Task', status='Pending', start_date=days(-1), user_id=user.id)
+    db.session.add(task)
+    db.session.commit()
+    user_stats(user.id)
+    # Deleting loads the expired task first, so its contribution is known
+    db.session.delete(task)
+    db.session.commit()
+    assert stored(user)['pending'] == 0
+
+def test_sweep_invalidates_counters(user):
+    task = Task(title='Task', status='Not started', start_date=days(-1), user_id=user.id)
+    db.session.add(task)
+    db.session.commit()
+    assert user_stats(user.id)['not_started'] == 1
+    assert Task.sweep_started() == 1
+    db.session.commit()
+    counts = user_stats(user.id)
+    assert (counts['not_started'], counts['pending']) == (0, 1)
+
+def test_concurrent_first_reads(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'stats.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        user = User(username='alice', email='alice@example.com', password='pw')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(Task(title='Task', status='Pending', user_id=user.id))
+        db.session.commit()
+        other = create_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+
+        raced = []
+
+        # Another request stores the row between this one's existence check and its INSERT
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def concurrent_insert(conn, cursor, statement, *args):
+            if statement.startswith('INSERT INTO user_stats') and not raced:
+                raced.append(statement)
+                with other.begin() as connection:
+                    connection.execute(db.insert(UserStats).values(user_id=user.id, as_of=today(), pending=1))
+
+        assert user_stats(user.id)['pending'] == 1
+        assert raced
+        assert db.session.get(UserStats, user.id).pending == 1
+        event.remove(db.engine, 'before_cursor_execute', concurrent_insert)
+        other.dispose()
+        db.session.remove()
+        db.drop_all()
+
+def test_recompute_reads_primary_on_replica_requests(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config['SQLALCHEMY_BINDS'] = {'replica0': f"sqlite:///{tmp_path / 'replica.db'}"}
+    db.init_app(app)
+    with app.app_context():
+        for engine in (db.engines[None], db.engines['replica0']):
+            db.metadata.create_all(engine)
+        user = User(username='alice', email='alice@example.com', password='pw')
+        db.session.add(user)
+        db.session.commit()
+        # The replica has not received the task yet
+        db.session.add(Task(title='Task', status='Pending', user_id=user.id))
+        db.session.commit()
+        user_id = user.id
+        db.session.remove()
+    with app.test_request_context('/api/stats'):
+        g.replica_bind = 'replica0'
+        assert user_stats(user_id)['pending'] == 1
+    with app.app_context():
+        assert db.session.get(UserStats, user_id).pending == 1
+        db.session.remove()
+    # init_app registered the bind's metadata on the shared db; later apps have no such bind
+    db.metadatas.pop('replica0', None)
@@ -0,0 +1,134 @@
+"""
+transfer module for TaskFlow application.
+Streaming bulk export and import of a user's tasks as CSV or NDJSON.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from models import db, Task, TASK_STATUSES
+from serializers import dumps
+from stats import add_tasks
+from changes import next_seq
+
+EXPORT_COLUMNS = ('id', 'title', 'description', 'status', 'created_at', 'start_date', 'due_date')
+BATCH_SIZE = 1000
+
+
+def export_rows(user_id, batch_size=BATCH_SIZE):
+    """Yields a user's tasks as column tuples, fetched from a server-side cursor."""
+    columns = [getattr(Task, name) for name in EXPORT_COLUMNS]
+    result = db.session.execute(
+        db.select(*columns)
+        .where(Task.user_id == user_id)
+        .order_by(Task.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for row in result:
+        yield [value.isoformat() if isinstance(value, datetime) else value for value in row]
+
+
+def write_csv(rows, batch_size=BATCH_SIZE):
+    """Encodes export rows as CSV text, yielding one chunk per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_ndjson(rows, batch_size=BATCH_SIZE):
+    """Encodes export rows as newline-delimited JSON, yielding one chunk per batch of rows."""
+    lines = []
+    for row in rows:
+        lines.append(dumps(dict(zip(EXPORT_COLUMNS, row))).decode('utf-8'))
+        if len(lines) >= batch_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def read_csv(stream):
+    """Yields task records from CSV text with an EXPORT_COLUMNS-style header."""
+    yield from csv.DictReader(stream)
+
+
+def read_ndjson(stream):
+    """Yields task records from newline-delimited JSON, skipping blank lines."""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+EXPORT_FORMATS = {
+    'csv': (write_csv, 'text/csv'),
+    'ndjson': (write_ndjson, 'application/x-ndjson'),
+}
+
+IMPORT_FORMATS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+def parse_datetime(value, field):
+    """Parses an optional ISO 8601 date or datetime from an import record."""
+    if value is None or value == '':
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {field}: {value!r}')
+
+
+def parse_record(record, user_id):
+    """Validates an import record into Task column values. Raises ValueError on bad input."""
+    if not isinstance(record, dict):
+        raise ValueError('Record must be an object.')
+    title = record.get('title')
+    if not title:
+        raise ValueError('Title is required.')
+    start_date = parse_datetime(record.get('start_date'), 'start_date')
+    status = record.get('status')
+    if status not in TASK_STATUSES:
+        status = Task.status_from_start_date(start_date)
+    return {
+        'title': title,
+        'description': record.get('description') or None,
+        'status': status,
+        'created_at': parse_datetime(record.get('created_at'), 'created_at') or datetime.utcnow(),
+        'start_date': start_date,
+        'due_date': parse_datetime(record.get('due_date'), 'due_date'),
+        'user_id': user_id,
+    }
+
+
+def import_tasks(user, records, batch_size=BATCH_SIZE):
+    """
+    Inserts task records for a user with batched executemany INSERTs, without
+    building ORM objects. Raises ValueError naming the first invalid record;
+    the caller commits or rolls back. Returns the number of tasks imported.
+    """
+    count = 0
+    batch = []
+    for number, record in enumerate(records, 1):
+        try:
+            batch.append(dict(parse_record(record, user.id), change_seq=next_seq(user.id)))
+        except ValueError as e:
+            raise ValueError(f'Record {number}: {e}')
+        if len(batch) >= batch_size:
+            db.session.execute(db.insert(Task), batch)
+            add_tasks(user.id, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(Task), batch)
+        add_tasks(user.id, batch)
+        count += len(batch)
+    return count